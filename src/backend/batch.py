@@ -0,0 +1,149 @@
+"""Analyse many positions across a process pool.
+
+Positions travel to the workers as FEN strings and come back as small
+Analysis tuples, in input order, while the rest of the batch is still
+running. Each worker keeps one Searcher (and its transposition table) for
+all the positions it is given.
+
+    python -m src.backend.batch --positions 400 --depth 2   # scaling benchmark
+"""
+import multiprocessing
+import os
+import time
+from collections import deque
+from itertools import islice
+from typing import Iterable, Iterator, List, NamedTuple, Optional
+
+from src.backend.game import ChessBoard, square_name
+from src.backend.search import Searcher
+
+WORKER_TT_MB = 8
+
+
+class Analysis(NamedTuple):
+    legal_moves: int
+    in_check: bool
+    status: Optional[str]       # checkmate_status() of the position
+    best_move: Optional[str]    # coordinate notation, e.g. "e2e4"; None without a search
+    score: Optional[int]        # centipawns for the side to move
+    depth: int
+    nodes: int
+
+
+_searcher: Optional[Searcher] = None
+
+
+def _init_worker(tt_mb: float):
+    global _searcher
+    _searcher = Searcher(tt_mb=tt_mb)
+
+
+def analyze(fen: str, depth: Optional[int] = None, movetime: Optional[float] = None,
+            searcher: Optional[Searcher] = None) -> Analysis:
+    """Legal move count and game status for one position, plus a search if depth or movetime is set."""
+    game = ChessBoard.from_fen(fen)
+    moves = game.get_legal_moves(game.turn)
+    in_check = game.is_in_check(game.turn)
+    status = game.checkmate_status()
+    if not moves or not (depth or movetime):
+        return Analysis(len(moves), in_check, status, None, None, 0, 0)
+    searcher = searcher or _searcher or Searcher(tt_mb=WORKER_TT_MB)
+    result = searcher.search(game, movetime or float("inf"), depth)
+    move = square_name(result.move[0]) + square_name(result.move[1])
+    return Analysis(len(moves), in_check, status, move, result.score, result.depth, result.nodes)
+
+
+def _analyze_job(job) -> Analysis:
+    return analyze(*job)
+
+
+def _analyze_chunk(jobs) -> List[Analysis]:
+    return [analyze(*job) for job in jobs]
+
+
+def analyze_many(fens: Iterable[str], depth: Optional[int] = None, movetime: Optional[float] = None,
+                 processes: Optional[int] = None, chunksize: int = 8,
+                 tt_mb: float = WORKER_TT_MB) -> Iterator[Analysis]:
+    """Yield an Analysis per FEN, in order, using `processes` workers (default: all cores).
+
+    fens may be any iterable, e.g. a generator over a large file. It is read in
+    chunks of `chunksize` positions per task, and only as the results are
+    consumed: at most two chunks per worker are queued or running at a time,
+    so memory stays flat however long the input is. processes=1 runs in this
+    process without a pool.
+    """
+    processes = processes or os.cpu_count() or 1
+    jobs = ((fen, depth, movetime) for fen in fens)
+    if processes == 1:
+        _init_worker(tt_mb)
+        yield from map(_analyze_job, jobs)
+        return
+    chunks = iter(lambda: list(islice(jobs, chunksize)), [])
+    with multiprocessing.Pool(processes, initializer=_init_worker, initargs=(tt_mb,)) as pool:
+        # Pool.imap would drain the whole input into its task queue up front
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.apply_async(_analyze_chunk, (chunk,)))
+            if len(pending) >= 2 * processes:
+                yield from pending.popleft().get()
+        while pending:
+            yield from pending.popleft().get()
+
+
+# ---------------- BENCHMARK ----------------
+def _sample_fens(count: int, seed: int = 11):
+    import random
+    rng = random.Random(seed)
+    fens = []
+    game = ChessBoard()
+    while len(fens) < count:
+        moves = game.get_legal_moves(game.turn)
+        if not moves or game.fullmove_number > 60:
+            game = ChessBoard()
+            continue
+        game.make_move(*rng.choice(moves))
+        fens.append(game.to_fen())
+    return fens
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Measure how analyze_many scales with worker processes.")
+    parser.add_argument("--positions", type=int, default=400)
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--chunksize", type=int, default=8)
+    parser.add_argument("--processes", type=int, nargs="*",
+                        help="worker counts to try (default: 1, 2, 4, ... up to the core count)")
+    args = parser.parse_args(argv)
+
+    counts = args.processes
+    if not counts:
+        counts, n = [], 1
+        while n < (os.cpu_count() or 1):
+            counts.append(n)
+            n *= 2
+        counts.append(os.cpu_count() or 1)
+    fens = _sample_fens(args.positions)
+
+    baseline = None
+    cores = os.cpu_count() or 1
+    print(f"{args.positions} positions, depth {args.depth}, {cores} cores")
+    print(f"{'processes':>10}{'seconds':>10}{'pos/s':>10}{'speedup':>10}{'efficiency':>12}")
+    for processes in counts:
+        t0 = time.perf_counter()
+        for _ in analyze_many(fens, depth=args.depth, processes=processes, chunksize=args.chunksize):
+            pass
+        elapsed = time.perf_counter() - t0
+        rate = len(fens) / elapsed
+        baseline = baseline or rate
+        speedup = rate / baseline
+        print(f"{processes:>10}{elapsed:>10.2f}{rate:>10.1f}{speedup:>10.2f}x"
+              f"{speedup / processes:>11.0%}")
+    # the best a pool can do is min(processes, cores) times the serial rate
+    ideal = min(processes, cores)
+    print(f"scaling: {speedup:.2f}x with {processes} processes, {speedup / ideal:.0%} of the {ideal}x "
+          f"this machine allows" + ("" if processes <= cores else f" (only {cores} cores)"))
+
+
+if __name__ == "__main__":
+    main()
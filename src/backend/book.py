@@ -0,0 +1,164 @@
+"""Opening book: a sorted file of fixed 16-byte records, probed through mmap.
+
+The record layout follows Polyglot: big-endian key (8 bytes), move (2),
+weight (2) and learn (4, unused), sorted by key. The key is ChessBoard's own
+zobrist_key and the move uses tt.encode_move, so books are built with this
+module rather than taken from other Polyglot tools. Opening a book maps the
+file and reads nothing; each probe is a binary search over the records.
+
+    python -m src.backend.book build data/openings.pgn --output data/book.bin
+    python -m src.backend.book probe --fen "<fen>"
+"""
+import mmap
+import os
+import random
+import struct
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.backend.game import ChessBoard, square_name
+from src.backend.pgn import read_pgn, replay
+from src.backend.tt import decode_move, encode_move
+
+RECORD = struct.Struct(">QHHI")   # key, move, weight, learn
+DEFAULT_BOOK = os.path.normpath(os.path.join(os.path.dirname(__file__), "..", "..", "data", "book.bin"))
+BOOK_PLIES = 20   # plies of each game that go into a book
+
+Square = Tuple[int, int]
+Move = Tuple[Square, Square, Optional[str]]
+
+
+class OpeningBook:
+    def __init__(self, path: str = DEFAULT_BOOK):
+        self.path = path
+        with open(path, "rb") as handle:
+            size = os.fstat(handle.fileno()).st_size
+            if size % RECORD.size:
+                raise ValueError(f"{path}: size {size} is not a multiple of {RECORD.size}")
+            # an empty file cannot be mapped
+            self._data = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self._count = size // RECORD.size
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+
+    def entries(self, key: int) -> List[Tuple[Move, int]]:
+        """(move, weight) pairs stored for key, heaviest first."""
+        data, unpack = self._data, RECORD.unpack_from
+        lo, hi = 0, self._count
+        while lo < hi:   # first record with a key >= key
+            mid = (lo + hi) // 2
+            if unpack(data, mid * RECORD.size)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        found = []
+        while lo < self._count:
+            record_key, move, weight, _ = unpack(data, lo * RECORD.size)
+            if record_key != key:
+                break
+            found.append((decode_move(move), weight))
+            lo += 1
+        return found
+
+    def choose(self, game: ChessBoard, rng: Optional[random.Random] = None) -> Optional[Move]:
+        """A book move for the side to move: weighted random with rng, else the heaviest. None if out of book."""
+        legal = game.legal_moves()
+        candidates = [(move, weight) for move, weight in self.entries(game.zobrist_key)
+                      if move and (move[0], move[1]) in legal]   # guard against key collisions
+        if not candidates:
+            return None
+        if rng is None:
+            return candidates[0][0]
+        return rng.choices([m for m, _ in candidates], weights=[w or 1 for _, w in candidates])[0]
+
+
+def load_book(path: str = DEFAULT_BOOK) -> Optional[OpeningBook]:
+    """The book at path, or None if there is no such file."""
+    return OpeningBook(path) if os.path.exists(path) else None
+
+
+# ---------------- BUILDING ----------------
+def build_book(pgn_paths: Iterable[str], output: str, plies: int = BOOK_PLIES, min_weight: int = 1) -> int:
+    """Write a book from the first `plies` plies of every game; returns the number of records.
+
+    As in Polyglot, a move scores 2 for a win of the side that played it, 1
+    for a draw or unknown result and 0 for a loss, summed over games.
+    """
+    weights: Dict[Tuple[int, int], int] = {}
+    for path in pgn_paths:
+        for headers, san_moves in read_pgn(path):
+            result, fen = headers.get("Result", "*"), headers.get("FEN")
+            first = ChessBoard.from_fen(fen) if fen else ChessBoard()
+            key, white = first.zobrist_key, first.turn == "white"
+            try:
+                for game, (start, end, promotion) in replay(san_moves[:plies], fen):
+                    won = "1-0" if white else "0-1"
+                    score = 2 if result == won else 0 if result in ("1-0", "0-1") else 1
+                    entry = (key, encode_move(start, end, promotion))
+                    weights[entry] = weights.get(entry, 0) + score
+                    key, white = game.zobrist_key, not white
+            except ValueError:
+                continue   # keep the plies before an illegal move
+    records = sorted(((key, move, weight) for (key, move), weight in weights.items() if weight >= min_weight),
+                     key=lambda r: (r[0], -r[2]))
+    scale = max((w for _, _, w in records), default=0) / 0xFFFF
+    with open(output, "wb") as handle:
+        for key, move, weight in records:
+            if scale > 1:
+                weight = max(1, int(weight / scale))
+            handle.write(RECORD.pack(key, move, weight, 0))
+    return len(records)
+
+
+# ---------------- COMMAND LINE ----------------
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Build or probe an opening book.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="build a book from PGN files")
+    build.add_argument("pgn", nargs="+")
+    build.add_argument("--output", default=DEFAULT_BOOK)
+    build.add_argument("--plies", type=int, default=BOOK_PLIES)
+    build.add_argument("--min-weight", type=int, default=1)
+    probe = commands.add_parser("probe", help="list the book moves for a position")
+    probe.add_argument("--book", default=DEFAULT_BOOK)
+    probe.add_argument("--fen", help="position (default: start position)")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        t0 = time.perf_counter()
+        count = build_book(args.pgn, args.output, args.plies, args.min_weight)
+        print(f"{count} records, {count * RECORD.size} bytes written to {args.output} "
+              f"in {time.perf_counter() - t0:.2f}s")
+        return
+
+    game = ChessBoard.from_fen(args.fen) if args.fen else ChessBoard()
+    t0 = time.perf_counter()
+    with OpeningBook(args.book) as book:
+        opened = time.perf_counter() - t0
+        entries = book.entries(game.zobrist_key)
+        t0 = time.perf_counter()
+        for _ in range(10000):
+            book.entries(game.zobrist_key)
+        probe_time = (time.perf_counter() - t0) / 10000
+        print(f"{len(book)} records; open {opened * 1e6:.0f}us, probe {probe_time * 1e6:.1f}us")
+    total = sum(weight for _, weight in entries) or 1
+    for (start, end, promotion), weight in entries:
+        print(f"{square_name(start)}{square_name(end)}{promotion or ''}  weight {weight}  {weight / total:.0%}")
+    if not entries:
+        print("out of book")
+
+
+if __name__ == "__main__":
+    main()
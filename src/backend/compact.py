@@ -0,0 +1,268 @@
+"""Compact board storage for ChessBoard.
+
+PackedBoard keeps the 64 squares in a single bytearray, one byte per square,
+and exposes it through row views so board[row][col] reads and writes work the
+same as on the list-of-lists board. pack_position/unpack_position turn a whole
+position into a 66 byte string for keeping large position sets in memory or
+sending them between processes.
+
+Row views cost a Python call per square access, so ChessBoard's hot paths
+(attack tests and move generation) skip them and index the bytearray directly
+with the flat-square tables and functions below; packed boards generate and
+play moves at about the list board's rate or better.
+
+The real memory saving is pack(): about 107 bytes per position. A live packed
+ChessBoard saves only about 4% over a list one (~5.3 vs ~5.6 KB), since its
+piece lists, undo stack and caches dwarf the squares themselves.
+
+Run ``python -m src.backend.compact`` for a memory and throughput comparison.
+"""
+from typing import List, Optional, Tuple
+
+PIECES = "PNBRQKpnbrqk"
+PIECE_CODES = {p: i + 1 for i, p in enumerate(PIECES)}
+PIECE_CODES[""] = 0
+PIECE_CODES[None] = 0
+PIECE_SYMBOLS = ("",) + tuple(PIECES)
+CASTLING_BITS = (("K", 1), ("Q", 2), ("k", 4), ("q", 8))
+PACKED_SIZE = 66
+NO_SQUARE = 0xFF
+
+
+class PackedRow:
+    """One rank of a PackedBoard, indexed by column."""
+    __slots__ = ("_squares", "_offset")
+
+    def __init__(self, squares: bytearray, offset: int):
+        self._squares = squares
+        self._offset = offset
+
+    def __getitem__(self, col: int) -> str:
+        return PIECE_SYMBOLS[self._squares[self._offset + col]]
+
+    def __setitem__(self, col: int, piece: Optional[str]):
+        self._squares[self._offset + col] = PIECE_CODES[piece]
+
+    def __len__(self) -> int:
+        return 8
+
+    def __iter__(self):
+        return (PIECE_SYMBOLS[code] for code in self._squares[self._offset:self._offset + 8])
+
+    def __eq__(self, other) -> bool:
+        return list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
+class PackedBoard(tuple):
+    """8 PackedRow views over one 64 byte bytearray."""
+
+    def __new__(cls, rows: Optional[List[List[str]]] = None):
+        squares = bytearray(64)
+        if rows is not None:
+            for r, row in enumerate(rows):
+                for c, piece in enumerate(row):
+                    squares[r*8 + c] = PIECE_CODES[piece]
+        board = super().__new__(cls, (PackedRow(squares, r*8) for r in range(8)))
+        board.squares = squares
+        return board
+
+    def to_rows(self) -> List[List[str]]:
+        return [list(row) for row in self]
+
+
+# ---------------- FLAT-SQUARE MOVE GENERATION ----------------
+# Square indices are row*8 + col; piece codes 1-6 are white, 7-12 black.
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)   # (code - 1) % 6
+SQUARES = tuple(divmod(i, 8) for i in range(64))   # index -> (row, col)
+
+
+def _flat_offsets(offsets):
+    return tuple(tuple((r+dr)*8 + c+dc for dr, dc in offsets if 0 <= r+dr < 8 and 0 <= c+dc < 8)
+                 for r, c in SQUARES)
+
+
+def _flat_rays(directions):
+    table = []
+    for r, c in SQUARES:
+        rays = []
+        for dr, dc in directions:
+            rr, cc, ray = r+dr, c+dc, []
+            while 0 <= rr < 8 and 0 <= cc < 8:
+                ray.append(rr*8 + cc)
+                rr += dr; cc += dc
+            if ray:
+                rays.append(tuple(ray))
+        table.append(tuple(rays))
+    return tuple(table)
+
+
+KNIGHT_TARGETS = _flat_offsets(((-2,-1),(-2,1),(-1,-2),(-1,2),(1,-2),(1,2),(2,-1),(2,1)))
+KING_TARGETS = _flat_offsets(((-1,-1),(-1,0),(-1,1),(0,-1),(0,1),(1,-1),(1,0),(1,1)))
+WHITE_PAWN_SOURCES = _flat_offsets(((1,-1),(1,1)))     # squares a white pawn attacks this one from
+BLACK_PAWN_SOURCES = _flat_offsets(((-1,-1),(-1,1)))
+ROOK_LINES = _flat_rays(((-1,0),(1,0),(0,-1),(0,1)))
+BISHOP_LINES = _flat_rays(((-1,-1),(-1,1),(1,-1),(1,1)))
+SLIDER_LINES = {BISHOP: BISHOP_LINES, ROOK: ROOK_LINES,
+                QUEEN: tuple(ROOK_LINES[i] + BISHOP_LINES[i] for i in range(64))}
+
+
+def square_attacked(squares: bytearray, index: int, by_white: bool) -> bool:
+    """ChessBoard.is_square_attacked on the bytearray: looks outwards from the square."""
+    base = 0 if by_white else 6
+    pawn, knight, bishop, rook, queen, king = base+1, base+2, base+3, base+4, base+5, base+6
+    for i in (WHITE_PAWN_SOURCES if by_white else BLACK_PAWN_SOURCES)[index]:
+        if squares[i] == pawn: return True
+    for i in KNIGHT_TARGETS[index]:
+        if squares[i] == knight: return True
+    for i in KING_TARGETS[index]:
+        if squares[i] == king: return True
+    for ray in ROOK_LINES[index]:
+        for i in ray:
+            p = squares[i]
+            if p:
+                if p == rook or p == queen: return True
+                break
+    for ray in BISHOP_LINES[index]:
+        for i in ray:
+            p = squares[i]
+            if p:
+                if p == bishop or p == queen: return True
+                break
+    return False
+
+
+def pseudo_legal_moves(squares: bytearray, starts, white: bool, en_passant: Optional[Tuple[int,int]]):
+    """Yield (start, end) squares as (row, col) for the pieces on `starts`, ignoring king safety.
+
+    Same moves as ChessBoard._pseudo_legal_moves except castling, which the
+    caller adds because its rules live in ChessBoard._is_legal_move.
+    """
+    ep = en_passant[0]*8 + en_passant[1] if en_passant else -1
+    forward, home_row = (-8, 6) if white else (8, 1)
+    for start in starts:
+        s = start[0]*8 + start[1]
+        kind = (squares[s] - 1) % 6
+        if kind == PAWN:
+            e = s + forward
+            if not 0 <= e < 64:
+                continue
+            if not squares[e]:
+                yield start, SQUARES[e]
+                if start[0] == home_row and not squares[e + forward]:
+                    yield start, SQUARES[e + forward]
+            # a white pawn on s attacks the squares a black pawn would attack s from, and the other way round
+            for e in (BLACK_PAWN_SOURCES if white else WHITE_PAWN_SOURCES)[s]:
+                target = squares[e]
+                if target:
+                    if (target > 6) == white:
+                        yield start, SQUARES[e]
+                elif e == ep:
+                    yield start, SQUARES[e]
+        elif kind == KNIGHT or kind == KING:
+            for e in (KNIGHT_TARGETS if kind == KNIGHT else KING_TARGETS)[s]:
+                target = squares[e]
+                if not target or (target > 6) == white:
+                    yield start, SQUARES[e]
+        else:
+            for ray in SLIDER_LINES[kind][s]:
+                for e in ray:
+                    target = squares[e]
+                    if target:
+                        if (target > 6) == white:
+                            yield start, SQUARES[e]
+                        break
+                    yield start, SQUARES[e]
+
+
+def pack_position(board, turn: str, castling_rights: dict, en_passant: Optional[Tuple[int,int]]) -> bytes:
+    """Encode a position as 64 square codes, a flags byte and an en passant byte."""
+    squares = getattr(board, "squares", None)
+    if squares is None:
+        squares = bytes(PIECE_CODES[p] for row in board for p in row)
+    flags = 0 if turn == "white" else 16
+    for right, bit in CASTLING_BITS:
+        if castling_rights.get(right):
+            flags |= bit
+    ep = NO_SQUARE if en_passant is None else en_passant[0]*8 + en_passant[1]
+    return bytes(squares) + bytes((flags, ep))
+
+
+def unpack_position(data: bytes):
+    """Inverse of pack_position: (rows, turn, castling_rights, en_passant)."""
+    if len(data) != PACKED_SIZE:
+        raise ValueError(f"packed position must be {PACKED_SIZE} bytes, got {len(data)}")
+    rows = [[PIECE_SYMBOLS[data[r*8 + c]] for c in range(8)] for r in range(8)]
+    flags, ep = data[64], data[65]
+    turn = "black" if flags & 16 else "white"
+    castling_rights = {right: bool(flags & bit) for right, bit in CASTLING_BITS}
+    en_passant = None if ep == NO_SQUARE else divmod(ep, 8)
+    return rows, turn, castling_rights, en_passant
+
+
+# ---------------- BENCHMARK ----------------
+def _sample_positions(count: int, seed: int = 3):
+    import random
+    from src.backend.game import ChessBoard
+    rng = random.Random(seed)
+    positions = []
+    game = ChessBoard()
+    while len(positions) < count:
+        moves = game.get_legal_moves(game.turn)
+        if not moves or len(game._pieces["white"]) + len(game._pieces["black"]) < 8:
+            game = ChessBoard()
+            continue
+        game.move_piece(*rng.choice(moves))
+        positions.append(game.pack())
+    return positions
+
+
+def _measure_memory(build, count: int) -> float:
+    import tracemalloc
+    tracemalloc.start()
+    kept = [build() for _ in range(count)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return size / count
+
+
+def main():
+    import time
+    from src.backend.game import ChessBoard
+    positions = _sample_positions(2000)
+
+    rows = unpack_position(positions[0])[0]
+    print(f"{'backend':<12}{'board B':>10}{'game B':>10}{'movegen/s':>12}{'moves/s':>10}")
+    results = {}
+    for name, compact in (("list", False), ("packed", True)):
+        boards = [ChessBoard.from_packed(p, compact=compact) for p in positions]
+        board_only = _measure_memory(lambda: PackedBoard(rows) if compact else [list(r) for r in rows], 2000)
+        per_position = _measure_memory(lambda: ChessBoard.from_packed(positions[0], compact=compact), 2000)
+
+        t0 = time.perf_counter()
+        generated = [b.get_legal_moves(b.turn) for b in boards]
+        movegen_rate = len(boards) / (time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        made = 0
+        for b, moves in zip(boards, generated):
+            if moves:
+                b.move_piece(*moves[0]); made += 1
+        move_rate = made / (time.perf_counter() - t0)
+        print(f"{name:<12}{board_only:>10.0f}{per_position:>10.0f}{movegen_rate:>12.0f}{move_rate:>10.0f}")
+        results[name] = (board_only, per_position, movegen_rate, move_rate)
+
+    packed = _measure_memory(lambda: bytes(bytearray(positions[0])), 2000)
+    print(f"{'pack()':<12}{packed:>10.0f}{packed:>10.0f}{'-':>12}{'-':>10}")
+    ratios = [p / l for p, l in zip(results["packed"], results["list"])]
+    print(f"{'packed/list':<12}" + "".join(f"{r:>{w}.0%}" for r, w in zip(ratios, (10, 10, 12, 10))))
+    _, game_mem, movegen, moves = ratios
+    print(f"a live packed board takes {game_mem:.0%} of a list board's memory, pack() {packed:.0f} B a position; "
+          f"packed generates moves at {movegen:.0%} and plays them at {moves:.0%} of the list rate")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Streaming EPD reader and writer.
+
+An EPD line is the first four FEN fields followed by semicolon-terminated
+operations, e.g.
+
+    rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 bm e5; id "open.1";
+
+read_epd yields one (ChessBoard, operations) pair per line, so files of any
+size are processed with one position in memory at a time.
+"""
+from typing import Dict, Iterator, Optional, TextIO, Tuple, Union
+
+from src.backend.game import ChessBoard
+
+
+def _split_operations(text: str) -> Dict[str, str]:
+    """'bm e4; id "a;b";' → {"bm": "e4", "id": "a;b"}.
+
+    Quoted operands may hold semicolons. The last operation may be left
+    unterminated, as in perft suites written ';D1 20 ;D2 400'.
+    """
+    operations = {}
+    current, quoted = "", False
+    for ch in text + ";":
+        if ch == '"':
+            quoted = not quoted
+        elif ch == ";" and not quoted:
+            current = current.strip()
+            if current:
+                opcode, _, operand = current.partition(" ")
+                operations[opcode] = operand.strip().replace('"', "")
+            current = ""
+            continue
+        current += ch
+    if quoted:
+        raise ValueError(f"unterminated EPD string in {text!r}")
+    return operations
+
+
+def parse_epd(line: str, compact: bool = False) -> Tuple[ChessBoard, Dict[str, str]]:
+    """Parse one EPD line. The hmvc and fmvn operations set the move counters."""
+    fields = line.split(None, 4)
+    if len(fields) < 4:
+        raise ValueError(f"EPD needs at least 4 fields: {line!r}")
+    operations = _split_operations(fields[4]) if len(fields) == 5 else {}
+    game = ChessBoard.from_fen(" ".join(fields[:4]), compact=compact)
+    if "hmvc" in operations:
+        game.halfmove_clock = int(operations["hmvc"])
+    if "fmvn" in operations:
+        game.fullmove_number = int(operations["fmvn"])
+    return game, operations
+
+
+def read_epd(source: Union[str, TextIO], compact: bool = False) -> Iterator[Tuple[ChessBoard, Dict[str, str]]]:
+    """Yield (board, operations) for each position in a path or open text file.
+
+    Blank lines and lines starting with '#' are skipped. Errors name the line number.
+    """
+    if isinstance(source, str):
+        with open(source, encoding="utf-8") as handle:
+            yield from read_epd(handle, compact)
+        return
+    for number, line in enumerate(source, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            yield parse_epd(line, compact)
+        except ValueError as exc:
+            raise ValueError(f"line {number}: {exc}") from None
+
+
+def format_epd(game: ChessBoard, operations: Optional[Dict[str, str]] = None) -> str:
+    """One EPD line for game; id/comment operands and any holding ';' are quoted."""
+    parts = [game.to_fen(counters=False)]
+    for opcode, operand in (operations or {}).items():
+        if operand == "":
+            parts.append(f"{opcode};")
+        elif ";" in operand or opcode == "id" or (opcode[0] == "c" and opcode[1:].isdigit()):
+            parts.append(f'{opcode} "{operand}";')
+        else:
+            parts.append(f"{opcode} {operand};")
+    return " ".join(parts)
+
+
+def write_epd(records, target: TextIO):
+    """Write (board, operations) pairs, e.g. straight from read_epd, one line each."""
+    for game, operations in records:
+        target.write(format_epd(game, operations) + "\n")
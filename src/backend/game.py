@@ -1,11 +1,154 @@
+from itertools import chain
 from typing import List, Tuple, Optional
+from src.backend.compact import PackedBoard, pack_position, unpack_position, pseudo_legal_moves, square_attacked
+from src.backend.zobrist import PIECE_KEYS, SIDE_KEY, CASTLING_KEYS, en_passant_key, position_key
+
+FILES = "abcdefgh"
+
+def square_name(square: Tuple[int,int]) -> str:
+    """(row, col) → algebraic name, e.g. (6, 4) → "e2"."""
+    return FILES[square[1]] + str(8 - square[0])
+
+def parse_square(name: str) -> Tuple[int,int]:
+    """Algebraic name → (row, col), e.g. "e2" → (6, 4)."""
+    if len(name) != 2 or name[0] not in FILES or name[1] not in "12345678":
+        raise ValueError(f"not a square: {name!r}")
+    return 8 - int(name[1]), FILES.index(name[0])
+
+# ---------------- MOVE TABLES ----------------
+KNIGHT_OFFSETS = ((-2,-1),(-2,1),(-1,-2),(-1,2),(1,-2),(1,2),(2,-1),(2,1))
+KING_OFFSETS = ((-1,-1),(-1,0),(-1,1),(0,-1),(0,1),(1,-1),(1,0),(1,1))
+ROOK_DIRECTIONS = ((-1,0),(1,0),(0,-1),(0,1))
+BISHOP_DIRECTIONS = ((-1,-1),(-1,1),(1,-1),(1,1))
+
+def _offset_table(offsets):
+    """For every square, the on-board squares reached by a fixed set of offsets."""
+    return [[tuple((r+dr, c+dc) for dr, dc in offsets if 0 <= r+dr < 8 and 0 <= c+dc < 8)
+             for c in range(8)] for r in range(8)]
+
+def _ray_table(directions):
+    """For every square, one tuple of squares per direction, ordered outwards."""
+    table = []
+    for r in range(8):
+        row = []
+        for c in range(8):
+            rays = []
+            for dr, dc in directions:
+                ray = []
+                rr, cc = r+dr, c+dc
+                while 0 <= rr < 8 and 0 <= cc < 8:
+                    ray.append((rr, cc))
+                    rr += dr; cc += dc
+                if ray:
+                    rays.append(tuple(ray))
+            row.append(tuple(rays))
+        table.append(row)
+    return table
+
+KNIGHT_MOVES = _offset_table(KNIGHT_OFFSETS)
+KING_MOVES = _offset_table(KING_OFFSETS)
+ROOK_RAYS = _ray_table(ROOK_DIRECTIONS)
+BISHOP_RAYS = _ray_table(BISHOP_DIRECTIONS)
+QUEEN_RAYS = [[ROOK_RAYS[r][c] + BISHOP_RAYS[r][c] for c in range(8)] for r in range(8)]
+SLIDER_RAYS = {"r": ROOK_RAYS, "b": BISHOP_RAYS, "q": QUEEN_RAYS}
+
+POSITION_CACHE_SIZE = 256   # positions remembered by legal_moves/has_legal_moves/checkmate_status
+
 
 class ChessBoard:
-    def __init__(self):
-        self.board = self._create_starting_board()
+    debug = False   # recompute the Zobrist key after every make/unmake and compare
+
+    def __init__(self, compact: bool = False):
+        self._compact = compact      # store squares in a PackedBoard instead of lists
         self.turn = "white"
         self.en_passant = None       # square for en passant (row,col) or None
         self.castling_rights = {"K": True, "Q": True, "k": True, "q": True}  # rights for both sides
+        self.halfmove_clock = 0      # plies since the last capture or pawn move
+        self.fullmove_number = 1
+        self.board = self._create_starting_board()
+
+    # ---------------- PIECE TRACKING ----------------
+    @property
+    def board(self) -> List[List[str]]:
+        return self._board
+
+    @board.setter
+    def board(self, rows: List[List[str]]):
+        if self._compact and not isinstance(rows, PackedBoard):
+            rows = PackedBoard(rows)
+        self._board = rows
+        self._undo = []   # make_move records, newest last
+        self.resync()
+
+    def resync(self):
+        """Rebuild king locations, piece lists and the Zobrist key from scratch.
+
+        Moves keep these up to date; call this after editing board, turn,
+        castling_rights or en_passant by hand. get_legal_moves notices squares
+        written directly with board[r][c] = ... and resyncs by itself, but
+        zobrist_key and the per-position cache behind legal_moves,
+        has_legal_moves and checkmate_status only follow an explicit resync.
+        """
+        self.zobrist_key = self.compute_zobrist_key()
+        self._position_cache = {}
+        self._repetitions = {self.zobrist_key: 1}   # Zobrist key -> times reached since the last resync
+        self._kings = {"white": None, "black": None}
+        self._pieces = {"white": set(), "black": set()}
+        for r, row in enumerate(self._board):
+            for c, piece in enumerate(row):
+                if piece:
+                    color = "white" if piece.isupper() else "black"
+                    self._pieces[color].add((r, c))
+                    if piece in ["K","k"]:
+                        self._kings[color] = (r, c)
+
+    def _index_is_stale(self) -> bool:
+        """True if the piece lists no longer match the board, i.e. it was edited by hand."""
+        board = self._board
+        if self._compact:
+            return self._packed_index_is_stale(board.squares)
+        tracked = 0
+        for color, white in (("white", True), ("black", False)):
+            for r, c in self._pieces[color]:
+                piece = board[r][c]
+                if not piece or piece.isupper() != white:
+                    return True
+            tracked += len(self._pieces[color])
+        # every tracked square holds a piece of its colour, so only untracked pieces are left to find
+        return tracked != sum(map(bool, chain.from_iterable(board)))
+
+    def _packed_index_is_stale(self, squares: bytearray) -> bool:
+        for color, white in (("white", True), ("black", False)):
+            for r, c in self._pieces[color]:
+                code = squares[r*8 + c]
+                if not code or (code <= 6) != white:
+                    return True
+        return len(self._pieces["white"]) + len(self._pieces["black"]) != 64 - squares.count(0)
+
+    def compute_zobrist_key(self) -> int:
+        return position_key(self._board, self.turn, self.castling_rights, self.en_passant)
+
+    def _verify_key(self):
+        expected = self.compute_zobrist_key()
+        if self.zobrist_key != expected:
+            raise AssertionError(f"zobrist key {self.zobrist_key:016x} != recomputed {expected:016x}")
+
+    def piece_squares(self, color: str) -> List[Tuple[int,int]]:
+        """Squares holding color's pieces, read from the piece list rather than a board scan."""
+        white = color == "white"
+        board = self._board
+        return [(r, c) for r, c in self._pieces[color] if board[r][c] and board[r][c].isupper() == white]
+
+    def piece_count(self) -> int:
+        """Pieces of both sides, kings included, from the piece lists."""
+        return len(self._pieces["white"]) + len(self._pieces["black"])
+
+    def _track_move(self, color: str, start: Tuple[int,int], end: Tuple[int,int]):
+        pieces = self._pieces[color]
+        pieces.discard(start)
+        pieces.add(end)
+        if self._kings[color] == start:
+            self._kings[color] = end
 
     def _create_starting_board(self) -> List[List[str]]:
         return [
@@ -19,13 +162,107 @@ class ChessBoard:
             ["R","N","B","Q","K","B","N","R"]
         ]
 
+    # ---------------- COMPACT ENCODING ----------------
+    def pack(self) -> bytes:
+        """Encode board, turn, castling rights and en passant in 66 bytes."""
+        return pack_position(self._board, self.turn, self.castling_rights, self.en_passant)
+
+    @classmethod
+    def from_packed(cls, data: bytes, compact: bool = False) -> "ChessBoard":
+        game = cls.__new__(cls)
+        game._compact = compact
+        rows, game.turn, game.castling_rights, game.en_passant = unpack_position(data)
+        game.halfmove_clock, game.fullmove_number = 0, 1
+        game.board = rows
+        return game
+
+    def copy(self) -> "ChessBoard":
+        """An independent board in the same position, with the same move history (undo, repetitions)."""
+        game = self.__class__.__new__(self.__class__)
+        game.__dict__.update(self.__dict__)
+        game._board = PackedBoard(self._board) if self._compact else [row[:] for row in self._board]
+        game.castling_rights = dict(self.castling_rights)
+        game._undo = list(self._undo)
+        game._repetitions = dict(self._repetitions)
+        game._kings = dict(self._kings)
+        game._pieces = {color: set(squares) for color, squares in self._pieces.items()}
+        # keep what is known about the current position (e.g. its legal moves), not the whole cache
+        entry = self._position_cache.get(self.zobrist_key)
+        game._position_cache = {self.zobrist_key: dict(entry)} if entry is not None else {}
+        return game
+
+    # ---------------- FEN ----------------
+    @classmethod
+    def from_fen(cls, fen: str, compact: bool = False) -> "ChessBoard":
+        """Build a board from a FEN string. The move counters may be omitted (EPD style)."""
+        fields = fen.split()
+        if len(fields) not in (4, 6):
+            raise ValueError(f"FEN needs 4 or 6 fields: {fen!r}")
+        placement, side, castling, ep = fields[:4]
+        ranks = placement.split("/")
+        if len(ranks) != 8:
+            raise ValueError(f"FEN placement needs 8 ranks: {placement!r}")
+        rows = []
+        for rank in ranks:
+            row = []
+            for ch in rank:
+                if ch in "12345678":
+                    row.extend([""] * int(ch))
+                elif ch in "PNBRQKpnbrqk":
+                    row.append(ch)
+                else:
+                    raise ValueError(f"bad FEN piece {ch!r} in {rank!r}")
+            if len(row) != 8:
+                raise ValueError(f"FEN rank {rank!r} does not have 8 squares")
+            rows.append(row)
+        if side not in ("w", "b"):
+            raise ValueError(f"bad FEN side to move: {side!r}")
+        if castling != "-" and (not castling or set(castling) - set("KQkq")):
+            raise ValueError(f"bad FEN castling field: {castling!r}")
+
+        en_passant = None if ep == "-" else parse_square(ep)
+        if en_passant:
+            # the square a pawn of the side not to move just skipped: empty, with that pawn in front of it
+            row, pawn, pawn_row = (2, "p", 3) if side == "w" else (5, "P", 4)
+            if en_passant[0] != row or rows[row][en_passant[1]] or rows[pawn_row][en_passant[1]] != pawn:
+                raise ValueError(f"bad FEN en passant square {ep!r}: no {pawn!r} has just passed it")
+
+        game = cls.__new__(cls)
+        game._compact = compact
+        game.turn = "white" if side == "w" else "black"
+        game.castling_rights = {right: right in castling for right in "KQkq"}
+        game.en_passant = en_passant
+        game.halfmove_clock = int(fields[4]) if len(fields) == 6 else 0
+        game.fullmove_number = int(fields[5]) if len(fields) == 6 else 1
+        game.board = rows
+        return game
+
+    def to_fen(self, counters: bool = True) -> str:
+        """FEN of the current position; counters=False leaves out the move counters (EPD style)."""
+        ranks = []
+        for row in self._board:
+            rank, empty = "", 0
+            for piece in row:
+                if piece:
+                    if empty:
+                        rank += str(empty); empty = 0
+                    rank += piece
+                else:
+                    empty += 1
+            ranks.append(rank + (str(empty) if empty else ""))
+        castling = "".join(right for right in "KQkq" if self.castling_rights.get(right)) or "-"
+        ep = square_name(self.en_passant) if self.en_passant else "-"
+        fen = f"{'/'.join(ranks)} {'w' if self.turn == 'white' else 'b'} {castling} {ep}"
+        if counters:
+            fen += f" {self.halfmove_clock} {self.fullmove_number}"
+        return fen
+
     def get_piece(self, row: int, col: int) -> str:
         return self.board[row][col]
 
     def move_piece(self, start: Tuple[int, int], end: Tuple[int, int], promotion: Optional[str] = None) -> Optional[str]:
         """Attempt to move a piece. Returns captured piece if success, None if illegal."""
         sr, sc = start
-        er, ec = end
         piece = self.board[sr][sc]
 
         if not piece or not self._is_correct_turn(piece):
@@ -33,70 +270,167 @@ class ChessBoard:
         if not self._is_legal_move(piece, start, end):
             return None
 
-        captured = self.board[er][ec]
-        # Special: en passant capture
-        if piece in ["P","p"] and (er,ec) == self.en_passant:
-            if piece == "P":
-                captured = "p"
-                self.board[er+1][ec] = ""  # remove black pawn
-            else:
-                captured = "P"
-                self.board[er-1][ec] = ""  # remove white pawn
+        color = self.turn
+        captured = self.make_move(start, end, promotion)
+        # Illegal if own king is left in check → take it back
+        if self.is_in_check(color):
+            self.unmake_move()
+            return None
+        return captured
+
+    # ---------------- MAKE / UNMAKE ----------------
+    def make_move(self, start: Tuple[int, int], end: Tuple[int, int], promotion: Optional[str] = None) -> str:
+        """Play a move without validating it and push an undo record.
 
-        # Save current en passant
+        Meant for moves from get_legal_moves; returns the captured piece.
+        """
+        board = self._board
+        sr, sc = start
+        er, ec = end
+        piece = board[sr][sc]
+        color = self.turn
+        enemy = "black" if color == "white" else "white"
+        cr = self.castling_rights
+        rights = (cr["K"], cr["Q"], cr["k"], cr["q"])
         prev_ep = self.en_passant
-        self.en_passant = None
+        prev_key = key = self.zobrist_key
+        if prev_ep is not None:
+            key ^= en_passant_key(board, color, prev_ep)   # read before the board changes
+
+        captured = board[er][ec]
+        captured_sq = end
+        # Special: en passant capture
+        if piece in ["P","p"] and end == prev_ep:
+            captured_sq = (sr, ec)
+            captured = "p" if piece == "P" else "P"
+            board[sr][ec] = ""
+        if captured:
+            self._pieces[enemy].discard(captured_sq)
+            key ^= PIECE_KEYS[captured][captured_sq[0]*8 + captured_sq[1]]
 
-        self.board[er][ec] = piece
-        self.board[sr][sc] = ""
+        board[er][ec] = piece
+        board[sr][sc] = ""
+        self._track_move(color, start, end)
 
         # Pawn double move → set en passant
+        self.en_passant = None
         if piece == "P" and sr == 6 and er == 4:
             self.en_passant = (5, sc)
         if piece == "p" and sr == 1 and er == 3:
             self.en_passant = (2, sc)
 
         # Castling
+        rook_move = None
         if piece in ["K","k"] and abs(ec - sc) == 2:
             if ec == 6:  # kingside
-                self.board[er][5] = self.board[er][7]
-                self.board[er][7] = ""
+                rook_move = ((er, 7), (er, 5))
             elif ec == 2:  # queenside
-                self.board[er][3] = self.board[er][0]
-                self.board[er][0] = ""
+                rook_move = ((er, 0), (er, 3))
+            if rook_move:
+                (rr, rc), (tr, tc) = rook_move
+                rook = board[tr][tc] = board[rr][rc]
+                board[rr][rc] = ""
+                self._track_move(color, rook_move[0], rook_move[1])
+                if rook:
+                    key ^= PIECE_KEYS[rook][rr*8 + rc] ^ PIECE_KEYS[rook][tr*8 + tc]
 
         # Promotion
         if piece == "P" and er == 0:
-            self.board[er][ec] = promotion.upper() if promotion else "Q"
+            board[er][ec] = promotion.upper() if promotion else "Q"
         elif piece == "p" and er == 7:
-            self.board[er][ec] = promotion.lower() if promotion else "q"
-
-        # Illegal if still in check → undo
-        if self.is_in_check(self.turn):
-            # undo move
-            self.board[sr][sc] = piece
-            self.board[er][ec] = captured
-            if piece in ["K","k"] and abs(ec - sc) == 2:
-                if ec == 6:  # kingside
-                    self.board[er][7] = self.board[er][5]; self.board[er][5] = ""
-                else:
-                    self.board[er][0] = self.board[er][3]; self.board[er][3] = ""
-            self.en_passant = prev_ep
-            return None
+            board[er][ec] = promotion.lower() if promotion else "q"
 
         # Update castling rights
-        if piece == "K": self.castling_rights["K"] = self.castling_rights["Q"] = False
-        if piece == "k": self.castling_rights["k"] = self.castling_rights["q"] = False
+        if piece == "K": cr["K"] = cr["Q"] = False
+        if piece == "k": cr["k"] = cr["q"] = False
         if piece == "R":
-            if sr==7 and sc==0: self.castling_rights["Q"] = False
-            if sr==7 and sc==7: self.castling_rights["K"] = False
+            if sr==7 and sc==0: cr["Q"] = False
+            if sr==7 and sc==7: cr["K"] = False
         if piece == "r":
-            if sr==0 and sc==0: self.castling_rights["q"] = False
-            if sr==0 and sc==7: self.castling_rights["k"] = False
+            if sr==0 and sc==0: cr["q"] = False
+            if sr==0 and sc==7: cr["k"] = False
+        # a rook captured on its home square
+        if end == (7, 0): cr["Q"] = False
+        if end == (7, 7): cr["K"] = False
+        if end == (0, 0): cr["q"] = False
+        if end == (0, 7): cr["k"] = False
+
+        # Zobrist: moved piece, castling rights lost, en passant file if capturable, side to move
+        key ^= PIECE_KEYS[piece][sr*8 + sc] ^ PIECE_KEYS[board[er][ec]][er*8 + ec]
+        for right, before in zip("KQkq", rights):
+            if before and not cr[right]:
+                key ^= CASTLING_KEYS[right]
+        if self.en_passant is not None:
+            key ^= en_passant_key(board, enemy, self.en_passant)
+        self.zobrist_key = key = key ^ SIDE_KEY
+        self._repetitions[key] = self._repetitions.get(key, 0) + 1
 
+        self._undo.append((start, end, piece, captured, captured_sq, rook_move, rights, prev_ep, prev_key,
+                           self.halfmove_clock))
+        self.halfmove_clock = 0 if captured or piece in ["P","p"] else self.halfmove_clock + 1
+        if color == "black":
+            self.fullmove_number += 1
         self._switch_turn()
+        if self.debug:
+            self._verify_key()
         return captured
 
+    def last_move_squares(self) -> List[Tuple[int,int]]:
+        """Squares the last make_move changed (and its unmake_move will change back); empty before any move.
+
+        Start and end, plus the captured pawn's square for en passant and the
+        rook's squares for castling, so a view can redraw just these.
+        """
+        if not self._undo:
+            return []
+        start, end, _, _, captured_sq, rook_move, *_ = self._undo[-1]
+        squares = [start, end]
+        if captured_sq != end:
+            squares.append(captured_sq)
+        if rook_move:
+            squares.extend(rook_move)
+        return squares
+
+    def unmake_move(self) -> Optional[Tuple[Tuple[int,int], Tuple[int,int]]]:
+        """Take back the last make_move. Returns its (start, end), or None if there is nothing to undo."""
+        if not self._undo:
+            return None
+        start, end, piece, captured, captured_sq, rook_move, rights, prev_ep, key, self.halfmove_clock = self._undo.pop()
+        board = self._board
+        count = self._repetitions.get(self.zobrist_key, 0)
+        if count > 1:
+            self._repetitions[self.zobrist_key] = count - 1
+        else:
+            self._repetitions.pop(self.zobrist_key, None)
+        self._switch_turn()
+        color = self.turn
+        if color == "black":
+            self.fullmove_number -= 1
+        enemy = "black" if color == "white" else "white"
+
+        if rook_move:
+            (rr, rc), (tr, tc) = rook_move
+            board[rr][rc] = board[tr][tc]
+            board[tr][tc] = ""
+            self._track_move(color, rook_move[1], rook_move[0])
+        board[start[0]][start[1]] = piece
+        self._track_move(color, end, start)
+        if captured_sq == end:
+            board[end[0]][end[1]] = captured
+        else:   # en passant: the destination was empty and the pawn stood beside it
+            board[end[0]][end[1]] = ""
+            board[captured_sq[0]][captured_sq[1]] = captured
+        if captured:
+            self._pieces[enemy].add(captured_sq)
+
+        cr = self.castling_rights
+        cr["K"], cr["Q"], cr["k"], cr["q"] = rights
+        self.en_passant = prev_ep
+        self.zobrist_key = key
+        if self.debug:
+            self._verify_key()
+        return start, end
+
     # ---------------- TURN CONTROL ----------------
     def _is_correct_turn(self, piece: str) -> bool:
         return (piece.isupper() and self.turn == "white") or (piece.islower() and self.turn == "black")
@@ -153,66 +487,272 @@ class ChessBoard:
             if max(abs(dr),abs(dc))==1: return True
             # castling
             if sr==er and abs(dc)==2:
-                side = "K" if piece=="K" else "k" if dc>0 else "Q" if piece=="K" else "q"
-                if not self.castling_rights.get(side): return False
+                white = piece == "K"
+                if start != ((7, 4) if white else (0, 4)): return False
                 if dc>0:  # kingside
+                    side, rook_col = ("K" if white else "k"), 7
                     if self.board[sr][sc+1] or self.board[sr][sc+2]: return False
                 else:     # queenside
+                    side, rook_col = ("Q" if white else "q"), 0
                     if self.board[sr][sc-1] or self.board[sr][sc-2] or self.board[sr][sc-3]: return False
-                return not self.is_in_check(self.turn)
+                if not self.castling_rights.get(side): return False
+                if self.board[sr][rook_col] != ("R" if white else "r"): return False
+                # the king may not castle out of or through check
+                enemy = "black" if white else "white"
+                return not self.is_square_attacked(start, enemy) and not self.is_square_attacked((sr, sc + dc//2), enemy)
         return False
 
     # ---------------- CHECK & CHECKMATE ----------------
     def find_king(self, color: str) -> Optional[Tuple[int,int]]:
         king = "K" if color == "white" else "k"
-        for r in range(8):
-            for c in range(8):
-                if self.board[r][c] == king:
-                    return (r,c)
+        pos = self._kings[color]
+        if pos and self._board[pos[0]][pos[1]] == king:
+            return pos
+        # board was edited by hand: fall back to a scan
+        for r, row in enumerate(self._board):
+            for c, piece in enumerate(row):
+                if piece == king:
+                    self._kings[color] = (r, c)
+                    return (r, c)
         return None
 
     def is_in_check(self, color: str) -> bool:
         king_pos = self.find_king(color)
         if not king_pos:
             return False
-        for r in range(8):
-            for c in range(8):
-                piece = self.board[r][c]
-                if piece and ((piece.isupper() and color=="black") or (piece.islower() and color=="white")):
-                    if self._is_legal_move(piece,(r,c),king_pos):
-                        return True
-        return False
+        return self.is_square_attacked(king_pos, "black" if color == "white" else "white")
 
     def has_legal_moves(self, color: str) -> bool:
-        return bool(self.get_legal_moves(color))
+        """Stops at the first legal move; cached for the side to move."""
+        if color != self.turn:
+            return next(self._iter_legal_moves(color), None) is not None
+        entry = self._cached_position()
+        if "any" not in entry:
+            moves = entry.get("moves")
+            entry["any"] = bool(moves) if moves is not None else next(self._iter_legal_moves(color), None) is not None
+        return entry["any"]
 
     def checkmate_status(self) -> Optional[str]:
-        if self.is_in_check(self.turn) and not self.has_legal_moves(self.turn):
-            return f"Checkmate! { 'White' if self.turn=='black' else 'Black' } wins."
-        elif not self.is_in_check(self.turn) and not self.has_legal_moves(self.turn):
-            return "Stalemate! It's a draw."
-        return None
+        """Result message if the game is over, else None.
+
+        Mate and stalemate come first, then insufficient material, the
+        fifty-move rule and threefold repetition.
+        """
+        entry = self._cached_position()
+        if "status" not in entry:
+            status = None
+            if not self.has_legal_moves(self.turn):
+                if self.is_in_check(self.turn):
+                    status = f"Checkmate! { 'White' if self.turn=='black' else 'Black' } wins."
+                else:
+                    status = "Stalemate! It's a draw."
+            elif self.insufficient_material():
+                status = "Draw by insufficient material."
+            entry["status"] = status
+        if entry["status"] is None:
+            if self.halfmove_clock >= 100:
+                return "Draw by the fifty-move rule."
+            if self.repetition_count() >= 3:
+                return "Draw by threefold repetition."
+        return entry["status"]
+
+    def repetition_count(self) -> int:
+        """Times the current position has occurred, counting castling rights and any possible en passant capture."""
+        return self._repetitions.get(self.zobrist_key, 0)
+
+    def insufficient_material(self) -> bool:
+        """Neither side can mate: bare kings, one minor piece, or only bishops all on one square colour."""
+        knights, bishops, bishop_colours = 0, 0, set()
+        for color in ("white", "black"):
+            for r, c in self.piece_squares(color):
+                kind = self._board[r][c].lower()
+                if kind in "pqr":
+                    return False
+                if kind == "n":
+                    knights += 1
+                elif kind == "b":
+                    bishops += 1
+                    bishop_colours.add((r + c) % 2)
+        return knights + bishops <= 1 or not knights and len(bishop_colours) == 1
+
+    def is_square_attacked(self, square: Tuple[int,int], by_color: str) -> bool:
+        """True if any piece of by_color attacks square, looking outwards from the square."""
+        r, c = square
+        if self._compact:
+            return square_attacked(self._board.squares, r*8 + c, by_color == "white")
+        board = self.board
+        if by_color == "white":
+            pawn, knight, bishop, rook, queen, king = "P", "N", "B", "R", "Q", "K"
+            pr = r + 1   # white pawns capture towards row 0
+        else:
+            pawn, knight, bishop, rook, queen, king = "p", "n", "b", "r", "q", "k"
+            pr = r - 1
+        if 0 <= pr < 8:
+            if c > 0 and board[pr][c-1] == pawn: return True
+            if c < 7 and board[pr][c+1] == pawn: return True
+        for rr, cc in KNIGHT_MOVES[r][c]:
+            if board[rr][cc] == knight: return True
+        for rr, cc in KING_MOVES[r][c]:
+            if board[rr][cc] == king: return True
+        for ray in ROOK_RAYS[r][c]:
+            for rr, cc in ray:
+                p = board[rr][cc]
+                if p:
+                    if p == rook or p == queen: return True
+                    break
+        for ray in BISHOP_RAYS[r][c]:
+            for rr, cc in ray:
+                p = board[rr][cc]
+                if p:
+                    if p == bishop or p == queen: return True
+                    break
+        return False
+
+    # ---------------- MOVE GENERATION ----------------
+    def _pseudo_legal_moves(self, color: str):
+        """Yield (start, end) for every move of color that ignores king safety; the piece lists must be in sync."""
+        board = self._board
+        white = color == "white"
+        if self._compact:
+            yield from pseudo_legal_moves(board.squares, tuple(self._pieces[color]), white, self.en_passant)
+            start = self._kings[color]
+            if start and board[start[0]][start[1]] == ("K" if white else "k"):
+                sr, sc = start
+                for ec in (sc+2, sc-2):
+                    if 0 <= ec < 8 and self._is_legal_move(board[sr][sc], start, (sr, ec)):
+                        yield start, (sr, ec)
+            return
+        for start in tuple(self._pieces[color]):
+            sr, sc = start
+            piece = board[sr][sc]
+            kind = piece.lower()
+
+            if kind == "p":
+                direction = -1 if white else 1
+                er = sr + direction
+                if not 0 <= er < 8:
+                    continue
+                if not board[er][sc]:
+                    yield start, (er, sc)
+                    if sr == (6 if white else 1) and not board[er+direction][sc]:
+                        yield start, (er+direction, sc)
+                for ec in (sc-1, sc+1):
+                    if 0 <= ec < 8:
+                        target = board[er][ec]
+                        if target:
+                            if target.isupper() != white:
+                                yield start, (er, ec)
+                        elif (er, ec) == self.en_passant:
+                            yield start, (er, ec)
+
+            elif kind == "n" or kind == "k":
+                for er, ec in (KNIGHT_MOVES if kind == "n" else KING_MOVES)[sr][sc]:
+                    target = board[er][ec]
+                    if not target or target.isupper() != white:
+                        yield start, (er, ec)
+                if kind == "k":
+                    # castling keeps its rules in _is_legal_move
+                    for ec in (sc+2, sc-2):
+                        if 0 <= ec < 8 and self._is_legal_move(piece, start, (sr, ec)):
+                            yield start, (sr, ec)
+
+            else:
+                for ray in SLIDER_RAYS[kind][sr][sc]:
+                    for end in ray:
+                        target = board[end[0]][end[1]]
+                        if target:
+                            if target.isupper() != white:
+                                yield start, end
+                            break
+                        yield start, end
 
     # ---------------- HINT SUPPORT ----------------
     def get_legal_moves(self, color: str):
-        moves = []
-        for sr in range(8):
-            for sc in range(8):
-                piece = self.board[sr][sc]
-                if not piece: continue
-                if (piece.isupper() and color=="white") or (piece.islower() and color=="black"):
-                    for er in range(8):
-                        for ec in range(8):
-                            if self._is_legal_move(piece,(sr,sc),(er,ec)):
-                                captured = self.board[er][ec]
-                                self.board[er][ec] = piece
-                                self.board[sr][sc] = ""
-                                in_check = self.is_in_check(color)
-                                self.board[sr][sc] = piece
-                                self.board[er][ec] = captured
-                                if not in_check:
-                                    moves.append(((sr,sc),(er,ec)))
-        return moves
+        """All ((sr,sc),(er,ec)) moves for color that do not leave its king in check."""
+        return list(self._iter_legal_moves(color))
+
+    def legal_moves(self) -> Tuple[Tuple[Tuple[int,int], Tuple[int,int]], ...]:
+        """get_legal_moves for the side to move, generated once per position.
+
+        The cache is keyed on the Zobrist key, so make/unmake need no
+        bookkeeping; resync() (and so hand edits followed by resync) empties it.
+        """
+        entry = self._cached_position()
+        if "moves" not in entry:
+            entry["moves"] = tuple(self._iter_legal_moves(self.turn))
+        return entry["moves"]
+
+    def _cached_position(self) -> dict:
+        cache = self._position_cache
+        entry = cache.get(self.zobrist_key)
+        if entry is None:
+            if len(cache) >= POSITION_CACHE_SIZE:
+                cache.clear()
+            entry = cache[self.zobrist_key] = {}
+        return entry
+
+    def _iter_legal_moves(self, color: str):
+        if self._index_is_stale():
+            self.resync()
+        if self._compact:
+            yield from self._iter_packed_legal_moves(color)
+            return
+        board = self.board
+        enemy = "black" if color == "white" else "white"
+        king = "K" if color == "white" else "k"
+        king_pos = self.find_king(color)
+        ep = self.en_passant
+        for start, end in self._pseudo_legal_moves(color):
+            sr, sc = start
+            er, ec = end
+            piece = board[sr][sc]
+            captured = board[er][ec]
+            board[er][ec] = piece
+            board[sr][sc] = ""
+            if end == ep and piece in ["P","p"]:
+                # en passant also clears the captured pawn's square
+                ep_pawn = board[sr][ec]
+                board[sr][ec] = ""
+                in_check = king_pos is not None and self.is_square_attacked(king_pos, enemy)
+                board[sr][ec] = ep_pawn
+            elif piece == king:
+                in_check = self.is_square_attacked(end, enemy)
+            else:
+                in_check = king_pos is not None and self.is_square_attacked(king_pos, enemy)
+            board[sr][sc] = piece
+            board[er][ec] = captured
+            if not in_check:
+                yield start, end
+
+    def _iter_packed_legal_moves(self, color: str):
+        """_iter_legal_moves for the compact backend: the trial moves are made on the bytearray."""
+        squares = self._board.squares
+        white = color == "white"
+        pawn, king = (1, 6) if white else (7, 12)
+        king_pos = self.find_king(color)
+        king_sq = king_pos[0]*8 + king_pos[1] if king_pos else None
+        ep = self.en_passant
+        for start, end in self._pseudo_legal_moves(color):
+            s = start[0]*8 + start[1]
+            e = end[0]*8 + end[1]
+            piece = squares[s]
+            captured = squares[e]
+            squares[e] = piece
+            squares[s] = 0
+            if end == ep and piece == pawn:
+                ep_sq = start[0]*8 + end[1]
+                ep_pawn = squares[ep_sq]
+                squares[ep_sq] = 0
+                in_check = king_sq is not None and square_attacked(squares, king_sq, not white)
+                squares[ep_sq] = ep_pawn
+            elif piece == king:
+                in_check = square_attacked(squares, e, not white)
+            else:
+                in_check = king_sq is not None and square_attacked(squares, king_sq, not white)
+            squares[s] = piece
+            squares[e] = captured
+            if not in_check:
+                yield start, end
 
     # ---------------- DEBUG ----------------
     def display(self):
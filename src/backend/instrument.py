@@ -0,0 +1,228 @@
+"""Opt-in call counters and timers for ChessBoard's hot methods.
+
+enable() replaces the methods in METHODS on the ChessBoard class with
+wrappers that count calls and time spent (including nested calls), and
+counts hits of the per-position cache and of transposition-table probes.
+A position-cache lookup is one call of legal_moves, has_legal_moves (for
+the side to move) or checkmate_status from outside those three, and a hit
+is one answered from the cache; their calls into each other are not
+counted again. disable() puts the original methods back, so with instrumentation
+off nothing is wrapped and nothing is paid. Nodes are make_move calls;
+nodes per second are over the time since enable() or reset().
+
+    with instrumented():
+        perft(game, 3)
+    print(snapshot_json())
+
+The command line profiles a perft or search run with cProfile, prints the
+hottest functions, then repeats the run with the counters on:
+
+    python -m src.backend.instrument perft --position kiwipete --depth 3
+    python -m src.backend.instrument search --time 2 --top 30 --json profile.json
+"""
+import contextlib
+import functools
+import json
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from src.backend.game import ChessBoard
+from src.backend.tt import TranspositionTable
+
+METHODS = ("move_piece", "_is_legal_move", "is_in_check", "get_legal_moves", "legal_moves",
+           "has_legal_moves", "checkmate_status", "is_square_attacked", "make_move", "unmake_move")
+CACHED = {"legal_moves": ("moves",), "has_legal_moves": ("any", "moves"),   # method -> cache fields that answer it
+          "checkmate_status": ("status",)}
+
+_originals: Dict[tuple, object] = {}   # (class, name) -> original function while enabled
+_calls: Dict[str, int] = {}
+_seconds: Dict[str, float] = {}
+_caches: Dict[str, List[int]] = {"position": [0, 0], "tt": [0, 0]}   # name -> [hits, lookups]
+_started: Optional[float] = None
+_stopped: Optional[float] = None
+_lookup = threading.local()   # .active: inside a counted position-cache lookup on this thread
+
+
+def _timed(name: str, method):
+    calls, seconds, clock = _calls, _seconds, time.perf_counter
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        t0 = clock()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            seconds[name] += clock() - t0
+            calls[name] += 1
+    return wrapper
+
+
+def _position_lookup(method, fields):
+    counts = _caches["position"]
+
+    @functools.wraps(method)
+    def wrapper(self, *args):
+        if getattr(_lookup, "active", False) or args and args[0] != self.turn:
+            return method(self, *args)   # nested in a counted lookup, or not cached (the other side's moves)
+        counts[1] += 1
+        entry = self._position_cache.get(self.zobrist_key)
+        if entry is not None and any(field in entry for field in fields):
+            counts[0] += 1
+        _lookup.active = True
+        try:
+            return method(self, *args)
+        finally:
+            _lookup.active = False
+    return wrapper
+
+
+def _tt_probe(method):
+    counts = _caches["tt"]
+
+    @functools.wraps(method)
+    def wrapper(self, key):
+        entry = method(self, key)
+        counts[1] += 1
+        if entry is not None:
+            counts[0] += 1
+        return entry
+    return wrapper
+
+
+def _patch(cls, name: str, wrapper):
+    _originals[(cls, name)] = cls.__dict__[name]
+    setattr(cls, name, wrapper)
+
+
+# ---------------- SWITCHING ----------------
+def enabled() -> bool:
+    return bool(_originals)
+
+
+def reset():
+    """Zero the counters and restart the clock."""
+    global _started, _stopped
+    for name in _calls:
+        _calls[name], _seconds[name] = 0, 0.0
+    for counts in _caches.values():
+        counts[:] = [0, 0]
+    _started, _stopped = time.perf_counter(), None
+
+
+def enable(methods: Iterable[str] = METHODS):
+    """Start counting (from zero) calls to the given ChessBoard methods."""
+    if enabled():
+        disable()
+    _calls.clear()
+    _seconds.clear()
+    methods = list(methods)
+    for name in methods + [name for name in CACHED if name not in methods]:
+        method = getattr(ChessBoard, name)
+        if name in CACHED:
+            method = _position_lookup(method, CACHED[name])
+        if name in methods:
+            _calls[name], _seconds[name] = 0, 0.0
+            method = _timed(name, method)
+        _patch(ChessBoard, name, method)
+    _patch(TranspositionTable, "probe", _tt_probe(TranspositionTable.probe))
+    reset()
+
+
+def disable():
+    """Put the original methods back; the counters keep their values for snapshot()."""
+    global _stopped
+    for (cls, name), method in _originals.items():
+        setattr(cls, name, method)
+    _originals.clear()
+    _stopped = time.perf_counter()
+
+
+@contextlib.contextmanager
+def instrumented(methods: Iterable[str] = METHODS):
+    enable(methods)
+    try:
+        yield
+    finally:
+        disable()
+
+
+# ---------------- REPORTING ----------------
+def snapshot() -> dict:
+    """Counters so far as plain data: per-method calls and time, nodes per second, cache hit rates."""
+    end = _stopped if _stopped is not None else time.perf_counter()
+    elapsed = end - _started if _started is not None else 0.0
+    nodes = _calls.get("make_move", 0)
+    return {
+        "enabled": enabled(),
+        "elapsed": elapsed,
+        "nodes": nodes,
+        "nps": nodes / elapsed if elapsed > 0 else 0.0,
+        "methods": {name: {"calls": calls, "seconds": _seconds[name],
+                           "us_per_call": _seconds[name] / calls * 1e6 if calls else 0.0}
+                    for name, calls in _calls.items()},
+        "caches": {name: {"lookups": lookups, "hits": hits, "hit_rate": hits / lookups if lookups else 0.0}
+                   for name, (hits, lookups) in _caches.items()},
+    }
+
+
+def snapshot_json(indent: Optional[int] = 2) -> str:
+    return json.dumps(snapshot(), indent=indent)
+
+
+def format_snapshot(data: dict) -> str:
+    lines = [f"{data['nodes']} nodes in {data['elapsed']:.2f}s, {data['nps']:.0f} nodes/s",
+             f"{'method':<20}{'calls':>12}{'seconds':>10}{'us/call':>10}"]
+    for name, row in sorted(data["methods"].items(), key=lambda item: -item[1]["seconds"]):
+        if row["calls"]:
+            lines.append(f"{name:<20}{row['calls']:>12}{row['seconds']:>10.3f}{row['us_per_call']:>10.2f}")
+    for name, row in data["caches"].items():
+        lines.append(f"{name} cache: {row['hits']}/{row['lookups']} hits ({row['hit_rate']:.1%})")
+    return "\n".join(lines)
+
+
+# ---------------- COMMAND LINE ----------------
+def main(argv=None):
+    import argparse
+    import cProfile
+    import pstats
+    from src.backend.perft import POSITIONS, perft
+    from src.backend.search import Searcher
+
+    parser = argparse.ArgumentParser(description="Profile a perft or search run and report hot methods.")
+    parser.add_argument("--top", type=int, default=20, help="functions to list from the profile")
+    parser.add_argument("--sort", default="tottime", choices=["tottime", "cumulative", "ncalls"])
+    parser.add_argument("--json", help="also write the counter snapshot here, to compare across releases")
+    commands = parser.add_subparsers(dest="command", required=True)
+    perft_parser = commands.add_parser("perft", help="profile perft")
+    perft_parser.add_argument("--position", choices=sorted(POSITIONS), default="kiwipete")
+    perft_parser.add_argument("--depth", type=int, default=3)
+    search_parser = commands.add_parser("search", help="profile a search")
+    search_parser.add_argument("--fen", help="position (default: kiwipete)")
+    search_parser.add_argument("--time", type=float, default=2.0)
+    search_parser.add_argument("--depth", type=int)
+    args = parser.parse_args(argv)
+
+    if args.command == "perft":
+        fen = POSITIONS[args.position][0]
+        run = lambda: perft(ChessBoard.from_fen(fen), args.depth)
+    else:
+        fen = args.fen or POSITIONS["kiwipete"][0]
+        run = lambda: Searcher().search(ChessBoard.from_fen(fen), args.time, args.depth)
+
+    profile = cProfile.Profile()
+    profile.runcall(run)
+    pstats.Stats(profile).strip_dirs().sort_stats(args.sort).print_stats(args.top)
+
+    with instrumented():
+        run()
+    data = snapshot()
+    print(format_snapshot(data))
+    if args.json:
+        data["run"] = {key: value for key, value in vars(args).items() if key not in ("json", "top", "sort")}
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump(data, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
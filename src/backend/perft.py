@@ -0,0 +1,116 @@
+"""Perft: count the leaf nodes of the legal move tree to a fixed depth.
+
+Node counts for the standard test positions are known exactly, so perft is
+both a correctness check for the rules in ChessBoard and a benchmark for
+move generation. Promotions count once per piece (Q, R, B, N).
+
+    python -m src.backend.perft                 # all standard positions
+    python -m src.backend.perft --depth 4 --position kiwipete
+    python -m src.backend.perft --fen "<fen>" --depth 3 --divide
+    python -m src.backend.perft --epd perftsuite.epd --depth 3   # ';D1 20 ;D2 400 ...' lines
+"""
+import argparse
+import time
+from typing import Dict, Tuple
+
+from src.backend.epd import read_epd
+from src.backend.game import ChessBoard, square_name
+
+PROMOTIONS = "qrbn"
+
+# name: (fen, node counts for depth 1, 2, ...)
+POSITIONS = {
+    "start": ("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+              (20, 400, 8902, 197281, 4865609)),
+    "kiwipete": ("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+                 (48, 2039, 97862, 4085603)),
+    "position3": ("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+                  (14, 191, 2812, 43238, 674624)),
+    "position4": ("r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+                  (6, 264, 9467, 422333)),
+    "position5": ("rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+                  (44, 1486, 62379, 2103487)),
+    "position6": ("r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+                  (46, 2079, 89890, 3894594)),
+}
+
+
+def _is_promotion(game: ChessBoard, start: Tuple[int,int], end: Tuple[int,int]) -> bool:
+    return end[0] in (0, 7) and game.get_piece(*start) in ["P","p"]
+
+
+def perft(game: ChessBoard, depth: int) -> int:
+    """Number of leaf nodes `depth` plies below the current position."""
+    if depth == 0:
+        return 1
+    moves = game.get_legal_moves(game.turn)
+    if depth == 1:
+        return sum(len(PROMOTIONS) if _is_promotion(game, s, e) else 1 for s, e in moves)
+    nodes = 0
+    for start, end in moves:
+        for promotion in (PROMOTIONS if _is_promotion(game, start, end) else (None,)):
+            game.make_move(start, end, promotion)
+            nodes += perft(game, depth - 1)
+            game.unmake_move()
+    return nodes
+
+
+def divide(game: ChessBoard, depth: int) -> Dict[str, int]:
+    """perft split by root move, keyed "e2e4" / "a7a8q", for hunting down a wrong count."""
+    counts = {}
+    for start, end in game.get_legal_moves(game.turn):
+        for promotion in (PROMOTIONS if _is_promotion(game, start, end) else (None,)):
+            game.make_move(start, end, promotion)
+            counts[square_name(start) + square_name(end) + (promotion or "")] = perft(game, depth - 1)
+            game.unmake_move()
+    return counts
+
+
+def _epd_counts(operations) -> Tuple[int, ...]:
+    counts = []
+    while f"D{len(counts) + 1}" in operations:
+        counts.append(int(operations[f"D{len(counts) + 1}"]))
+    return tuple(counts)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Perft correctness and speed check for ChessBoard.")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--position", choices=sorted(POSITIONS), action="append",
+                        help="standard position to run (default: all)")
+    parser.add_argument("--fen", help="run a custom position instead")
+    parser.add_argument("--epd", help="run every position of an EPD perft suite (D1, D2, ... operations)")
+    parser.add_argument("--divide", action="store_true", help="print per-move counts")
+    args = parser.parse_args(argv)
+
+    if args.fen:
+        runs = [("custom", args.fen, ())]
+    elif args.epd:
+        runs = ((ops.get("id", f"#{n}"), game.to_fen(), _epd_counts(ops))
+                for n, (game, ops) in enumerate(read_epd(args.epd), 1))
+    else:
+        runs = [(name, *POSITIONS[name]) for name in (args.position or POSITIONS)]
+
+    failed = False
+    print(f"{'position':<12}{'depth':>6}{'nodes':>12}{'expected':>12}{'seconds':>10}{'nodes/s':>10}")
+    for name, fen, expected_counts in runs:
+        game = ChessBoard.from_fen(fen)
+        t0 = time.perf_counter()
+        if args.divide:
+            counts = divide(game, args.depth)
+            for move in sorted(counts):
+                print(f"  {move}: {counts[move]}")
+            nodes = sum(counts.values())
+        else:
+            nodes = perft(game, args.depth)
+        elapsed = time.perf_counter() - t0
+        expected = expected_counts[args.depth - 1] if args.depth <= len(expected_counts) else None
+        status = "" if expected is None or nodes == expected else "  MISMATCH"
+        failed = failed or bool(status)
+        print(f"{name:<12}{args.depth:>6}{nodes:>12}{expected if expected is not None else '-':>12}"
+              f"{elapsed:>10.2f}{nodes / elapsed:>10.0f}{status}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
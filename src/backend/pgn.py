@@ -0,0 +1,255 @@
+"""SAN moves and streaming PGN reading/writing on top of ChessBoard.
+
+read_pgn is a generator: it parses one game at a time from a file, so archives
+of any size run in constant memory. replay plays a game's SAN moves through
+ChessBoard and raises ValueError on the first illegal or ambiguous move.
+
+    python -m src.backend.pgn games.pgn      # replay every game, report games/s
+"""
+import re
+import time
+from typing import Dict, Iterator, List, Optional, Sequence, TextIO, Tuple, Union
+
+from src.backend.game import ChessBoard, FILES, parse_square, square_name
+
+Square = Tuple[int, int]
+Move = Tuple[Square, Square, Optional[str]]   # start, end, promotion piece or None
+
+RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+SEVEN_TAG_ROSTER = ("Event", "Site", "Date", "Round", "White", "Black", "Result")
+
+_TOKEN = re.compile(r"\{[^}]*\}|;[^\n]*|\(|\)|\$\d+|1-0|0-1|1/2-1/2|\*|\d+\.+|[^\s{}();$]+")
+_HEADER = re.compile(r'\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+
+
+# ---------------- SAN ----------------
+def move_to_san(game: ChessBoard, start: Square, end: Square, promotion: Optional[str] = None,
+                legal_moves: Optional[List[Tuple[Square, Square]]] = None) -> str:
+    """SAN for a legal move in the current position, with +/# suffix."""
+    if legal_moves is None:
+        legal_moves = game.get_legal_moves(game.turn)
+    piece = game.get_piece(*start)
+    kind = piece.upper()
+    if kind == "K" and abs(end[1] - start[1]) == 2:
+        san = "O-O" if end[1] == 6 else "O-O-O"
+    elif kind == "P":
+        capture = start[1] != end[1]
+        san = (FILES[start[1]] + "x" if capture else "") + square_name(end)
+        if end[0] in (0, 7):
+            san += "=" + (promotion or "Q").upper()
+    else:
+        rivals = [s for s, e in legal_moves if e == end and s != start and game.get_piece(*s) == piece]
+        disambiguation = ""
+        if rivals:
+            if all(s[1] != start[1] for s in rivals):
+                disambiguation = FILES[start[1]]
+            elif all(s[0] != start[0] for s in rivals):
+                disambiguation = str(8 - start[0])
+            else:
+                disambiguation = square_name(start)
+        san = kind + disambiguation + ("x" if game.get_piece(*end) else "") + square_name(end)
+
+    game.make_move(start, end, promotion)
+    if game.is_in_check(game.turn):
+        san += "+" if game.get_legal_moves(game.turn) else "#"
+    game.unmake_move()
+    return san
+
+
+def parse_san(game: ChessBoard, san: str) -> Move:
+    """Resolve a SAN string against the legal moves of the side to move."""
+    text = san.rstrip("+#!?")
+    white = game.turn == "white"
+    legal = game.get_legal_moves(game.turn)
+
+    if text in ("O-O", "0-0", "O-O-O", "0-0-0"):
+        row = 7 if white else 0
+        move = ((row, 4), (row, 6 if len(text) == 3 else 2))
+        if move not in legal:
+            raise ValueError(f"illegal castling {san!r}")
+        return move[0], move[1], None
+
+    promotion = None
+    if "=" in text:
+        text, promotion = text.split("=", 1)
+    elif len(text) > 2 and text[-1] in "QRBN" and text[0] in FILES:
+        text, promotion = text[:-1], text[-1]
+    if promotion is not None and promotion.upper() not in "QRBN":
+        raise ValueError(f"bad promotion piece in {san!r}")
+
+    kind = text[0] if text[:1] in ("N", "B", "R", "Q", "K") else "P"
+    body = (text[1:] if kind != "P" else text).replace("x", "").replace("-", "")
+    try:
+        end = parse_square(body[-2:])
+    except ValueError:
+        raise ValueError(f"cannot read SAN {san!r}") from None
+    hint = body[:-2]
+    piece = kind if white else kind.lower()
+
+    matches = []
+    for start, target in legal:
+        if target != end or game.get_piece(*start) != piece:
+            continue
+        name = square_name(start)
+        if all(ch in name for ch in hint):
+            matches.append(start)
+    if len(matches) != 1:
+        raise ValueError(f"{'ambiguous' if matches else 'illegal'} move {san!r}")
+    if kind == "P" and end[0] in (0, 7):
+        promotion = (promotion or "Q").upper() if white else (promotion or "q").lower()
+    elif promotion is not None:
+        raise ValueError(f"promotion on a non-promoting move {san!r}")
+    return matches[0], end, promotion
+
+
+# ---------------- READING ----------------
+def _movetext_tokens(text: str) -> Iterator[str]:
+    """SAN tokens and the result marker, with comments, variations, NAGs and move numbers dropped."""
+    depth = 0
+    for token in _TOKEN.findall(text):
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth = max(depth - 1, 0)
+        elif depth or token[0] in "{;$" or token[0].isdigit() and token.endswith("."):
+            continue
+        else:
+            yield token
+
+
+def read_pgn(source: Union[str, TextIO]) -> Iterator[Tuple[Dict[str, str], List[str]]]:
+    """Yield (headers, san_moves) per game; the result is in headers["Result"]."""
+    if isinstance(source, str):
+        with open(source, encoding="utf-8", errors="replace") as handle:
+            yield from read_pgn(handle)
+        return
+
+    headers: Dict[str, str] = {}
+    movetext: List[str] = []
+    for line in source:
+        stripped = line.strip()
+        if stripped.startswith("[") and movetext:
+            # a header after movetext starts the next game
+            yield _finish_game(headers, movetext)
+            headers, movetext = {}, []
+        if stripped.startswith("[") and not movetext:
+            match = _HEADER.match(stripped)
+            if match:
+                headers[match.group(1)] = re.sub(r"\\(.)", r"\1", match.group(2))
+            continue
+        if stripped or movetext:
+            movetext.append(line)
+    if headers or "".join(movetext).strip():
+        yield _finish_game(headers, movetext)
+
+
+def _finish_game(headers: Dict[str, str], movetext: List[str]) -> Tuple[Dict[str, str], List[str]]:
+    moves = []
+    for token in _movetext_tokens("".join(movetext)):
+        if token in RESULTS:
+            headers.setdefault("Result", token)
+        else:
+            moves.append(token)
+    headers.setdefault("Result", "*")
+    return headers, moves
+
+
+def replay(san_moves: Sequence[str], fen: Optional[str] = None) -> Iterator[Tuple[ChessBoard, Move]]:
+    """Play san_moves from the start (or fen); yields (board, move) after each move."""
+    game = ChessBoard.from_fen(fen) if fen else ChessBoard()
+    for ply, san in enumerate(san_moves, 1):
+        try:
+            start, end, promotion = parse_san(game, san)
+        except ValueError as exc:
+            raise ValueError(f"ply {ply}: {exc}") from None
+        game.make_move(start, end, promotion)
+        yield game, (start, end, promotion)
+
+
+# ---------------- WRITING ----------------
+def result_from_status(status: Optional[str]) -> str:
+    """PGN result for a ChessBoard.checkmate_status() message."""
+    if not status:
+        return "*"
+    if "White wins" in status:
+        return "1-0"
+    if "Black wins" in status:
+        return "0-1"
+    return "1/2-1/2"
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def game_to_pgn(moves: Sequence[Tuple], headers: Optional[Dict[str, str]] = None,
+                fen: Optional[str] = None) -> str:
+    """PGN text for moves given as (start, end) or (start, end, promotion) tuples."""
+    game = ChessBoard.from_fen(fen) if fen else ChessBoard()
+    tags = {tag: "?" for tag in SEVEN_TAG_ROSTER}
+    tags["Date"] = time.strftime("%Y.%m.%d")
+    tags["Result"] = "*"
+    if fen:
+        tags["SetUp"], tags["FEN"] = "1", fen
+    tags.update(headers or {})
+
+    tokens = []
+    for ply, move in enumerate(moves, 1):
+        start, end = move[0], move[1]
+        promotion = move[2] if len(move) > 2 else None
+        legal = game.get_legal_moves(game.turn)
+        if (start, end) not in legal:
+            raise ValueError(f"illegal move {square_name(start)}{square_name(end)} at ply {ply}")
+        if game.turn == "white":
+            tokens.append(f"{game.fullmove_number}.")
+        elif not tokens:
+            tokens.append(f"{game.fullmove_number}...")
+        tokens.append(move_to_san(game, start, end, promotion, legal))
+        game.make_move(start, end, promotion)
+    tokens.append(tags["Result"])
+
+    lines, line = [], ""
+    for token in tokens:
+        if line and len(line) + 1 + len(token) > 79:
+            lines.append(line)
+            line = token
+        else:
+            line = f"{line} {token}" if line else token
+    lines.append(line)
+    header_text = "\n".join(f'[{tag} "{_escape(value)}"]' for tag, value in tags.items())
+    return f"{header_text}\n\n" + "\n".join(lines) + "\n"
+
+
+def write_pgn(games, target: TextIO):
+    """Write (moves, headers) pairs as consecutive PGN games."""
+    for moves, headers in games:
+        target.write(game_to_pgn(moves, headers) + "\n")
+
+
+# ---------------- BENCHMARK ----------------
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Replay every game of a PGN file through ChessBoard.")
+    parser.add_argument("pgn", help="PGN file to read")
+    parser.add_argument("--limit", type=int, help="stop after this many games")
+    args = parser.parse_args(argv)
+
+    games = plies = errors = 0
+    t0 = time.perf_counter()
+    for headers, san_moves in read_pgn(args.pgn):
+        games += 1
+        try:
+            for _ in replay(san_moves, headers.get("FEN")):
+                plies += 1
+        except ValueError as exc:
+            errors += 1
+            print(f"game {games} ({headers.get('White', '?')} - {headers.get('Black', '?')}): {exc}")
+        if args.limit and games >= args.limit:
+            break
+    elapsed = time.perf_counter() - t0
+    print(f"{games} games, {plies} plies, {errors} errors in {elapsed:.2f}s: "
+          f"{games / elapsed:.1f} games/s, {plies / elapsed:.0f} plies/s")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,385 @@
+"""Iterative-deepening alpha-beta search for hints and automated play.
+
+The evaluation is material plus piece-square tables, scored for the side to
+move. Moves are ordered previous-best first, then captures by MVV-LVA, then
+killer moves. A search stops at its time budget and returns the best move of
+the deepest completed iteration. With endgame tablebases, positions they
+cover are scored exactly instead of searched, and a covered root position
+is answered straight from the tables.
+
+    python -m src.backend.search [--fen FEN] [--time 2.0]
+"""
+import threading
+import time
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+from src.backend.game import ChessBoard, square_name
+from src.backend.tablebase import MAX_PIECES, Tablebases, load_tablebases
+from src.backend.tt import EXACT, LOWER, UPPER, TranspositionTable, decode_move, encode_move
+
+Square = Tuple[int, int]
+Move = Tuple[Square, Square]
+
+MATE = 100000
+MATE_BOUND = MATE - 1000   # scores beyond this are mates, stored in the TT relative to the node
+INFINITY = MATE + 1
+CHECK_EVERY = 1023   # nodes between clock checks (mask)
+DEFAULT_TT_MB = 16
+
+PIECE_VALUES = {"p": 100, "n": 320, "b": 330, "r": 500, "q": 900, "k": 0}
+
+# Piece-square tables from white's point of view, row 0 = rank 8.
+_PST = {
+    "p": [0, 0, 0, 0, 0, 0, 0, 0,
+          50, 50, 50, 50, 50, 50, 50, 50,
+          10, 10, 20, 30, 30, 20, 10, 10,
+          5, 5, 10, 25, 25, 10, 5, 5,
+          0, 0, 0, 20, 20, 0, 0, 0,
+          5, -5, -10, 0, 0, -10, -5, 5,
+          5, 10, 10, -20, -20, 10, 10, 5,
+          0, 0, 0, 0, 0, 0, 0, 0],
+    "n": [-50, -40, -30, -30, -30, -30, -40, -50,
+          -40, -20, 0, 0, 0, 0, -20, -40,
+          -30, 0, 10, 15, 15, 10, 0, -30,
+          -30, 5, 15, 20, 20, 15, 5, -30,
+          -30, 0, 15, 20, 20, 15, 0, -30,
+          -30, 5, 10, 15, 15, 10, 5, -30,
+          -40, -20, 0, 5, 5, 0, -20, -40,
+          -50, -40, -30, -30, -30, -30, -40, -50],
+    "b": [-20, -10, -10, -10, -10, -10, -10, -20,
+          -10, 0, 0, 0, 0, 0, 0, -10,
+          -10, 0, 5, 10, 10, 5, 0, -10,
+          -10, 5, 5, 10, 10, 5, 5, -10,
+          -10, 0, 10, 10, 10, 10, 0, -10,
+          -10, 10, 10, 10, 10, 10, 10, -10,
+          -10, 5, 0, 0, 0, 0, 5, -10,
+          -20, -10, -10, -10, -10, -10, -10, -20],
+    "r": [0, 0, 0, 0, 0, 0, 0, 0,
+          5, 10, 10, 10, 10, 10, 10, 5,
+          -5, 0, 0, 0, 0, 0, 0, -5,
+          -5, 0, 0, 0, 0, 0, 0, -5,
+          -5, 0, 0, 0, 0, 0, 0, -5,
+          -5, 0, 0, 0, 0, 0, 0, -5,
+          -5, 0, 0, 0, 0, 0, 0, -5,
+          0, 0, 0, 5, 5, 0, 0, 0],
+    "q": [-20, -10, -10, -5, -5, -10, -10, -20,
+          -10, 0, 0, 0, 0, 0, 0, -10,
+          -10, 0, 5, 5, 5, 5, 0, -10,
+          -5, 0, 5, 5, 5, 5, 0, -5,
+          0, 0, 5, 5, 5, 5, 0, -5,
+          -10, 5, 5, 5, 5, 5, 0, -10,
+          -10, 0, 5, 0, 0, 0, 0, -10,
+          -20, -10, -10, -5, -5, -10, -10, -20],
+    "k": [-30, -40, -40, -50, -50, -40, -40, -30,
+          -30, -40, -40, -50, -50, -40, -40, -30,
+          -30, -40, -40, -50, -50, -40, -40, -30,
+          -30, -40, -40, -50, -50, -40, -40, -30,
+          -20, -30, -30, -40, -40, -30, -30, -20,
+          -10, -20, -20, -20, -20, -20, -20, -10,
+          20, 20, 0, 0, 0, 0, 20, 20,
+          20, 30, 10, 0, 0, 10, 30, 20],
+}
+# the king walks to the centre once the heavy pieces are gone
+_KING_ENDGAME = [-50, -40, -30, -20, -20, -30, -40, -50,
+                 -30, -20, -10, 0, 0, -10, -20, -30,
+                 -30, -10, 20, 30, 30, 20, -10, -30,
+                 -30, -10, 30, 40, 40, 30, -10, -30,
+                 -30, -10, 30, 40, 40, 30, -10, -30,
+                 -30, -10, 20, 30, 30, 20, -10, -30,
+                 -30, -30, 0, 0, 0, 0, -30, -30,
+                 -50, -30, -30, -30, -30, -30, -30, -50]
+ENDGAME_MATERIAL = 1300   # non-pawn material per side at or below which the endgame king table applies
+
+
+def _square_values(table, value):
+    """{piece: [score per square index]} for both colours, black mirrored vertically."""
+    white = [value + table[i] for i in range(64)]
+    black = [value + table[(7 - i // 8) * 8 + i % 8] for i in range(64)]
+    return white, black
+
+
+SQUARE_VALUES = {}
+for _kind, _table in _PST.items():
+    SQUARE_VALUES[_kind.upper()], SQUARE_VALUES[_kind] = _square_values(_table, PIECE_VALUES[_kind])
+KING_ENDGAME_VALUES = dict(zip("Kk", _square_values(_KING_ENDGAME, 0)))
+
+
+def evaluate(game: ChessBoard) -> int:
+    """Static score in centipawns for the side to move."""
+    board = game.board
+    scores = {}
+    heavy = {}
+    for color in ("white", "black"):
+        score = material = 0
+        for r, c in game.piece_squares(color):
+            piece = board[r][c]
+            score += SQUARE_VALUES[piece][r*8 + c]
+            if piece not in "PpKk":
+                material += PIECE_VALUES[piece.lower()]
+        scores[color], heavy[color] = score, material
+    if heavy["white"] <= ENDGAME_MATERIAL and heavy["black"] <= ENDGAME_MATERIAL:
+        for color, king in (("white", "K"), ("black", "k")):
+            pos = game.find_king(color)
+            if pos:
+                i = pos[0]*8 + pos[1]
+                scores[color] += KING_ENDGAME_VALUES[king][i] - SQUARE_VALUES[king][i]
+    enemy = "black" if game.turn == "white" else "white"
+    return scores[game.turn] - scores[enemy]
+
+
+def _score_to_tt(score: int, ply: int) -> int:
+    """Mate scores count plies from the root; store them counted from this node instead."""
+    if score > MATE_BOUND:
+        return score + ply
+    if score < -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def _score_from_tt(score: int, ply: int) -> int:
+    if score > MATE_BOUND:
+        return score - ply
+    if score < -MATE_BOUND:
+        return score + ply
+    return score
+
+
+def _tablebase_score(wdl: int, plies: int, ply: int) -> int:
+    """A tablebase result as a search score at ply."""
+    if wdl > 0:
+        return MATE - ply - plies
+    if wdl < 0:
+        return -MATE + ply + plies
+    return 0
+
+
+class SearchResult(NamedTuple):
+    move: Optional[Move]      # None when the side to move has no legal moves
+    score: int                # centipawns for the side to move; |score| > MATE_BOUND means mate
+    depth: int                # deepest completed iteration
+    nodes: int
+    elapsed: float
+
+    @property
+    def nps(self) -> float:
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class SearchTimeout(Exception):
+    """Raised inside the tree when the time budget is spent or the search is stopped."""
+
+
+class Searcher:
+    """Reusable searcher.
+
+    Killer moves last for one search; the transposition table (tt_mb
+    megabytes, 0 to disable) is kept across searches, so repeated hints on
+    the same or related positions start from earlier work. tablebases, if
+    given, is probed at every node with few enough pieces.
+    """
+
+    def __init__(self, max_depth: int = 64, tt_mb: float = DEFAULT_TT_MB,
+                 tablebases: Optional[Tablebases] = None):
+        self.max_depth = max_depth
+        self.tt = TranspositionTable(tt_mb) if tt_mb else None
+        self.tablebases = tablebases
+        self.nodes = 0
+        self._deadline = None
+        self._stop: Optional[threading.Event] = None
+        self._killers: List[List[Optional[Move]]] = []
+
+    # ---------------- PUBLIC ----------------
+    def search(self, game: ChessBoard, time_limit: float = 1.0, max_depth: Optional[int] = None,
+               on_iteration: Optional[Callable[[SearchResult], None]] = None,
+               stop: Optional[threading.Event] = None) -> SearchResult:
+        """Search game (left unchanged) for up to time_limit seconds or max_depth plies.
+
+        Depth 1 always completes so there is a move to return, unless stop
+        is set (e.g. from another thread), which ends the search at the next
+        clock check: the result is then depth 0 with the first legal move.
+        on_iteration is called with the result of every completed depth.
+        """
+        max_depth = max_depth or self.max_depth
+        start = time.perf_counter()
+        self.nodes = 0
+        self._killers = [[None, None] for _ in range(max_depth + 64)]
+        self._deadline = None
+        self._stop = stop
+
+        moves = game.legal_moves()   # cached on the board and kept by copy(), so a hint reuses the UI's list
+        if not moves:
+            score = -MATE if game.is_in_check(game.turn) else 0
+            return SearchResult(None, score, 0, 0, time.perf_counter() - start)
+        if self.tablebases and game.piece_count() <= MAX_PIECES:
+            # moves here are (start, end) and promote to a queen, so the score is that of the best such move
+            best = self.tablebases.best_move_result(game, promotions="Q")
+            if best:   # depth 0: nothing was searched
+                move, result = best
+                return SearchResult(move[:2], _tablebase_score(*result, 0), 0, 0, time.perf_counter() - start)
+
+        best = SearchResult(moves[0], 0, 0, 0, 0.0)
+        for depth in range(1, max_depth + 1):
+            if stop and stop.is_set():
+                break
+            if depth > 1:
+                self._deadline = start + time_limit
+            try:
+                move, score = self._search_root(game, moves, depth, best.move)
+            except SearchTimeout:
+                break
+            best = SearchResult(move, score, depth, self.nodes, time.perf_counter() - start)
+            if on_iteration:
+                on_iteration(best)
+            if abs(score) > MATE_BOUND or time.perf_counter() - start > time_limit / 2:
+                break   # mate found, or the next iteration would not finish in time
+        return best._replace(nodes=self.nodes, elapsed=time.perf_counter() - start)
+
+    # ---------------- TREE ----------------
+    def _search_root(self, game, moves, depth, previous_best):
+        alpha, beta = -INFINITY, INFINITY
+        best_move = None
+        for move in self._order(game, moves, 0, previous_best):
+            game.make_move(*move)
+            try:
+                score = -self._alphabeta(game, depth - 1, -beta, -alpha, 1)
+            finally:
+                game.unmake_move()
+            if score > alpha or best_move is None:
+                alpha, best_move = score, move
+        if self.tt:
+            self.tt.store(game.zobrist_key, depth, alpha, EXACT, encode_move(*best_move))
+        return best_move, alpha
+
+    def _alphabeta(self, game: ChessBoard, depth: int, alpha: int, beta: int, ply: int) -> int:
+        self.nodes += 1
+        if not self.nodes & CHECK_EVERY and (self._deadline and time.perf_counter() > self._deadline
+                                             or self._stop and self._stop.is_set()):
+            raise SearchTimeout
+        if game.repetition_count() > 1 or game.halfmove_clock >= 100:
+            return 0   # a repeat is scored as the draw it can be forced into
+        if self.tablebases and game.piece_count() <= MAX_PIECES:
+            result = self.tablebases.probe(game)
+            if result:
+                return _tablebase_score(*result, ply)
+        if depth <= 0:
+            return self._quiesce(game, alpha, beta, ply)
+
+        tt, key = self.tt, game.zobrist_key
+        tt_move = None
+        if tt:
+            entry = tt.probe(key)
+            if entry:
+                tt_depth, score, bound, code = entry
+                tt_move = decode_move(code)
+                if tt_move:
+                    tt_move = tt_move[:2]
+                if tt_depth >= depth:
+                    score = _score_from_tt(score, ply)
+                    if bound == EXACT or bound == LOWER and score >= beta or bound == UPPER and score <= alpha:
+                        return score
+
+        moves = game.get_legal_moves(game.turn)
+        if not moves:
+            return -MATE + ply if game.is_in_check(game.turn) else 0
+
+        alpha_start = alpha
+        best, best_move = -INFINITY, None
+        for move in self._order(game, moves, ply, tt_move):
+            captured = game.make_move(*move)
+            try:
+                score = -self._alphabeta(game, depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                game.unmake_move()
+            if score > best:
+                best, best_move = score, move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        if not captured:
+                            self._add_killer(move, ply)
+                        break
+        if tt:
+            bound = LOWER if best >= beta else UPPER if best <= alpha_start else EXACT
+            tt.store(key, depth, _score_to_tt(best, ply), bound, encode_move(*best_move))
+        return best
+
+    def _quiesce(self, game: ChessBoard, alpha: int, beta: int, ply: int) -> int:
+        """Resolve captures before trusting the static evaluation."""
+        self.nodes += 1
+        stand_pat = evaluate(game)
+        if stand_pat >= beta:
+            return stand_pat
+        alpha = max(alpha, stand_pat)
+        board = game.board
+        captures = [m for m in game.get_legal_moves(game.turn)
+                    if board[m[1][0]][m[1][1]] or m[1] == game.en_passant and board[m[0][0]][m[0][1]] in "Pp"]
+        for move in self._order(game, captures, ply, None):
+            game.make_move(*move)
+            try:
+                score = -self._quiesce(game, -beta, -alpha, ply + 1)
+            finally:
+                game.unmake_move()
+            if score >= beta:
+                return score
+            alpha = max(alpha, score)
+        return alpha
+
+    # ---------------- ORDERING ----------------
+    def _order(self, game: ChessBoard, moves: List[Move], ply: int, first: Optional[Move]) -> List[Move]:
+        board = game.board
+        killers = self._killers[ply] if ply < len(self._killers) else (None, None)
+
+        def key(move):
+            if move == first:
+                return -10**7
+            (sr, sc), (er, ec) = move
+            victim = board[er][ec]
+            attacker = board[sr][sc]
+            if victim:
+                return -(10 * PIECE_VALUES[victim.lower()] - PIECE_VALUES[attacker.lower()]) - 10**5
+            if attacker in "Pp" and er in (0, 7):
+                return -9 * PIECE_VALUES["q"] - 10**5   # promotion
+            if move == killers[0]:
+                return -2
+            if move == killers[1]:
+                return -1
+            return 0
+        return sorted(moves, key=key)
+
+    def _add_killer(self, move: Move, ply: int):
+        killers = self._killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Search one position and print each iteration.")
+    parser.add_argument("--fen", help="position to search (default: start position)")
+    parser.add_argument("--time", type=float, default=2.0, help="time budget in seconds")
+    parser.add_argument("--depth", type=int, help="maximum depth")
+    parser.add_argument("--hash", type=float, default=DEFAULT_TT_MB, help="transposition table size in MB (0 = off)")
+    parser.add_argument("--no-tablebases", action="store_true", help="search endgames instead of probing data/tablebases")
+    args = parser.parse_args(argv)
+
+    game = ChessBoard.from_fen(args.fen) if args.fen else ChessBoard()
+
+    def report(result: SearchResult):
+        move = square_name(result.move[0]) + square_name(result.move[1])
+        print(f"depth {result.depth:>2}  score {result.score:>6}  nodes {result.nodes:>8}  "
+              f"nps {result.nps:>8.0f}  best {move}")
+
+    searcher = Searcher(tt_mb=args.hash, tablebases=None if args.no_tablebases else load_tablebases())
+    result = searcher.search(game, args.time, args.depth, on_iteration=report)
+    print(f"best move {square_name(result.move[0])}{square_name(result.move[1])}" if result.move else "no legal moves")
+    if result.move and not result.depth:
+        print(f"from the tablebases, score {result.score}")
+    if searcher.tt:
+        stats = searcher.tt.stats()
+        print(f"tt {stats['size_mb']:.1f} MB, {stats['entries']} entries: hit rate {stats['hit_rate']:.1%}, "
+              f"{stats['collisions']} collisions, {stats['overwrites']} overwrites, fill {stats['fill']:.2%}")
+
+
+if __name__ == "__main__":
+    main()
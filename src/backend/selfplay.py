@@ -0,0 +1,249 @@
+"""Headless self-play: play many games between move policies without the UI.
+
+A policy is named by a short spec:
+
+    random        uniform over the legal moves
+    depth=N       the search engine at a fixed depth
+    time=S        the search engine with S seconds per move
+
+Games run on a process pool and come back as GameRecords as soon as each one
+finishes; the command line streams them to JSON lines and PGN and reports
+throughput and per-move latency.
+
+    python -m src.backend.selfplay --games 200 --white random --black random
+    python -m src.backend.selfplay --games 20 --white depth=2 --black time=0.05 --pgn out.pgn
+"""
+import json
+import math
+import multiprocessing
+import os
+import random
+import time
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from src.backend.book import DEFAULT_BOOK, OpeningBook
+from src.backend.game import ChessBoard, square_name
+from src.backend.pgn import game_to_pgn, result_from_status
+from src.backend.search import Searcher
+from src.backend.tablebase import load_tablebases
+
+Square = Tuple[int, int]
+Move = Tuple[Square, Square, Optional[str]]
+
+MAX_PLIES = 1000        # safety cap; the fifty-move rule normally ends games long before
+SELFPLAY_TT_MB = 8
+
+
+class GameRecord(NamedTuple):
+    index: int
+    white: str                # policy specs
+    black: str
+    result: str               # "1-0", "0-1", "1/2-1/2", or "*" when max_plies cut the game off
+    termination: Optional[str]  # checkmate_status() at the end
+    moves: List[Move]
+    move_times: List[float]   # seconds per ply: choosing, playing and checking the result
+    elapsed: float
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "game": self.index, "white": self.white, "black": self.black, "result": self.result,
+            "termination": self.termination, "plies": len(self.moves), "seconds": round(self.elapsed, 4),
+            "moves": " ".join(square_name(s) + square_name(e) + (p or "").lower() for s, e, p in self.moves),
+        })
+
+
+# ---------------- POLICIES ----------------
+class RandomPolicy:
+    def __init__(self):
+        self.rng = random.Random()
+
+    def new_game(self, seed: int):
+        self.rng.seed(seed)
+
+    def __call__(self, game: ChessBoard) -> Move:
+        start, end = self.rng.choice(game.legal_moves())
+        return start, end, None
+
+
+class SearchPolicy:
+    def __init__(self, depth: Optional[int] = None, time_limit: Optional[float] = None,
+                 tt_mb: float = SELFPLAY_TT_MB):
+        self.depth, self.time_limit = depth, time_limit
+        self.searcher = Searcher(tt_mb=tt_mb, tablebases=load_tablebases())
+
+    def new_game(self, seed: int):
+        if self.searcher.tt:
+            self.searcher.tt.clear()   # so a game replays the same whichever worker plays it
+
+    def __call__(self, game: ChessBoard) -> Move:
+        start, end = self.searcher.search(game, self.time_limit or float("inf"), self.depth).move
+        return start, end, None
+
+
+def make_policy(spec: str):
+    """Policy object for "random", "depth=N" or "time=S"."""
+    if spec == "random":
+        return RandomPolicy()
+    kind, _, value = spec.partition("=")
+    try:
+        if kind == "depth":
+            return SearchPolicy(depth=int(value))
+        if kind == "time":
+            return SearchPolicy(time_limit=float(value))
+    except ValueError:
+        pass
+    raise ValueError(f"unknown policy {spec!r}: use random, depth=N or time=S")
+
+
+# ---------------- PLAYING ----------------
+def play_game(white, black, seed: int = 0, max_plies: int = MAX_PLIES, random_plies: int = 0,
+              book: Optional[OpeningBook] = None) -> Tuple[Optional[str], List[Move], List[float]]:
+    """Play one game from the start position; returns (checkmate_status, moves, move_times).
+
+    The first random_plies plies are random for both sides, so deterministic
+    engines do not replay the same game every time. After those, moves come
+    from book (weighted by the seed) while the position is in it.
+    """
+    game = ChessBoard()
+    rng = random.Random(seed)
+    white.new_game(seed)
+    black.new_game(seed + 1)
+    moves, move_times = [], []
+    status = game.checkmate_status()
+    while status is None and len(moves) < max_plies:
+        t0 = time.perf_counter()
+        if len(moves) < random_plies:
+            move = rng.choice(game.legal_moves()) + (None,)
+        else:
+            move = book.choose(game, rng) if book else None
+            if move is None:
+                book = None   # out of book for the rest of the game
+                move = (white if game.turn == "white" else black)(game)
+        game.make_move(*move)
+        status = game.checkmate_status()
+        move_times.append(time.perf_counter() - t0)
+        moves.append(move)
+    return status, moves, move_times
+
+
+_policies: Dict[str, object] = {}
+_books: Dict[str, OpeningBook] = {}
+
+
+def _policy(spec: str):
+    # one per spec and process, so each worker allocates its transposition tables once
+    if spec not in _policies:
+        _policies[spec] = make_policy(spec)
+    return _policies[spec]
+
+
+def _play_job(job) -> GameRecord:
+    index, white, black, seed, max_plies, random_plies, book_path = job
+    t0 = time.perf_counter()
+    book = None
+    if book_path:
+        if book_path not in _books:
+            _books[book_path] = OpeningBook(book_path)   # mapped once per worker
+        book = _books[book_path]
+    status, moves, move_times = play_game(_policy(white), _policy(black), seed, max_plies, random_plies, book)
+    return GameRecord(index, white, black, result_from_status(status), status, moves, move_times,
+                      time.perf_counter() - t0)
+
+
+def run_match(games: int, first: str = "random", second: str = "random", processes: Optional[int] = None,
+              seed: int = 0, max_plies: int = MAX_PLIES, random_plies: int = 0,
+              alternate: bool = True, book: Optional[str] = None) -> Iterator[GameRecord]:
+    """Yield a GameRecord per game as games finish (not in index order).
+
+    first plays white in even games and, with alternate, black in odd ones.
+    book is the path of an opening book both sides play from. processes=1
+    plays in this process.
+    """
+    processes = processes or os.cpu_count() or 1
+    jobs = []
+    for index in range(games):
+        white, black = (second, first) if alternate and index % 2 else (first, second)
+        jobs.append((index, white, black, seed + 2 * index, max_plies, random_plies, book))
+    if processes == 1:
+        yield from map(_play_job, jobs)
+        return
+    with multiprocessing.Pool(processes) as pool:
+        yield from pool.imap_unordered(_play_job, jobs)
+
+
+# ---------------- REPORTING ----------------
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(len(sorted_values) * fraction))
+    return sorted_values[rank - 1]
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Play games between move policies and report throughput.")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--white", default="random", help="random, depth=N or time=S")
+    parser.add_argument("--black", default="random", help="random, depth=N or time=S")
+    parser.add_argument("--no-alternate", action="store_true", help="keep --white on white in every game")
+    parser.add_argument("--processes", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-plies", type=int, default=MAX_PLIES)
+    parser.add_argument("--random-plies", type=int, default=0, help="random opening plies before the policies take over")
+    parser.add_argument("--book", nargs="?", const=DEFAULT_BOOK, help="play openings from this book (default data/book.bin)")
+    parser.add_argument("--jsonl", help="write one JSON result per game here")
+    parser.add_argument("--pgn", help="write every game as PGN here")
+    args = parser.parse_args(argv)
+    for spec in (args.white, args.black):
+        make_policy(spec)   # fail before starting workers
+
+    jsonl = open(args.jsonl, "w", encoding="utf-8") if args.jsonl else None
+    pgn = open(args.pgn, "w", encoding="utf-8") if args.pgn else None
+    scores = {args.white: 0.0, args.black: 0.0}
+    results: Dict[str, int] = {}
+    latencies: List[float] = []
+    plies = 0
+    t0 = time.perf_counter()
+    try:
+        for record in run_match(args.games, args.white, args.black, args.processes, args.seed,
+                                args.max_plies, args.random_plies, not args.no_alternate, args.book):
+            plies += len(record.moves)
+            latencies.extend(record.move_times)
+            results[record.result] = results.get(record.result, 0) + 1
+            if record.result == "1-0":
+                scores[record.white] += 1
+            elif record.result == "0-1":
+                scores[record.black] += 1
+            elif record.result == "1/2-1/2":
+                scores[record.white] += 0.5
+                scores[record.black] += 0.5
+            if jsonl:
+                jsonl.write(record.to_json() + "\n")
+                jsonl.flush()
+            if pgn:
+                headers = {"Event": "Self-play", "Round": str(record.index + 1), "White": record.white,
+                           "Black": record.black, "Result": record.result}
+                if record.termination:
+                    headers["Termination"] = record.termination
+                pgn.write(game_to_pgn(record.moves, headers) + "\n")
+                pgn.flush()
+    finally:
+        for handle in (jsonl, pgn):
+            if handle:
+                handle.close()
+    elapsed = time.perf_counter() - t0
+
+    latencies.sort()
+    print(f"{args.games} games, {plies} plies in {elapsed:.2f}s: "
+          f"{args.games / elapsed:.2f} games/s, {plies / elapsed:.0f} plies/s")
+    print("per-move latency ms: " + ", ".join(
+        f"p{int(q * 100)} {percentile(latencies, q) * 1000:.2f}" for q in (0.5, 0.9, 0.99)) +
+        f", max {latencies[-1] * 1000 if latencies else 0:.2f}")
+    print("results: " + ", ".join(f"{result} x{count}" for result, count in sorted(results.items())))
+    if args.white != args.black:
+        print(f"score: {args.white} {scores[args.white]:g}, {args.black} {scores[args.black]:g}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,426 @@
+"""Endgame tablebases for three-piece endings (KQK, KRK, KPK, ...).
+
+A table holds one signed byte per (side to move, square of every piece):
+
+    0                  draw
+    d > 0              the side to move mates in d plies
+    -(d + 1)           the side to move is mated in d plies (-1: mated now)
+    ILLEGAL            no such position
+
+Tables are generated by retrograde analysis on top of ChessBoard's move
+generator: every position's legal moves are listed once, mates are seeded at
+distance 0, and values spread backwards one ply at a time. Captures and
+promotions that leave the ending are looked up in the smaller or sibling
+table (KPK needs KQK and KRK). Only the side with the extra material is
+stored as white; probes with colours reversed are mirrored. Board symmetry
+puts the white king on one of 10 squares (a1-d1-d4) in pawnless endings and
+on the a-d files with pawns, which cuts tables to 1/6 and 1/2 of 64 squares.
+
+Files are zlib-compressed tables named after the ending, e.g. data/tablebases/KQK.tb.
+
+    python -m src.backend.tablebase generate KQK KRK KPK
+    python -m src.backend.tablebase probe --fen "8/8/8/4k3/8/8/8/3QK3 w - - 0 1"
+"""
+import os
+import time
+import zlib
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from src.backend.game import ChessBoard
+
+ILLEGAL = -128
+MAX_PIECES = 3
+ENDINGS = ("KQK", "KRK", "KPK")
+DEFAULT_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), "..", "..", "data", "tablebases"))
+ORDER = "KQRBNP"
+PROMOTIONS = "QR"   # a knight or bishop never does better than these in a three-piece ending
+
+Square = Tuple[int, int]
+Placement = List[Tuple[str, int]]   # (piece, square index row*8 + col)
+
+
+# ---------------- SIGNATURES ----------------
+def _signature(placement: Placement) -> str:
+    """'KQK' style name: white's pieces, then black's, each strongest first."""
+    white = sorted((p for p, _ in placement if p.isupper()), key=ORDER.index)
+    black = sorted((p.upper() for p, _ in placement if p.islower()), key=ORDER.index)
+    return "".join(white) + "".join(black)
+
+
+def _insufficient(signature: str) -> bool:
+    extras = signature.replace("K", "")
+    return extras in ("", "B", "N")
+
+
+def _mirror(placement: Placement) -> Placement:
+    """Swap colours and flip the board top to bottom."""
+    return [(p.swapcase(), (7 - sq // 8) * 8 + sq % 8) for p, sq in placement]
+
+
+def _table_pieces(signature: str) -> List[str]:
+    """Piece letters in index order for a signature, e.g. 'KQK' -> ['K', 'Q', 'k']."""
+    second = signature.index("K", 1)
+    return list(signature[:second]) + [p.lower() for p in signature[second:]]
+
+
+def _flip_file(sq: int) -> int:
+    return sq - sq % 8 + 7 - sq % 8
+
+
+def _flip_rank(sq: int) -> int:
+    return (7 - sq // 8) * 8 + sq % 8
+
+
+def _flip_diagonal(sq: int) -> int:
+    # reflect in a1-h8
+    return (7 - sq % 8) * 8 + 7 - sq // 8
+
+
+# square -> slot of the squares symmetry moves the white king onto
+PAWNLESS_KINGS = {sq: slot for slot, sq in enumerate(r * 8 + c for r in range(8) for c in range(4) if 7 - r <= c)}
+PAWN_KINGS = {sq: slot for slot, sq in enumerate(r * 8 + c for r in range(8) for c in range(4))}
+
+
+def _king_squares(pieces: Sequence[str]) -> Dict[int, int]:
+    return PAWN_KINGS if "P" in pieces or "p" in pieces else PAWNLESS_KINGS
+
+
+def _table_size(pieces: Sequence[str]) -> int:
+    return 2 * len(_king_squares(pieces)) * 64 ** (len(pieces) - 1)
+
+
+def _symmetric(placement: Placement, pawns: bool) -> Placement:
+    """placement reflected so the white king lands on a square of PAWNLESS_KINGS or PAWN_KINGS."""
+    king = next(sq for p, sq in placement if p == "K")
+    flips = []
+    if king % 8 > 3:
+        flips.append(_flip_file)
+        king = _flip_file(king)
+    if not pawns:
+        if king // 8 < 4:
+            flips.append(_flip_rank)
+            king = _flip_rank(king)
+        if 7 - king // 8 > king % 8:
+            flips.append(_flip_diagonal)
+    for flip in flips:
+        placement = [(p, flip(sq)) for p, sq in placement]
+    return placement
+
+
+def _index(pieces: Sequence[str], placement: Placement, white_to_move: bool) -> int:
+    """Table index of placement, whose pieces (white king first) must match `pieces` as a multiset."""
+    kings = _king_squares(pieces)
+    squares = {}
+    for piece, sq in _symmetric(placement, kings is PAWN_KINGS):
+        squares.setdefault(piece, []).append(sq)
+    index = (0 if white_to_move else len(kings)) + kings[squares["K"].pop()]
+    for piece in pieces[1:]:
+        index = index * 64 + squares[piece].pop()
+    return index
+
+
+# ---------------- VALUES ----------------
+def _decode(value: int) -> Optional[Tuple[int, int]]:
+    if value == ILLEGAL:
+        return None
+    if value > 0:
+        return 1, value
+    if value < 0:
+        return -1, -value - 1
+    return 0, 0
+
+
+def _encode(wdl: int, plies: int) -> int:
+    return plies if wdl > 0 else -(plies + 1) if wdl < 0 else 0
+
+
+class Tablebases:
+    """Tables in a directory, loaded on first use."""
+
+    def __init__(self, directory: str = DEFAULT_DIR, tables: Optional[Dict[str, array]] = None):
+        self.directory = directory
+        self._tables: Dict[str, Optional[array]] = dict(tables or {})
+
+    def _table(self, signature: str) -> Optional[array]:
+        if signature not in self._tables:
+            path = os.path.join(self.directory, signature + ".tb")
+            table = None
+            if os.path.exists(path):
+                with open(path, "rb") as handle:
+                    table = array("b", zlib.decompress(handle.read()))
+            self._tables[signature] = table
+        return self._tables[signature]
+
+    def available(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return sorted(s for s, t in self._tables.items() if t is not None)
+        names = {name[:-3] for name in os.listdir(self.directory) if name.endswith(".tb")}
+        return sorted(names | {s for s, t in self._tables.items() if t is not None})
+
+    def probe_placement(self, placement: Placement, white_to_move: bool) -> Optional[Tuple[int, int]]:
+        """(wdl, plies to mate) for the side to move, or None if no table covers the position."""
+        signature = _signature(placement)
+        if _insufficient(signature):
+            return 0, 0
+        if len(placement) > MAX_PIECES:
+            return None
+        table = self._table(signature)
+        if table is None:
+            placement, white_to_move = _mirror(placement), not white_to_move
+            signature = _signature(placement)
+            table = self._table(signature)
+            if table is None:
+                return None
+        return _decode(table[_index(_table_pieces(signature), placement, white_to_move)])
+
+    def probe(self, game: ChessBoard) -> Optional[Tuple[int, int]]:
+        """(wdl, plies to mate) for the side to move in game: wdl is 1 win, 0 draw, -1 loss.
+
+        None when there are too many pieces, no table for the ending, or
+        castling rights (which the tables do not model). The fifty-move rule
+        is ignored.
+        """
+        if game.piece_count() > MAX_PIECES or any(game.castling_rights.values()):
+            return None
+        placement = [(game.board[r][c], r * 8 + c)
+                     for color in ("white", "black") for r, c in game.piece_squares(color)]
+        return self.probe_placement(placement, game.turn == "white")
+
+    def best_move(self, game: ChessBoard, promotions: str = PROMOTIONS) -> Optional[Tuple[Square, Square, Optional[str]]]:
+        """The move that wins fastest, holds the draw, or loses slowest; None if game is not covered.
+
+        Pawns promote only to the pieces in promotions.
+        """
+        best = self.best_move_result(game, promotions)
+        return best and best[0]
+
+    def best_move_result(self, game: ChessBoard, promotions: str = PROMOTIONS):
+        """(best_move, (wdl, plies)) with the result that move reaches, for the side to move; None if not covered.
+
+        Equal to probe(game) when every promotion is allowed, but it can be
+        worse when promotions leaves out the one that wins.
+        """
+        if self.probe(game) is None:
+            return None
+        best, best_key, best_result = None, None, None
+        for start, end in game.legal_moves():
+            promoting = game.board[start[0]][start[1]] in "Pp" and end[0] in (0, 7)
+            for promotion in promotions if promoting else (None,):
+                game.make_move(start, end, promotion)
+                result = self.probe(game)
+                game.unmake_move()
+                if result is None:
+                    continue
+                wdl, plies = result
+                # the opponent's loss is our win: prefer short wins, then draws, then long losses
+                key = (-wdl, -plies if wdl < 0 else plies)
+                if best_key is None or key > best_key:
+                    best, best_key, best_result = (start, end, promotion), key, (-wdl, plies + 1 if wdl else 0)
+        return best and (best, best_result)
+
+
+# ---------------- GENERATION ----------------
+def generate(signature: str, tablebases: Tablebases) -> array:
+    """Build the table for signature; endings it converts into must already be in tablebases."""
+    pieces = _table_pieces(signature)
+    count = len(pieces)
+    size = _table_size(pieces)
+    kings = list(_king_squares(pieces))
+    values = array("b", [ILLEGAL]) * size
+
+    game = ChessBoard()
+    game.castling_rights = {right: False for right in "KQkq"}
+    empty = [["" for _ in range(8)] for _ in range(8)]
+
+    # successors in compressed rows: successors[offsets[i]:offsets[i + 1]] for the i-th legal position
+    positions = array("i")
+    offsets = array("i", [0])
+    successors = array("i")
+    known: List[Tuple[int, int, int]] = []   # (plies, slot, wdl) of moves that leave the table
+    mated: List[int] = []
+
+    # index = (side * len(kings) + king slot) * 64**(count - 1) + sum(square * weight) over the other pieces
+    weights = [0] + [64 ** (count - 1 - i) for i in range(1, count)]
+    side_step = len(kings) * 64 ** (count - 1)
+    for index in range(size):
+        rest, squares = index, []
+        for _ in range(count - 1):
+            rest, sq = divmod(rest, 64)
+            squares.append(sq)
+        side, king = divmod(rest, len(kings))
+        squares.append(kings[king])
+        squares.reverse()
+        white_to_move = side == 0
+        if len(set(squares)) < count:
+            continue
+        white_king, black_king = (sq for p, sq in zip(pieces, squares) if p in "Kk")
+        if abs(white_king // 8 - black_king // 8) <= 1 and abs(white_king % 8 - black_king % 8) <= 1:
+            continue   # touching kings
+        placement = list(zip(pieces, squares))
+        if any(p in "Pp" and sq // 8 in (0, 7) for p, sq in placement):
+            continue
+        board = [row[:] for row in empty]
+        for piece, sq in placement:
+            board[sq // 8][sq % 8] = piece
+        game.turn = "white" if white_to_move else "black"
+        game.board = board
+        enemy = "black" if white_to_move else "white"
+        if game.is_in_check(enemy) or not game.find_king(enemy):
+            continue
+
+        slot = len(positions)
+        positions.append(index)
+        moves = game.get_legal_moves(game.turn)
+        values[index] = 0
+        if not moves and game.is_in_check(game.turn):
+            values[index] = _encode(-1, 0)
+            mated.append(slot)
+        flipped = index + side_step if white_to_move else index - side_step
+        for start, end in moves:
+            mover = board[start[0]][start[1]]
+            sq_from, sq_to = start[0] * 8 + start[1], end[0] * 8 + end[1]
+            after = [(p, sq_to if sq == sq_from else sq) for p, sq in placement if sq != sq_to]
+            if not board[end[0]][end[1]] and not (mover in "Pp" and end[0] in (0, 7)):
+                if mover == "K":   # may need reflecting back onto the king squares
+                    successors.append(_index(pieces, after, not white_to_move))
+                else:   # only the mover's square changes
+                    successors.append(flipped + (sq_to - sq_from) * weights[squares.index(sq_from)])
+                continue
+            promotions = PROMOTIONS if mover in "Pp" and end[0] in (0, 7) else (None,)
+            for promotion in promotions:
+                moved = after
+                if promotion:
+                    new = promotion if mover == "P" else promotion.lower()
+                    moved = [(new if sq == sq_to else p, sq) for p, sq in after]
+                result = tablebases.probe_placement(moved, not white_to_move)
+                if result is None:
+                    raise ValueError(f"{signature} converts into {_signature(moved)}, which is not available")
+                known.append((result[1], slot, result[0]))
+        offsets.append(len(successors))
+
+    slot_of = {index: slot for slot, index in enumerate(positions)}
+    remaining = array("i", (offsets[s + 1] - offsets[s] for s in range(len(positions))))
+    drawn = bytearray(len(positions))   # has a move into a known draw: can never be lost
+    for plies, slot, wdl in known:
+        remaining[slot] += 1
+        if wdl == 0:
+            drawn[slot] = 1
+
+    # predecessors, also in compressed rows
+    pred_count = array("i", bytes(4 * (len(positions) + 1)))
+    for target in successors:
+        pred_count[slot_of[target] + 1] += 1
+    for s in range(len(positions)):
+        pred_count[s + 1] += pred_count[s]
+    fill = array("i", pred_count)
+    predecessors = array("i", bytes(4 * len(successors)))
+    for slot in range(len(positions)):
+        for target in successors[offsets[slot]:offsets[slot + 1]]:
+            t = slot_of[target]
+            predecessors[fill[t]] = slot
+            fill[t] += 1
+
+    # buckets[d]: (slot, wdl) events at d plies; a positive slot is a resolved position
+    # whose predecessors need telling, a negative one (~slot) a converting move of slot
+    resolved = bytearray(len(positions))
+    buckets: Dict[int, List[Tuple[int, int]]] = {0: [(slot, -1) for slot in mated]}
+    for slot in mated:
+        resolved[slot] = 1
+    for plies, slot, wdl in known:
+        if wdl:
+            buckets.setdefault(plies, []).append((~slot, wdl))
+
+    plies = 0
+    while buckets:
+        events = buckets.pop(plies, [])
+        for slot, wdl in events:
+            if slot >= 0:
+                targets = predecessors[pred_count[slot]:pred_count[slot + 1]]
+            else:
+                targets = (~slot,)
+            for target in targets:
+                if resolved[target]:
+                    continue
+                if wdl < 0:
+                    resolved[target] = 1
+                    values[positions[target]] = _encode(1, plies + 1)
+                    buckets.setdefault(plies + 1, []).append((target, 1))
+                else:
+                    remaining[target] -= 1
+                    if remaining[target] == 0 and not drawn[target]:
+                        resolved[target] = 1
+                        values[positions[target]] = _encode(-1, plies + 1)
+                        buckets.setdefault(plies + 1, []).append((target, -1))
+        plies += 1
+        if plies > 126:
+            raise ValueError(f"{signature}: distance to mate does not fit in a byte")
+    return values
+
+
+def generate_all(signatures: Iterable[str], directory: str = DEFAULT_DIR, report=print) -> Tablebases:
+    """Generate and save tables (dependencies first), reporting time and size of each."""
+    os.makedirs(directory, exist_ok=True)
+    tablebases = Tablebases(directory)
+    pending = list(signatures)
+    for signature in ("KQK", "KRK"):
+        if "KPK" in pending and signature not in pending and tablebases._table(signature) is None:
+            pending.insert(0, signature)
+    for signature in pending:
+        t0 = time.perf_counter()
+        values = generate(signature, tablebases)
+        elapsed = time.perf_counter() - t0
+        tablebases._tables[signature] = values
+        data = zlib.compress(values.tobytes(), 9)
+        with open(os.path.join(directory, signature + ".tb"), "wb") as handle:
+            handle.write(data)
+        wins = sum(1 for v in values if 0 < v)
+        longest = max(values)
+        report(f"{signature}: {elapsed:.1f}s, {len(values)} entries, {len(data)} bytes on disk "
+               f"({len(values)} raw); {wins} wins, longest mate {longest} plies")
+    return tablebases
+
+
+def load_tablebases(directory: str = DEFAULT_DIR) -> Optional[Tablebases]:
+    """Tablebases for directory, or None if it holds no tables."""
+    tablebases = Tablebases(directory)
+    return tablebases if tablebases.available() else None
+
+
+# ---------------- COMMAND LINE ----------------
+def main(argv=None):
+    import argparse
+    from src.backend.game import square_name
+    parser = argparse.ArgumentParser(description="Generate or probe endgame tablebases.")
+    parser.add_argument("--dir", default=DEFAULT_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+    gen = commands.add_parser("generate", help="generate tables")
+    gen.add_argument("endings", nargs="*", default=list(ENDINGS))
+    probe = commands.add_parser("probe", help="probe one position")
+    probe.add_argument("--fen", required=True)
+    args = parser.parse_args(argv)
+
+    if args.command == "generate":
+        generate_all(args.endings, args.dir)
+        return
+    tablebases = Tablebases(args.dir)
+    game = ChessBoard.from_fen(args.fen)
+    t0 = time.perf_counter()
+    result = tablebases.probe(game)   # loads the table
+    loaded = time.perf_counter() - t0
+    if result is None:
+        print("not in the tablebases")
+        return
+    t0 = time.perf_counter()
+    for _ in range(1000):
+        tablebases.probe(game)
+    elapsed = (time.perf_counter() - t0) / 1000
+    wdl, plies = result
+    move = tablebases.best_move(game)
+    verdict = {1: f"win, mate in {plies} plies", 0: "draw", -1: f"loss, mated in {plies} plies"}[wdl]
+    best = f"{square_name(move[0])}{square_name(move[1])}{(move[2] or '').lower()}" if move else "-"
+    print(f"{verdict}; best move {best}; load {loaded * 1e3:.1f}ms, probe {elapsed * 1e6:.1f}us")
+
+
+if __name__ == "__main__":
+    main()
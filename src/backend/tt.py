@@ -0,0 +1,114 @@
+"""Fixed-size transposition table keyed on ChessBoard.zobrist_key.
+
+All storage is preallocated in parallel arrays sized from a memory cap, 16
+bytes per entry. Entries live in buckets of two: the first slot keeps the
+deepest search seen for that bucket, the second is always replaced.
+"""
+from array import array
+from typing import Dict, Optional, Tuple
+
+EXACT, LOWER, UPPER = 0, 1, 2   # bound types: exact score, fail-high, fail-low
+ENTRY_BYTES = 16                # key 8 + score 4 + move 2 + depth 1 + bound 1
+PROMOTION_CODES = {None: 0, "q": 1, "r": 2, "b": 3, "n": 4}
+PROMOTION_PIECES = (None, "q", "r", "b", "n")
+
+
+def encode_move(start: Tuple[int,int], end: Tuple[int,int], promotion: Optional[str] = None) -> int:
+    """Pack a move into 16 bits: from square, to square, promotion piece. 0 means no move."""
+    code = PROMOTION_CODES[promotion.lower() if promotion else None]
+    return (start[0]*8 + start[1]) | (end[0]*8 + end[1]) << 6 | code << 12
+
+
+def decode_move(code: int) -> Optional[Tuple[Tuple[int,int], Tuple[int,int], Optional[str]]]:
+    if not code:
+        return None
+    start, end = code & 63, code >> 6 & 63
+    return divmod(start, 8), divmod(end, 8), PROMOTION_PIECES[code >> 12 & 7]
+
+
+class TranspositionTable:
+    def __init__(self, size_mb: float = 16):
+        buckets = 1
+        while buckets * 2 * 2 * ENTRY_BYTES <= size_mb * 1024 * 1024:
+            buckets *= 2   # power of two so a mask picks the bucket
+        self.buckets = buckets
+        self._mask = buckets - 1
+        slots = buckets * 2
+        self._keys = array("Q", bytes(8 * slots))
+        self._scores = array("i", bytes(4 * slots))
+        self._moves = array("H", bytes(2 * slots))
+        self._depths = array("b", bytes(slots))
+        self._bounds = array("B", bytes(slots))
+        self._used = 0
+        self.clear_stats()
+
+    @property
+    def size_bytes(self) -> int:
+        return self.buckets * 2 * ENTRY_BYTES
+
+    def clear(self):
+        """Empty every slot without reallocating."""
+        for arr in (self._keys, self._scores, self._moves, self._depths, self._bounds):
+            arr[:] = array(arr.typecode, bytes(arr.itemsize * len(arr)))
+        self._used = 0
+        self.clear_stats()
+
+    def clear_stats(self):
+        self.probes = self.hits = self.collisions = self.stores = self.overwrites = 0
+
+    def probe(self, key: int) -> Optional[Tuple[int, int, int, int]]:
+        """(depth, score, bound, move code) stored for key, or None."""
+        key = key or 1   # 0 marks an empty slot
+        self.probes += 1
+        slot = (key & self._mask) * 2
+        keys = self._keys
+        if keys[slot] == key:
+            pass
+        elif keys[slot + 1] == key:
+            slot += 1
+        else:
+            if keys[slot] or keys[slot + 1]:
+                self.collisions += 1   # bucket holds other positions
+            return None
+        self.hits += 1
+        return self._depths[slot], self._scores[slot], self._bounds[slot], self._moves[slot]
+
+    def store(self, key: int, depth: int, score: int, bound: int, move: int = 0):
+        key = key or 1
+        self.stores += 1
+        slot = (key & self._mask) * 2
+        keys = self._keys
+        if keys[slot] == key or not keys[slot] or depth >= self._depths[slot]:
+            if keys[slot + 1] == key:
+                keys[slot + 1] = 0   # promoted out of the always-replace slot
+                self._used -= 1
+        else:
+            slot += 1
+        if keys[slot] == key and not move:
+            move = self._moves[slot]   # keep the old best move
+        self._write(slot, key, depth, score, bound, move)
+
+    def _write(self, slot, key, depth, score, bound, move):
+        old = self._keys[slot]
+        if not old:
+            self._used += 1
+        elif old != key:
+            self.overwrites += 1
+        self._keys[slot] = key
+        self._depths[slot] = max(-128, min(127, depth))
+        self._scores[slot] = score
+        self._bounds[slot] = bound
+        self._moves[slot] = move
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "size_mb": self.size_bytes / (1024 * 1024),
+            "entries": self.buckets * 2,
+            "probes": self.probes,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.probes if self.probes else 0.0,
+            "collisions": self.collisions,
+            "stores": self.stores,
+            "overwrites": self.overwrites,
+            "fill": self._used / (self.buckets * 2),
+        }
@@ -0,0 +1,311 @@
+"""Attack masks, check flags and legal move counts for many positions at once.
+
+Positions come in as an (N, 64) array of compact piece codes (see
+src/backend/compact.py), one row per position in ChessBoard square order
+(index row*8 + col, a8 first), plus per-position side to move, castling
+flags and en passant square. The whole batch is turned into uint64
+bitboards, one per piece type, and every step after that is a NumPy
+operation over all N positions: sliding attacks use Kogge-Stone fills, and
+legality comes from check and pin masks instead of making each move.
+
+Legal move counts match len(ChessBoard.get_legal_moves(turn)), so a
+promotion counts as one move. Needs NumPy; nothing else in the backend does.
+
+    python -m src.backend.vectorized --positions 1000000   # throughput benchmark
+"""
+import time
+from typing import Iterable, NamedTuple, Union
+
+import numpy as np
+
+from src.backend.compact import NO_SQUARE, PACKED_SIZE
+from src.backend.game import ChessBoard
+
+CHUNK = 1 << 16   # positions per pass; bounds the size of the temporaries
+
+FULL = np.uint64(0xFFFFFFFFFFFFFFFF)
+NOT_A = np.uint64(0xFEFEFEFEFEFEFEFE)    # every column but a (bit 0 of each row)
+NOT_H = np.uint64(0x7F7F7F7F7F7F7F7F)
+NOT_AB = np.uint64(0xFCFCFCFCFCFCFCFC)
+NOT_GH = np.uint64(0x3F3F3F3F3F3F3F3F)
+ZERO = np.uint64(0)
+
+# square index deltas; a negative delta moves towards row 0 (rank 8)
+STEP_MASKS = {-8: FULL, 8: FULL, 1: NOT_A, -1: NOT_H, -7: NOT_A, -9: NOT_H, 9: NOT_A, 7: NOT_H}
+ORTHOGONAL = (-8, 8, 1, -1)
+DIAGONAL = (-7, -9, 9, 7)
+KNIGHT_STEPS = ((-17, NOT_H), (-15, NOT_A), (-10, NOT_GH), (-6, NOT_AB),
+                (6, NOT_GH), (10, NOT_AB), (15, NOT_H), (17, NOT_A))
+KING_STEPS = tuple(STEP_MASKS.items())
+WHITE_CAPTURES = ((-9, NOT_H), (-7, NOT_A))
+BLACK_CAPTURES = ((7, NOT_H), (9, NOT_A))
+
+# (flag bit, white?, king square, rook square, squares that must be empty, squares that must be safe)
+CASTLES = (
+    (1, True, 60, 63, (61, 62), (60, 61, 62)),
+    (2, True, 60, 56, (57, 58, 59), (60, 59, 58)),
+    (4, False, 4, 7, (5, 6), (4, 5, 6)),
+    (8, False, 4, 0, (1, 2, 3), (4, 3, 2)),
+)
+
+
+class BatchAnalysis(NamedTuple):
+    in_check: np.ndarray      # bool, side to move is in check
+    legal_moves: np.ndarray   # int, len(get_legal_moves(turn))
+    checkmate: np.ndarray     # bool
+    stalemate: np.ndarray     # bool
+
+
+# ---------------- BITBOARDS ----------------
+def _bits(*squares) -> np.uint64:
+    return np.uint64(sum(1 << sq for sq in squares))
+
+
+def _shift(bb, delta: int):
+    return bb << np.uint64(delta) if delta > 0 else bb >> np.uint64(-delta)
+
+
+if hasattr(np, "bitwise_count"):
+    def popcount(bb) -> np.ndarray:
+        return np.bitwise_count(bb).astype(np.int32)
+else:   # NumPy < 2.0
+    _BYTE_COUNTS = np.array([bin(i).count("1") for i in range(256)], dtype=np.int32)
+
+    def popcount(bb) -> np.ndarray:
+        bb = np.ascontiguousarray(bb, dtype=np.uint64)
+        return _BYTE_COUNTS[bb.view(np.uint8).reshape(bb.shape + (8,))].sum(axis=-1)
+
+
+def bitboards(pieces) -> np.ndarray:
+    """(12, N) uint64 bitboards in compact.PIECES order (P N B R Q K p n b r q k)."""
+    pieces = np.asarray(pieces, dtype=np.uint8)
+    planes = np.empty((12, len(pieces)), dtype=np.uint64)
+    for code in range(1, 13):
+        packed = np.packbits(pieces == code, axis=1, bitorder="little")
+        planes[code - 1] = packed.view("<u8")[:, 0]
+    return planes
+
+
+def _slide(gen, empty, delta: int):
+    """Squares reached from gen moving along delta until (and including) the first blocker."""
+    mask = STEP_MASKS[delta]
+    pro = empty & mask
+    gen = gen | (pro & _shift(gen, delta))
+    pro = pro & _shift(pro, delta)
+    gen = gen | (pro & _shift(gen, 2 * delta))
+    pro = pro & _shift(pro, 2 * delta)
+    gen = gen | (pro & _shift(gen, 4 * delta))
+    return _shift(gen, delta) & mask
+
+
+def _leaps(bb, steps):
+    out = np.zeros_like(bb)
+    for delta, mask in steps:
+        out |= _shift(bb, delta) & mask
+    return out
+
+
+def _pawn_attacks(pawns, white):
+    return np.where(white, _leaps(pawns, WHITE_CAPTURES), _leaps(pawns, BLACK_CAPTURES))
+
+
+def _attacks(side, occupied, white):
+    """Every square one side's pieces attack, own pieces included."""
+    pawns, knights, bishops, rooks, queens, king = side
+    empty = ~occupied
+    attacked = _pawn_attacks(pawns, white) | _leaps(knights, KNIGHT_STEPS) | _leaps(king, KING_STEPS)
+    for delta in ORTHOGONAL:
+        attacked |= _slide(rooks | queens, empty, delta)
+    for delta in DIAGONAL:
+        attacked |= _slide(bishops | queens, empty, delta)
+    return attacked
+
+
+def _sides(pieces, white):
+    planes = bitboards(pieces)
+    white = np.broadcast_to(np.asarray(white, dtype=bool), (len(pieces),))
+    own = np.where(white, planes[:6], planes[6:])
+    enemy = np.where(white, planes[6:], planes[:6])
+    return own, enemy, white
+
+
+# ---------------- PER-CHUNK ANALYSIS ----------------
+def _pawn_moves(pawns, white, empty, targets):
+    """Pushes, double pushes and the two capture directions, kept apart so each popcount is one move per pawn."""
+    single = np.where(white, _shift(pawns, -8), _shift(pawns, 8)) & empty
+    double_rank = np.where(white, _bits(*range(40, 48)), _bits(*range(16, 24)))
+    double = np.where(white, _shift(single & double_rank, -8), _shift(single & double_rank, 8)) & empty
+    moves = [single, double]
+    for (w_delta, w_mask), (b_delta, b_mask) in zip(WHITE_CAPTURES, BLACK_CAPTURES):
+        moves.append(np.where(white, _shift(pawns, w_delta) & w_mask, _shift(pawns, b_delta) & b_mask) & targets)
+    return moves
+
+
+def _analyze_chunk(pieces, white, castling, ep):
+    own, enemy, white = _sides(pieces, white)
+    pawns, knights, bishops, rooks, queens, king = own
+    us = np.bitwise_or.reduce(own, axis=0)
+    them = np.bitwise_or.reduce(enemy, axis=0)
+    occupied = us | them
+    empty = ~occupied
+    orthogonal = enemy[3] | enemy[4]
+    diagonal = enemy[2] | enemy[4]
+
+    # squares the enemy attacks once our king steps off its square
+    danger = _attacks(enemy, occupied & ~king, ~white)
+
+    # checkers, the squares that block a sliding check, and pins
+    checkers = (_pawn_attacks(king, white) & enemy[0]) | (_leaps(king, KNIGHT_STEPS) & enemy[1])
+    blocks = np.zeros_like(king)
+    pins = []   # (pinned piece, its ray from the king through the pinner, delta)
+    for deltas, sliders in ((ORTHOGONAL, orthogonal), (DIAGONAL, diagonal)):
+        for delta in deltas:
+            ray = _slide(king, empty, delta)
+            hit = ray & sliders
+            checkers |= hit
+            blocks |= np.where(hit != 0, ray, ZERO)
+            first = ray & us
+            xray = _slide(king, empty | first, delta)
+            pinned = np.where((xray & sliders & ~ray) != 0, first, ZERO)
+            pins.append((pinned, xray, delta))
+    check_count = popcount(checkers)
+    check_mask = np.where(check_count == 0, FULL, np.where(check_count == 1, checkers | blocks, ZERO))
+    pinned_all = np.zeros_like(king)
+    for pinned, _, _ in pins:
+        pinned_all |= pinned
+    free = ~pinned_all
+    targets = ~us & check_mask
+
+    counts = np.zeros(len(pieces), dtype=np.int32)
+    free_knights = knights & free
+    for delta, mask in KNIGHT_STEPS:
+        counts += popcount(_shift(free_knights, delta) & mask & targets)
+    for delta in ORTHOGONAL:
+        counts += popcount(_slide((rooks | queens) & free, empty, delta) & targets)
+    for delta in DIAGONAL:
+        counts += popcount(_slide((bishops | queens) & free, empty, delta) & targets)
+    for moves in _pawn_moves(pawns & free, white, empty, them):
+        counts += popcount(moves & check_mask)
+
+    # a pinned piece may only move along its pin ray
+    for pinned, xray, delta in pins:
+        sliders = pinned & (rooks | queens if delta in ORTHOGONAL else bishops | queens)
+        along = _slide(sliders, empty, delta) | _slide(sliders, empty, -delta)
+        counts += popcount(along & xray & targets)
+        for moves in _pawn_moves(pinned & pawns, white, empty, them):
+            counts += popcount(moves & xray & check_mask)
+
+    counts += popcount(_leaps(king, KING_STEPS) & ~us & ~danger)
+
+    castling = np.broadcast_to(np.asarray(castling, dtype=np.uint8), counts.shape)
+    for bit, castle_white, king_sq, rook_sq, between, safe in CASTLES:
+        allowed = ((castling & bit) != 0) & (white == castle_white)
+        allowed &= (king & _bits(king_sq)) != 0
+        allowed &= (rooks & _bits(rook_sq)) != 0
+        allowed &= (occupied & _bits(*between)) == 0
+        allowed &= (danger & _bits(*safe)) == 0
+        counts += allowed
+
+    # en passant: lift both pawns and look for a check, including along the rank
+    ep = np.broadcast_to(np.asarray(ep, dtype=np.int64), counts.shape)
+    rows = np.nonzero(ep != NO_SQUARE)[0]
+    if len(rows):
+        w = white[rows]
+        ep_bit = (np.uint64(1) << ep[rows].astype(np.uint64)) & empty[rows]
+        captured = np.where(w, _shift(ep_bit, 8), _shift(ep_bit, -8)) & enemy[0][rows]
+        sub_king = king[rows]
+        sub_enemy = enemy[:, rows].copy()
+        sub_enemy[0] &= ~captured
+        for (w_delta, w_mask), (b_delta, b_mask) in zip(BLACK_CAPTURES, WHITE_CAPTURES):
+            mover = np.where(w, _shift(ep_bit, w_delta) & w_mask, _shift(ep_bit, b_delta) & b_mask) & pawns[rows]
+            after = (occupied[rows] & ~mover & ~captured) | ep_bit
+            attacked = _attacks(sub_enemy, after, ~w) & sub_king
+            counts[rows] += (mover != 0) & (captured != 0) & (attacked == 0)
+
+    return check_count > 0, counts
+
+
+def _chunks(count: int, size: int):
+    for start in range(0, count, size):
+        yield slice(start, min(start + size, count))
+
+
+# ---------------- PUBLIC API ----------------
+def stack_positions(positions: Iterable[Union[bytes, ChessBoard]]) -> np.ndarray:
+    """(N, 66) uint8 array from ChessBoards or ChessBoard.pack() strings."""
+    data = b"".join(p.pack() if isinstance(p, ChessBoard) else bytes(p) for p in positions)
+    return np.frombuffer(data, dtype=np.uint8).reshape(-1, PACKED_SIZE)
+
+
+def split_positions(positions: np.ndarray):
+    """(pieces, white_to_move, castling, en_passant) columns of an (N, 66) packed array."""
+    positions = np.asarray(positions, dtype=np.uint8)
+    return positions[:, :64], (positions[:, 64] & 16) == 0, positions[:, 64] & 15, positions[:, 65]
+
+
+def attack_masks(pieces, white) -> np.ndarray:
+    """(N,) uint64: squares attacked by white's pieces where white is True, else by black's."""
+    own, enemy, white = _sides(pieces, white)
+    occupied = np.bitwise_or.reduce(own, axis=0) | np.bitwise_or.reduce(enemy, axis=0)
+    return _attacks(own, occupied, white)
+
+
+def in_check(pieces, white) -> np.ndarray:
+    """(N,) bool: the side given by white is in check."""
+    own, enemy, white = _sides(pieces, white)
+    occupied = np.bitwise_or.reduce(own, axis=0) | np.bitwise_or.reduce(enemy, axis=0)
+    return (_attacks(enemy, occupied, ~white) & own[5]) != 0
+
+
+def legal_move_counts(pieces, white, castling=0, en_passant=NO_SQUARE, chunk: int = CHUNK) -> np.ndarray:
+    """(N,) int32 legal move counts for the side to move; castling uses the KQkq = 1/2/4/8 flags."""
+    return analyze_positions(pieces, white, castling, en_passant, chunk).legal_moves
+
+
+def analyze_positions(pieces, white, castling=0, en_passant=NO_SQUARE, chunk: int = CHUNK) -> BatchAnalysis:
+    """Check flags, legal move counts and mate/stalemate flags for the side to move in every position."""
+    pieces = np.asarray(pieces, dtype=np.uint8)
+    count = len(pieces)
+    white = np.broadcast_to(np.asarray(white, dtype=bool), (count,))
+    castling = np.broadcast_to(np.asarray(castling, dtype=np.uint8), (count,))
+    en_passant = np.broadcast_to(np.asarray(en_passant), (count,))
+    checks = np.zeros(count, dtype=bool)
+    moves = np.zeros(count, dtype=np.int32)
+    for part in _chunks(count, chunk):
+        checks[part], moves[part] = _analyze_chunk(pieces[part], white[part], castling[part], en_passant[part])
+    return BatchAnalysis(checks, moves, checks & (moves == 0), ~checks & (moves == 0))
+
+
+# ---------------- BENCHMARK ----------------
+def main(argv=None):
+    import argparse
+    from src.backend.compact import _sample_positions
+    parser = argparse.ArgumentParser(description="Throughput of the vectorized batch analysis against ChessBoard.")
+    parser.add_argument("--positions", type=int, default=1_000_000)
+    parser.add_argument("--sample", type=int, default=5000, help="distinct positions to tile into the batch")
+    parser.add_argument("--chunk", type=int, default=CHUNK)
+    args = parser.parse_args(argv)
+
+    sample = _sample_positions(args.sample)
+    t0 = time.perf_counter()
+    for data in sample:
+        game = ChessBoard.from_packed(data)
+        game.is_in_check(game.turn)
+        game.has_legal_moves(game.turn)
+    scalar_rate = len(sample) / (time.perf_counter() - t0)
+
+    batch = np.resize(stack_positions(sample), (args.positions, PACKED_SIZE))
+    t0 = time.perf_counter()
+    result = analyze_positions(*split_positions(batch), chunk=args.chunk)
+    elapsed = time.perf_counter() - t0
+    rate = len(batch) / elapsed
+    print(f"{len(batch)} positions in {elapsed:.2f}s: {rate:,.0f} positions/s, "
+          f"{1e6 / rate:.2f}s per million")
+    print(f"ChessBoard (check + has_legal_moves): {scalar_rate:,.0f} positions/s, "
+          f"{1e6 / scalar_rate:.1f}s per million ({rate / scalar_rate:.0f}x)")
+    print(f"in check {result.in_check.sum()}, checkmate {result.checkmate.sum()}, "
+          f"stalemate {result.stalemate.sum()}, mean legal moves {result.legal_moves.mean():.1f}")
+
+
+if __name__ == "__main__":
+    main()
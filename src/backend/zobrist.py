@@ -0,0 +1,53 @@
+"""64-bit Zobrist keys for ChessBoard positions.
+
+A key is the XOR of one random number per (piece, square), one for the side to
+move, one per castling right still held (K, Q, k, q, XORed together) and one
+per en passant file. As in Polyglot, the en passant file only counts when a
+pawn of the side to move stands next to the pawn that just made its double
+step; otherwise the position after the double step would never match its
+later repeats.
+ChessBoard updates its key incrementally in make_move; position_key computes
+it from scratch.
+"""
+import random
+from typing import Optional, Tuple
+
+_rng = random.Random(0x20C4E55)
+
+PIECE_KEYS = {p: tuple(_rng.getrandbits(64) for _ in range(64)) for p in "PNBRQKpnbrqk"}
+SIDE_KEY = _rng.getrandbits(64)   # XORed in when black is to move
+CASTLING_KEYS = {right: _rng.getrandbits(64) for right in "KQkq"}
+EP_KEYS = tuple(_rng.getrandbits(64) for _ in range(8))   # by en passant file
+
+
+def castling_key(rights) -> int:
+    key = 0
+    for right, allowed in rights.items():
+        if allowed:
+            key ^= CASTLING_KEYS[right]
+    return key
+
+
+def en_passant_key(board, turn: str, en_passant: Optional[Tuple[int,int]]) -> int:
+    """EP_KEYS of the en passant file if turn has a pawn that could capture there, else 0."""
+    if en_passant is None:
+        return 0
+    r, c = en_passant
+    pawn, row = ("P", r + 1) if turn == "white" else ("p", r - 1)
+    if not 0 <= row < 8:
+        return 0
+    if c > 0 and board[row][c-1] == pawn or c < 7 and board[row][c+1] == pawn:
+        return EP_KEYS[c]
+    return 0
+
+
+def position_key(board, turn: str, castling_rights: dict, en_passant: Optional[Tuple[int,int]]) -> int:
+    key = 0
+    for r, row in enumerate(board):
+        for c, piece in enumerate(row):
+            if piece:
+                key ^= PIECE_KEYS[piece][r*8 + c]
+    if turn == "black":
+        key ^= SIDE_KEY
+    key ^= castling_key(castling_rights)
+    return key ^ en_passant_key(board, turn, en_passant)
@@ -0,0 +1,135 @@
+"""Load generator for the game server: many sessions playing random moves at once.
+
+Every session opens its own connection, starts a game and plays up to
+`plies` random legal moves (asking for the legal moves before each one,
+and for a hint every `hint_every` plies if set). The report gives moves per
+second over the whole run and latency percentiles per operation.
+
+    python -m src.server.loadgen --sessions 200 --plies 40              # against localhost:8765
+    python -m src.server.loadgen --serve --sessions 200 --hint-every 10  # with a server in this process
+"""
+import asyncio
+import json
+import random
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+from src.backend.selfplay import percentile
+from src.server.server import DEFAULT_PORT, MAX_LINE, GameServer
+
+
+class LoadReport(NamedTuple):
+    sessions: int
+    moves: int
+    requests: int
+    elapsed: float
+    latencies: Dict[str, List[float]]   # op -> seconds per request, sorted
+
+    @property
+    def moves_per_second(self) -> float:
+        return self.moves / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class ServerError(Exception):
+    """The server answered a request with ok: false."""
+
+
+async def play_session(host: str, port: int, plies: int, rng: random.Random, latencies: Dict[str, List[float]],
+                       hint_every: int = 0, hint_time: float = 0.1) -> int:
+    """Play one random game over its own connection; returns the number of moves played."""
+    reader, writer = await asyncio.open_connection(host, port, limit=MAX_LINE)
+    request_id = 0
+
+    async def call(op: str, **fields) -> dict:
+        nonlocal request_id
+        request_id += 1
+        t0 = time.perf_counter()
+        writer.write(json.dumps({"id": request_id, "op": op, **fields}).encode() + b"\n")
+        response = json.loads(await reader.readline())
+        latencies.setdefault(op, []).append(time.perf_counter() - t0)
+        if not response.get("ok"):
+            raise ServerError(f"{op}: {response.get('error')}")
+        return response
+
+    moves = 0
+    try:
+        session = (await call("new"))["session"]
+        for ply in range(plies):
+            legal = (await call("legal", session=session))["moves"]
+            if not legal:
+                break
+            if hint_every and ply % hint_every == hint_every - 1:
+                await call("hint", session=session, time=hint_time)
+            state = await call("move", session=session, move=rng.choice(legal))
+            moves += 1
+            if state["status"]:
+                break
+        await call("close", session=session)
+    finally:
+        writer.close()
+        await writer.wait_closed()
+    return moves
+
+
+async def run_load(host: str = "127.0.0.1", port: int = DEFAULT_PORT, sessions: int = 100, plies: int = 40,
+                   concurrency: Optional[int] = None, hint_every: int = 0, hint_time: float = 0.1,
+                   seed: int = 0) -> LoadReport:
+    """Play `sessions` games, at most `concurrency` (default: all) at a time."""
+    latencies: Dict[str, List[float]] = {}
+    limit = asyncio.Semaphore(concurrency or sessions)
+
+    async def one(index: int) -> int:
+        async with limit:
+            return await play_session(host, port, plies, random.Random(seed + index), latencies,
+                                      hint_every, hint_time)
+
+    t0 = time.perf_counter()
+    moves = await asyncio.gather(*(one(i) for i in range(sessions)))
+    elapsed = time.perf_counter() - t0
+    for values in latencies.values():
+        values.sort()
+    return LoadReport(sessions, sum(moves), sum(len(v) for v in latencies.values()), elapsed, latencies)
+
+
+def format_report(report: LoadReport) -> str:
+    lines = [f"{report.sessions} sessions, {report.moves} moves, {report.requests} requests in {report.elapsed:.2f}s: "
+             f"{report.moves_per_second:.0f} moves/s, {report.requests / report.elapsed:.0f} requests/s",
+             f"{'op':<8}{'count':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+    for op, values in sorted(report.latencies.items()):
+        lines.append(f"{op:<8}{len(values):>8}" + "".join(
+            f"{percentile(values, q) * 1000:>10.2f}" for q in (0.5, 0.9, 0.99)) + f"{values[-1] * 1000:>10.2f}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Measure the game server under many concurrent sessions.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--serve", action="store_true", help="start a server in this process on a free port")
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--plies", type=int, default=40, help="moves per session at most")
+    parser.add_argument("--concurrency", type=int, help="sessions open at once (default: all)")
+    parser.add_argument("--hint-every", type=int, default=0, help="ask for a hint every N plies (0: never)")
+    parser.add_argument("--hint-time", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    async def run():
+        server = None
+        if args.serve:
+            server = GameServer(args.host, 0)
+            await server.start()
+            asyncio.ensure_future(server.serve_forever())
+        try:
+            return await run_load(args.host, server.port if server else args.port, args.sessions, args.plies,
+                                  args.concurrency, args.hint_every, args.hint_time, args.seed)
+        finally:
+            if server:
+                await server.close()
+
+    print(format_report(asyncio.run(run())))
+
+
+if __name__ == "__main__":
+    main()
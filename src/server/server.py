@@ -0,0 +1,368 @@
+"""Asyncio game server: many ChessBoard games behind a JSON-lines protocol.
+
+Each request is one JSON object on a line and gets one JSON line back,
+echoing its "id". Moves are in coordinate notation ("e2e4", "e7e8n");
+promotions default to a queen.
+
+    {"id": 1, "op": "new"}                                   -> {"session": 1, "fen": ..., "turn": "white", "status": null}
+    {"id": 2, "op": "move", "session": 1, "move": "e2e4"}    -> {"fen": ..., "turn": ..., "status": ...}
+    {"id": 3, "op": "legal", "session": 1}                   -> {"moves": ["a7a6", ...]}
+    {"id": 4, "op": "status", "session": 1}                  -> {"fen": ..., "turn": ..., "status": ..., "plies": 1}
+    {"id": 5, "op": "undo", "session": 1}                    -> {"fen": ..., "turn": ..., "status": ...}
+    {"id": 6, "op": "hint", "session": 1, "time": 0.5}       -> {"move": "e7e5", "score": ..., "depth": ...}
+    {"id": 7, "op": "close", "session": 1}                   -> {}
+    {"id": 8, "op": "stats"}                                 -> {"sessions": ..., "live_boards": ..., ...}
+
+Successful responses carry "ok": true; failures are {"id": ..., "ok": false,
+"error": "..."}. "new" takes an optional "fen".
+
+A session is kept as its start FEN and its moves, two bytes each
+(tt.encode_move). Only the most recently used sessions keep a built board,
+on the compact 64-byte representation; any other session is replayed from
+its moves when next used. Hints run on a process pool, so a long search
+holds up neither the event loop nor other sessions.
+
+    python -m src.server.server --port 8765
+"""
+import asyncio
+import json
+import logging
+import math
+import os
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Tuple
+
+from src.backend.book import load_book
+from src.backend.game import ChessBoard, parse_square, square_name
+from src.backend.search import Searcher
+from src.backend.tablebase import load_tablebases
+from src.backend.tt import decode_move, encode_move
+
+DEFAULT_PORT = 8765
+MAX_LIVE_BOARDS = 1024   # sessions whose board stays built
+MAX_LINE = 64 * 1024     # longest request accepted, in bytes
+HINT_TIME = 0.5          # seconds of search per hint, unless the request asks for less or more
+MAX_HINT_TIME = 5.0
+WORKER_TT_MB = 8
+
+Square = Tuple[int, int]
+Move = Tuple[Square, Square, Optional[str]]
+
+log = logging.getLogger(__name__)
+
+
+class ProtocolError(Exception):
+    """A request the server cannot carry out; the message goes back to the client."""
+
+
+def move_name(start: Square, end: Square, promotion: Optional[str] = None) -> str:
+    return square_name(start) + square_name(end) + (promotion or "").lower()
+
+
+def parse_move(text) -> Move:
+    """"e2e4" / "e7e8n" -> ((6, 4), (4, 4), None) / (..., "N")."""
+    if not isinstance(text, str) or len(text) not in (4, 5) or text[4:] and text[4].lower() not in "qrbn":
+        raise ProtocolError(f"bad move {text!r}: use coordinates like e2e4 or e7e8q")
+    try:
+        start, end = parse_square(text[:2]), parse_square(text[2:4])
+    except ValueError as exc:
+        raise ProtocolError(str(exc)) from None
+    return start, end, text[4:].upper() or None
+
+
+# ---------------- SESSIONS ----------------
+class Session:
+    __slots__ = ("id", "fen", "moves", "board")
+
+    def __init__(self, session_id: int, fen: Optional[str] = None):
+        self.id = session_id
+        self.fen = fen             # start position; None for the standard one
+        self.moves = array("H")    # encode_move codes from the start position
+        self.board: Optional[ChessBoard] = None   # built board, while the session is live
+
+
+def _replay(fen: Optional[str], moves) -> ChessBoard:
+    board = ChessBoard.from_fen(fen, compact=True) if fen else ChessBoard(compact=True)
+    for code in moves:
+        board.make_move(*decode_move(code))
+    return board
+
+
+class SessionStore:
+    """Sessions by id, with built boards for the max_live most recently used."""
+
+    def __init__(self, max_live: int = MAX_LIVE_BOARDS):
+        self.max_live = max_live
+        self.sessions: Dict[int, Session] = {}
+        self._live: "OrderedDict[int, Session]" = OrderedDict()   # least recently used first
+        self._next_id = 1
+        self.rebuilds = 0
+
+    def create(self, fen: Optional[str] = None) -> Session:
+        try:
+            board = _replay(fen, ())
+        except ValueError as exc:
+            raise ProtocolError(str(exc)) from None
+        if not board.find_king("white") or not board.find_king("black"):
+            raise ProtocolError("the position needs a king of each colour")
+        if board.is_in_check("black" if board.turn == "white" else "white"):
+            raise ProtocolError("the side not to move is in check")
+        session = Session(self._next_id, fen)
+        self._next_id += 1
+        self.sessions[session.id] = session
+        self._attach(session, board)
+        return session
+
+    def get(self, session_id) -> Session:
+        if not isinstance(session_id, int) or isinstance(session_id, bool):
+            raise ProtocolError(f"session must be an integer id, not {session_id!r}")
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise ProtocolError(f"no session {session_id!r}")
+        return session
+
+    def board(self, session: Session) -> ChessBoard:
+        if session.board is None:
+            self.rebuilds += 1
+            self._attach(session, _replay(session.fen, session.moves))
+        else:
+            self._live.move_to_end(session.id)
+        return session.board
+
+    def close(self, session: Session):
+        self.sessions.pop(session.id, None)
+        self._live.pop(session.id, None)
+        session.board = None
+
+    def _attach(self, session: Session, board: ChessBoard):
+        session.board = board
+        self._live[session.id] = session
+        while len(self._live) > self.max_live:
+            _, oldest = self._live.popitem(last=False)
+            oldest.board = None
+
+    @property
+    def live(self) -> int:
+        return len(self._live)
+
+
+# ---------------- HINT WORKERS ----------------
+_searcher: Optional[Searcher] = None
+_book = None
+
+
+def _init_worker(tt_mb: float):
+    global _searcher, _book
+    _searcher = Searcher(tt_mb=tt_mb, tablebases=load_tablebases())
+    _book = load_book()
+
+
+def _hint_job(fen: Optional[str], moves: array, time_limit: float) -> Tuple[Optional[str], Optional[int], int]:
+    """(move, score, depth) for the session position; book moves come back with no score and depth 0."""
+    game = _replay(fen, moves)
+    move = _book.choose(game) if _book else None
+    if move:
+        return move_name(*move), None, 0
+    result = _searcher.search(game, time_limit)
+    return (move_name(*result.move) if result.move else None), result.score, result.depth
+
+
+# ---------------- SERVER ----------------
+class GameServer:
+    """Serve the protocol above on host:port (port 0 picks a free port, stored in .port once started)."""
+
+    OPS = ("new", "move", "legal", "status", "undo", "hint", "close", "stats")
+
+    def __init__(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT, hint_workers: Optional[int] = None,
+                 max_live: int = MAX_LIVE_BOARDS):
+        self.host, self.port = host, port
+        self.hint_workers = hint_workers or os.cpu_count() or 1
+        self.store = SessionStore(max_live)
+        self.connections = 0
+        self.requests = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._clients: Dict[asyncio.Task, asyncio.StreamWriter] = {}
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(self.hint_workers, initializer=_init_worker, initargs=(WORKER_TT_MB,))
+
+    async def start(self):
+        self._executor = self._new_executor()
+        self._server = await asyncio.start_server(self._serve_client, self.host, self.port, limit=MAX_LINE)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        if self._server:
+            self._server.close()
+            for writer in self._clients.values():
+                writer.close()   # each handler then sees end of input and returns
+            await asyncio.gather(*self._clients, return_exceptions=True)
+            await self._server.wait_closed()
+        if self._executor:
+            self._executor.shutdown(cancel_futures=True)
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        task = asyncio.current_task()
+        self._clients[task] = writer
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:   # longer than MAX_LINE
+                    writer.write(b'{"id": null, "ok": false, "error": "request too long"}\n')
+                    break
+                if not line:
+                    break
+                writer.write(await self.handle_line(line) + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            del self._clients[task]
+            writer.close()
+
+    async def handle_line(self, line: bytes) -> bytes:
+        """One response line (without the newline) for one request line."""
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ProtocolError("a request must be a JSON object")
+            request_id = request.get("id")
+            response = {"id": request_id, "ok": True, **await self.handle(request)}
+        except json.JSONDecodeError:
+            response = {"id": None, "ok": False, "error": "bad JSON"}
+        except ProtocolError as exc:
+            response = {"id": request_id, "ok": False, "error": str(exc)}
+        except Exception:   # a bug or a broken worker must not cost the client its connection
+            log.exception("request failed: %r", line)
+            response = {"id": request_id, "ok": False, "error": "internal error"}
+        return json.dumps(response).encode()
+
+    async def handle(self, request: dict) -> dict:
+        self.requests += 1
+        op = request.get("op")
+        if op not in self.OPS:
+            raise ProtocolError(f"unknown op {op!r}: use one of {', '.join(self.OPS)}")
+        return await getattr(self, "_op_" + op)(request)
+
+    # ---------------- OPERATIONS ----------------
+    def _session(self, request: dict) -> Tuple[Session, ChessBoard]:
+        session = self.store.get(request.get("session"))
+        return session, self.store.board(session)
+
+    @staticmethod
+    def _state(board: ChessBoard) -> dict:
+        return {"fen": board.to_fen(), "turn": board.turn, "status": board.checkmate_status()}
+
+    async def _op_new(self, request):
+        fen = request.get("fen")
+        if fen is not None and not isinstance(fen, str):
+            raise ProtocolError("fen must be a string")
+        session = self.store.create(fen)
+        return {"session": session.id, **self._state(session.board)}
+
+    async def _op_move(self, request):
+        session, board = self._session(request)
+        start, end, promotion = parse_move(request.get("move"))
+        if board.checkmate_status():
+            raise ProtocolError("the game is over")
+        if (start, end) not in board.legal_moves():
+            raise ProtocolError(f"illegal move {request.get('move')}")
+        if board.get_piece(*start) not in ("P", "p") or end[0] not in (0, 7):
+            promotion = None
+        board.make_move(start, end, promotion)
+        session.moves.append(encode_move(start, end, promotion))
+        return self._state(board)
+
+    async def _op_legal(self, request):
+        _, board = self._session(request)
+        return {"moves": [move_name(start, end) for start, end in board.legal_moves()]}
+
+    async def _op_status(self, request):
+        session, board = self._session(request)
+        return {**self._state(board), "plies": len(session.moves)}
+
+    async def _op_undo(self, request):
+        session, board = self._session(request)
+        if not session.moves:
+            raise ProtocolError("nothing to undo")
+        board.unmake_move()
+        session.moves.pop()
+        return self._state(board)
+
+    async def _op_hint(self, request):
+        session, board = self._session(request)
+        try:
+            time_limit = float(request.get("time", HINT_TIME))
+        except (TypeError, ValueError):
+            raise ProtocolError("time must be a number of seconds") from None
+        if not 0 < time_limit < math.inf:   # also false for NaN, which json.loads accepts
+            raise ProtocolError("time must be a positive, finite number of seconds")
+        time_limit = min(time_limit, MAX_HINT_TIME)
+        if not board.legal_moves():
+            return {"move": None, "score": None, "depth": 0}
+        moves = array("H", session.moves)
+        executor = self._executor
+        try:
+            move, score, depth = await asyncio.get_running_loop().run_in_executor(
+                executor, _hint_job, session.fen, moves, time_limit)
+        except BrokenProcessPool:
+            # a worker died (e.g. killed for memory): later hints get a fresh pool
+            if self._executor is executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = self._new_executor()
+            raise ProtocolError("the hint worker failed; try again") from None
+        # other requests ran during the search: the hint is only good for the position it was asked for
+        if self.store.sessions.get(session.id) is not session or session.moves != moves:
+            raise ProtocolError("the position changed while the hint was searched")
+        return {"move": move, "score": score, "depth": depth}
+
+    async def _op_close(self, request):
+        self.store.close(self.store.get(request.get("session")))
+        return {}
+
+    async def _op_stats(self, request):
+        return {"sessions": len(self.store.sessions), "live_boards": self.store.live,
+                "rebuilds": self.store.rebuilds, "connections": self.connections, "requests": self.requests}
+
+
+# ---------------- COMMAND LINE ----------------
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Serve chess games over a JSON-lines protocol.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--hint-workers", type=int, help="hint processes (default: all cores)")
+    parser.add_argument("--max-live", type=int, default=MAX_LIVE_BOARDS, help="sessions that keep a built board")
+    args = parser.parse_args(argv)
+
+    async def serve():
+        async with GameServer(args.host, args.port, args.hint_workers, args.max_live) as server:
+            print(f"serving on {server.host}:{server.port} with {server.hint_workers} hint workers")
+            await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
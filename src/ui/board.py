@@ -1,12 +1,37 @@
+import queue
+import threading
+import time
 import tkinter as tk
-import random
-from src.backend.game import ChessBoard
+from collections import deque
+from tkinter import filedialog
+from src.backend.book import load_book
+from src.backend.game import ChessBoard, square_name
+from src.backend.pgn import game_to_pgn, result_from_status
+from src.backend.search import MATE, MATE_BOUND, Searcher
+from src.backend.selfplay import percentile
+from src.backend.tablebase import load_tablebases
+
+HINT_TIME = 1.0   # seconds of search per hint
+HINT_TT_MB = 32   # transposition table kept across hints
+HINT_POLL_MS = 50   # how often the main loop collects progress from the hint thread
+SQUARE_COLORS = ["#EEEED2", "#686096"]
+PIECE_FONT = ("Segoe UI Symbol", 40)
+MAX_HIGHLIGHTS = 27   # most moves one piece can have (a queen in the centre)
+FRAME_SAMPLES = 200   # frame times kept for the side panel readout
+ALL_SQUARES = [(r, c) for r in range(8) for c in range(8)]
 
 PIECE_UNICODE = {
     "K": "♔", "Q": "♕", "R": "♖", "B": "♗", "N": "♘", "P": "♙",
     "k": "♚", "q": "♛", "r": "♜", "b": "♝", "n": "♞", "p": "♟",
 }
 
+def format_score(score):
+    """Centipawns as pawns ("+0.35"), or mate in moves ("M3", "-M2")."""
+    if abs(score) > MATE_BOUND:
+        moves = (MATE - abs(score) + 1) // 2
+        return f"M{moves}" if score > 0 else f"-M{moves}"
+    return f"{score / 100:+.2f}"
+
 class ChessUI:
     def __init__(self, root):
         self.root = root
@@ -14,12 +39,20 @@ class ChessUI:
         self.square_size = 80
 
         self.game = ChessBoard()
+        self.searcher = Searcher(tt_mb=HINT_TT_MB, tablebases=load_tablebases())   # data/tablebases, if generated
+        self.book = load_book()   # data/book.bin, if it has been built
         self.selected = None
         self.drag_item = None
         self.drag_offset = (0, 0)
         self.move_history = []
         self.hint_timer = None
+        self.hint_stop = None   # threading.Event of the running hint search
+        self.hint_id = 0        # bumped on every cancel, so late results of old hints are dropped
+        self.hint_poll = None
+        self.hint_queue = queue.Queue()   # (hint_id, SearchResult, finished) from the hint thread
+        self.hint_lock = threading.Lock()   # one search at a time on the shared searcher
         self.highlighted = []  # store highlighted squares
+        self.frame_times = deque(maxlen=FRAME_SAMPLES)
 
         # canvas (board on left)
         self.canvas = tk.Canvas(root, width=8*self.square_size, height=8*self.square_size)
@@ -33,6 +66,9 @@ class ChessUI:
                                font=("Segoe UI", 14, "bold"), fg="white", bg="#221F31")
         self.status.pack(pady=10)
 
+        self.hint_label = tk.Label(side_panel, text="", font=("Segoe UI", 10), fg="#9A98B0", bg="#221F31")
+        self.hint_label.pack()
+
         btn_frame = tk.Frame(side_panel, bg="#221f31")
         btn_frame.pack(pady=10)
         tk.Button(btn_frame, text="🎮 New Game", command=self.new_game,
@@ -41,6 +77,8 @@ class ChessUI:
                   bg="#F44336", fg="white", font=("Segoe UI", 11, "bold")).pack(side=tk.LEFT, padx=5)
         tk.Button(btn_frame, text="💡 Hint", command=self.show_hint,
                   bg="#255A86", fg="white", font=("Segoe UI", 11, "bold")).pack(side=tk.LEFT, padx=5)
+        tk.Button(btn_frame, text="💾 PGN", command=self.save_pgn,
+                  bg="#8A6D1F", fg="white", font=("Segoe UI", 11, "bold")).pack(side=tk.LEFT, padx=5)
 
         white_frame = tk.LabelFrame(side_panel, text="White's Captured",
                                     font=("Segoe UI", 12, "bold"), fg="white", bg="#221F31")
@@ -54,6 +92,10 @@ class ChessUI:
         self.black_tray = tk.Listbox(black_frame, height=5, width=20, font=("Segoe UI", 14))
         self.black_tray.pack()
 
+        self.frame_label = tk.Label(side_panel, text="", font=("Segoe UI", 9), fg="#9A98B0", bg="#221F31")
+        self.frame_label.pack(side=tk.BOTTOM, pady=5)
+
+        self.build_board()
         self.draw_board()
 
         # event bindings
@@ -65,53 +107,156 @@ class ChessUI:
 
     # ---------------- HINT TIMER ----------------
     def start_hint_timer(self):
+        """(Re)start the 30s hint countdown; a hint still being searched is cancelled."""
+        self.cancel_hint()
         if self.hint_timer:
             self.root.after_cancel(self.hint_timer)
         self.hint_timer = self.root.after(30000, self.show_hint)  # 30s delay
 
+    def cancel_hint(self):
+        if self.hint_stop:
+            self.hint_stop.set()
+            self.hint_stop = None
+        self.hint_id += 1
+        if self.hint_poll:
+            self.root.after_cancel(self.hint_poll)
+            self.hint_poll = None
+        self.hint_label.config(text="")
+
     def show_hint(self):
-        moves = self.game.get_legal_moves(self.game.turn)
-        if moves:
-            start, end = random.choice(moves)
-            self.flash_hint(start[0], start[1], "blue")
-            self.flash_hint(end[0], end[1], "blue")
+        """Flash a book move at once, or start a search on a worker thread and poll it from the main loop."""
+        self.cancel_hint()
+        if self.hint_timer:
+            self.root.after_cancel(self.hint_timer)
+            self.hint_timer = None
+        move = self.book.choose(self.game) if self.book else None
+        if move is not None or not self.game.legal_moves():
+            self.flash_hint(move)
+            self.start_hint_timer()
+            return
+        self.hint_stop = stop = threading.Event()
+        # the thread searches its own copy, so moves made meanwhile cannot disturb it
+        threading.Thread(target=self.search_hint, args=(self.game.copy(), stop, self.hint_id), daemon=True).start()
+        self.hint_label.config(text="Hint: thinking...")
+        self.hint_poll = self.root.after(HINT_POLL_MS, self.poll_hint)
+
+    def search_hint(self, game, stop, hint_id):
+        # hint thread: no Tk calls here, everything goes through hint_queue
+        with self.hint_lock:
+            if stop.is_set():
+                return
+            result = self.searcher.search(game, HINT_TIME, stop=stop,
+                                          on_iteration=lambda r: self.hint_queue.put((hint_id, r, False)))
+        self.hint_queue.put((hint_id, result, True))
+
+    def poll_hint(self):
+        self.hint_poll = None
+        done = None
+        while True:
+            try:
+                hint_id, result, finished = self.hint_queue.get_nowait()
+            except queue.Empty:
+                break
+            if hint_id != self.hint_id:
+                continue   # from a cancelled hint
+            if finished:
+                done = result
+            else:
+                self.hint_label.config(text=f"Hint: depth {result.depth}, score {format_score(result.score)}, "
+                                            f"{result.nodes} nodes")
+        if done is None:
+            self.hint_poll = self.root.after(HINT_POLL_MS, self.poll_hint)
+            return
+        self.hint_stop = None
         self.start_hint_timer()
-
-    def flash_hint(self, row, col, color):
-        x1, y1 = col*self.square_size, row*self.square_size
-        x2, y2 = x1+self.square_size, y1+self.square_size
-        rect = self.canvas.create_rectangle(x1, y1, x2, y2, fill=color, stipple="gray50", tags="hint")
-        self.root.after(1000, lambda: self.canvas.delete(rect))
+        self.flash_hint(done.move)
+        if done.move:
+            self.hint_label.config(text=f"Hint: {square_name(done.move[0])}{square_name(done.move[1])} "
+                                        f"(depth {done.depth}, score {format_score(done.score)})")
+
+    def flash_hint(self, move):
+        if move:
+            start, end = move[:2]
+            self.flash(self.hint_items[0], start, 1000)
+            self.flash(self.hint_items[1], end, 1000)
+
+    def flash(self, item, square, ms):
+        """Show overlay item on square for ms milliseconds."""
+        if item in self.flash_timers:
+            self.root.after_cancel(self.flash_timers[item])
+        self.canvas.coords(item, *self.square_bounds(*square))
+        self.canvas.itemconfig(item, state="normal")
+
+        def hide():
+            self.canvas.itemconfig(item, state="hidden")
+            del self.flash_timers[item]
+        self.flash_timers[item] = self.root.after(ms, hide)
 
     # ---------------- BOARD ----------------
-    def draw_board(self):
+    def build_board(self):
+        """Create every canvas item once; later frames only reconfigure them.
+
+        Stacking from the bottom: squares, pieces, then overlays (move
+        highlights, hint and illegal-move flashes), all hidden to start with.
+        """
         self.canvas.delete("all")
-        colors = ["#EEEED2", "#686096"]
-
-        for r in range(8):
-            for c in range(8):
-                x1, y1 = c*self.square_size, r*self.square_size
-                x2, y2 = x1+self.square_size, y1+self.square_size
-                color = colors[(r+c) % 2]
-                self.canvas.create_rectangle(x1, y1, x2, y2, fill=color, outline=color)
-
-        # draw pieces
-        for r in range(8):
-            for c in range(8):
-                piece = self.game.get_piece(r, c)
-                if piece:
-                    x = c*self.square_size + self.square_size/2
-                    y = r*self.square_size + self.square_size/2
-                    self.canvas.create_text(x, y,
-                                            text=PIECE_UNICODE[piece],
-                                            font=("Segoe UI Symbol", 40),
-                                            tags=f"piece_{r}_{c}")
-
-        # redraw highlighted moves (drawn on top of squares but under dragged piece when lifted)
-        for (row, col) in self.highlighted:
-            x1, y1 = col*self.square_size, row*self.square_size
-            x2, y2 = x1+self.square_size, y1+self.square_size
-            self.canvas.create_rectangle(x1, y1, x2, y2, outline="yellow", width=3, tags="highlight")
+        self.square_items = [[self.canvas.create_rectangle(*self.square_bounds(r, c), tags="square",
+                                                           fill=SQUARE_COLORS[(r+c) % 2],
+                                                           outline=SQUARE_COLORS[(r+c) % 2])
+                              for c in range(8)] for r in range(8)]
+        # one text item per square, empty where there is no piece
+        self.piece_items = [[self.canvas.create_text(*self.square_center(r, c), text="", font=PIECE_FONT,
+                                                     tags="piece")
+                             for c in range(8)] for r in range(8)]
+        self.shown = [["" for _ in range(8)] for _ in range(8)]   # piece each text item displays
+        self.highlight_items = [self.canvas.create_rectangle(0, 0, 0, 0, outline="yellow", width=3,
+                                                             state="hidden", tags="overlay")
+                                for _ in range(MAX_HIGHLIGHTS)]
+        self.hint_items = [self.canvas.create_rectangle(0, 0, 0, 0, fill="blue", stipple="gray50",
+                                                        state="hidden", tags="overlay")
+                           for _ in range(2)]
+        self.illegal_item = self.canvas.create_rectangle(0, 0, 0, 0, fill="red", stipple="gray50",
+                                                         state="hidden", tags="overlay")
+        self.flash_timers = {}
+        self.shown_highlights = []
+
+    def draw_board(self, squares=None):
+        """Bring the canvas in line with the game and self.highlighted.
+
+        Only the given squares are checked (e.g. last_move_squares()); with
+        none, all 64 are. Pieces are changed in place and only if they differ
+        from what is shown. The time taken, including Tk's repaint, is
+        recorded in frame_times.
+        """
+        t0 = time.perf_counter()
+        board = self.game.board
+        for r, c in ALL_SQUARES if squares is None else squares:
+            piece = board[r][c] or ""
+            if piece != self.shown[r][c]:
+                self.canvas.itemconfig(self.piece_items[r][c], text=PIECE_UNICODE[piece] if piece else "")
+                self.shown[r][c] = piece
+
+        if self.highlighted != self.shown_highlights:
+            for i, item in enumerate(self.highlight_items):
+                if i < len(self.highlighted):
+                    self.canvas.coords(item, *self.square_bounds(*self.highlighted[i]))
+                    self.canvas.itemconfig(item, state="normal")
+                elif i < len(self.shown_highlights):
+                    self.canvas.itemconfig(item, state="hidden")
+            self.shown_highlights = list(self.highlighted)
+
+        self.canvas.update_idletasks()
+        self.frame_times.append(time.perf_counter() - t0)
+        times = sorted(self.frame_times)
+        self.frame_label.config(text=f"frame {self.frame_times[-1] * 1000:.2f} ms, "
+                                     f"p90 {percentile(times, 0.9) * 1000:.2f} ms")
+
+    def square_bounds(self, row, col):
+        x1, y1 = col*self.square_size, row*self.square_size
+        return x1, y1, x1+self.square_size, y1+self.square_size
+
+    def square_center(self, row, col):
+        return col*self.square_size + self.square_size/2, row*self.square_size + self.square_size/2
 
     def get_square(self, x, y):
         col = x // self.square_size
@@ -119,11 +264,7 @@ class ChessUI:
         return (row, col) if 0 <= row < 8 and 0 <= col < 8 else None
 
     def flash_illegal_move(self, row, col):
-        x1, y1 = col*self.square_size, row*self.square_size
-        x2, y2 = x1+self.square_size, y1+self.square_size
-        tag = f"flash_{row}_{col}"
-        self.canvas.create_rectangle(x1, y1, x2, y2, fill="red", stipple="gray50", tags=tag)
-        self.root.after(400, lambda: self.canvas.delete(tag))
+        self.flash(self.illegal_item, (row, col), 400)
 
     # ---------------- EVENTS ----------------
     def on_click(self, event):
@@ -133,45 +274,35 @@ class ChessUI:
             self.selected = None
             self.drag_item = None
             self.highlighted = []
-            self.draw_board()
+            self.draw_board(())
             return
 
         row, col = pos
         piece = self.game.get_piece(row, col)
+        if self.game.checkmate_status():
+            piece = None   # game over (including draws): nothing to pick up
 
         if piece and ((piece.isupper() and self.game.turn=="white") or (piece.islower() and self.game.turn=="black")):
             self.selected = (row, col)
 
             # compute highlights first
-            self.highlighted = [end for (start, end) in self.game.get_legal_moves(self.game.turn) if start == (row, col)]
-
-            # redraw so highlights appear
-            self.draw_board()
-
-            # now find the new canvas item for this piece and prepare drag
-            ids = self.canvas.find_withtag(f"piece_{row}_{col}")
-            if ids:
-                self.drag_item = ids[0]
-                # lift it above everything so it drags on top
-                try:
-                    self.canvas.lift(self.drag_item)
-                except Exception:
-                    pass
-                # compute offset so piece doesn't jump
-                coords = self.canvas.coords(self.drag_item)
-                if coords and len(coords) >= 2:
-                    self.drag_offset = (coords[0] - event.x, coords[1] - event.y)
-                else:
-                    self.drag_offset = (0,0)
-            else:
-                self.drag_item = None
-                self.drag_offset = (0,0)
+            self.highlighted = [end for (start, end) in self.game.legal_moves() if start == (row, col)]
+
+            # move the highlight rectangles; no pieces changed
+            self.draw_board(())
+
+            # lift the piece above everything so it drags on top
+            self.drag_item = self.piece_items[row][col]
+            self.canvas.tag_raise(self.drag_item)
+            # compute offset so piece doesn't jump
+            x, y = self.square_center(row, col)
+            self.drag_offset = (x - event.x, y - event.y)
         else:
             # clicked empty square or opponent piece -> deselect
             self.selected = None
             self.drag_item = None
             self.highlighted = []
-            self.draw_board()
+            self.draw_board(())
 
     def on_drag(self, event):
         # move piece with mouse while keeping offset
@@ -186,11 +317,13 @@ class ChessUI:
 
         target = self.get_square(event.x, event.y)
         sr, sc = self.selected
+        changed = []
 
         if target:
-            captured = self.game.move_piece(self.selected, target)
-            if captured is not None or captured == "":
-                # valid move
+            # legal_moves() is cached, so this reuses the list built for the highlights
+            if (self.selected, target) in self.game.legal_moves():
+                captured = self.game.make_move(self.selected, target)
+                changed = self.game.last_move_squares()
                 self.move_history.append((self.selected, target, captured))
                 if captured:
                     if captured.isupper():
@@ -204,12 +337,15 @@ class ChessUI:
                 # invalid move: flash start square and snap back (red flash)
                 self.flash_illegal_move(sr, sc)
 
-        # cleanup and redraw authoritative board
+        # snap the dragged item back onto its square, under the overlays, and redraw what the move changed
+        if self.drag_item:
+            self.canvas.coords(self.drag_item, *self.square_center(sr, sc))
+            self.canvas.tag_lower(self.drag_item, "overlay")
         self.selected = None
         self.drag_item = None
         self.drag_offset = (0,0)
         self.highlighted = []
-        self.draw_board()
+        self.draw_board(changed)
 
     # ---------------- CONTROLS ----------------
     def new_game(self):
@@ -225,12 +361,9 @@ class ChessUI:
     def undo_move(self):
         if not self.move_history:
             return
-        (sr, sc), (er, ec), captured = self.move_history.pop()
-        piece = self.game.get_piece(er, ec)
-        # naive restore (keeps your original undo behavior)
-        self.game.board[sr][sc] = piece
-        self.game.board[er][ec] = captured
-        self.game._switch_turn()
+        _, _, captured = self.move_history.pop()
+        changed = self.game.last_move_squares()
+        self.game.unmake_move()
         if captured:
             if captured.isupper() and self.white_tray.size() > 0:
                 self.white_tray.delete(tk.END)
@@ -238,14 +371,83 @@ class ChessUI:
                 self.black_tray.delete(tk.END)
         self.status.config(text=f"{self.game.turn.capitalize()}'s turn")
         self.highlighted = []
-        self.draw_board()
+        self.draw_board(changed)
         self.start_hint_timer()
 
+    def save_pgn(self):
+        path = filedialog.asksaveasfilename(defaultextension=".pgn",
+                                            filetypes=[("PGN files", "*.pgn"), ("All files", "*.*")])
+        if not path:
+            return
+        headers = {"Event": "Group 20 Chess", "White": "White", "Black": "Black",
+                   "Result": result_from_status(self.game.checkmate_status())}
+        with open(path, "w", encoding="utf-8") as handle:
+            handle.write(game_to_pgn([(start, end) for start, end, _ in self.move_history], headers))
+
+
+# ---------------- BENCHMARK ----------------
+def _rebuild_frame(canvas, game, square_size):
+    """One frame the way the board used to be drawn: delete everything and create it again."""
+    canvas.delete("all")
+    for r in range(8):
+        for c in range(8):
+            x1, y1 = c*square_size, r*square_size
+            color = SQUARE_COLORS[(r+c) % 2]
+            canvas.create_rectangle(x1, y1, x1+square_size, y1+square_size, fill=color, outline=color)
+    for r in range(8):
+        for c in range(8):
+            piece = game.get_piece(r, c)
+            if piece:
+                canvas.create_text(c*square_size + square_size/2, r*square_size + square_size/2,
+                                   text=PIECE_UNICODE[piece], font=PIECE_FONT)
+    canvas.update_idletasks()
+
+
+def benchmark(root, moves=200, seed=0):
+    """Frame times (seconds) over `moves` random moves: incremental drawing vs rebuilding the canvas."""
+    import random
+    rng = random.Random(seed)
+    ui = ChessUI(root)
+    root.update()
+    baseline = tk.Canvas(root, width=8*ui.square_size, height=8*ui.square_size)
+    baseline.pack(side=tk.LEFT)
+    incremental, rebuilt = [], []
+    for _ in range(moves):
+        legal = ui.game.legal_moves()
+        if not legal or ui.game.checkmate_status():
+            ui.new_game()
+            continue
+        ui.game.make_move(*rng.choice(legal))
+        ui.draw_board(ui.game.last_move_squares())
+        incremental.append(ui.frame_times[-1])
+        t0 = time.perf_counter()
+        _rebuild_frame(baseline, ui.game, ui.square_size)
+        rebuilt.append(time.perf_counter() - t0)
+    return incremental, rebuilt
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Play chess, or measure board frame times.")
+    parser.add_argument("--benchmark", action="store_true", help="time incremental frames against full rebuilds")
+    parser.add_argument("--moves", type=int, default=200)
+    args = parser.parse_args(argv)
 
-if __name__ == "__main__":
     root = tk.Tk()
-    ChessUI(root)
-    root.mainloop()
+    if not args.benchmark:
+        ChessUI(root)
+        root.mainloop()
+        return
+    incremental, rebuilt = benchmark(root, args.moves)
+    root.destroy()
+    for name, times in (("incremental", incremental), ("rebuild", rebuilt)):
+        times.sort()
+        print(f"{name:>12}: mean {sum(times) / len(times) * 1000:.3f} ms, "
+              f"p50 {percentile(times, 0.5) * 1000:.3f} ms, p99 {percentile(times, 0.99) * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
 
 
 
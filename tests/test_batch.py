@@ -0,0 +1,36 @@
+from src.backend.batch import analyze, analyze_many
+
+FENS = [
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+    "rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3",   # fool's mate
+    "r1bqkb1r/pppp1ppp/2n2n2/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w KQkq - 4 4",
+    "7k/5Q2/6K1/8/8/8/8/8 b - - 0 1",                                  # stalemate
+]
+
+def test_analyze_statuses():
+    start, mated, scholar, stalemate = [analyze(fen) for fen in FENS]
+    assert start.legal_moves == 20 and start.status is None and start.best_move is None
+    assert mated.legal_moves == 0 and mated.in_check and "Black wins" in mated.status
+    assert stalemate.legal_moves == 0 and not stalemate.in_check and "Stalemate" in stalemate.status
+    assert analyze(FENS[2], depth=2).best_move == "h5f7"
+
+def test_pool_matches_serial_and_keeps_order():
+    fens = FENS * 3
+    serial = list(analyze_many(fens, depth=1, processes=1))
+    pooled = list(analyze_many(iter(fens), depth=1, processes=2, chunksize=2))
+    # node counts depend on what each worker's transposition table has seen
+    assert [a[:4] for a in pooled] == [a[:4] for a in serial]
+    assert [a.legal_moves for a in pooled[:4]] == [20, 0, 43, 0]
+
+def test_pool_reads_input_in_bounded_windows():
+    pulled = []
+
+    def fens():
+        for i in range(1000):
+            pulled.append(i)
+            yield FENS[0]
+
+    results = analyze_many(fens(), processes=2, chunksize=4)
+    assert next(results).legal_moves == 20
+    assert len(pulled) <= 2 * 2 * 4 + 4   # two chunks per worker in flight, plus the one being read
+    results.close()
@@ -0,0 +1,63 @@
+import os
+import random
+
+import pytest
+
+from src.backend.book import RECORD, OpeningBook, build_book, load_book
+from src.backend.game import ChessBoard
+
+OPENINGS = os.path.join(os.path.dirname(__file__), "..", "data", "openings.pgn")
+
+GAMES = """[Result "1-0"]
+
+1. e4 e5 2. Nf3 1-0
+
+[Result "0-1"]
+
+1. e4 c5 0-1
+
+[Result "1/2-1/2"]
+
+1. d4 d5 1/2-1/2
+"""
+
+
+def test_build_and_probe(tmp_path):
+    path = tmp_path / "book.bin"
+    count = build_book([OPENINGS], str(path))
+    assert path.stat().st_size == count * RECORD.size
+    keys = [RECORD.unpack_from(path.read_bytes(), i * RECORD.size)[0] for i in range(count)]
+    assert keys == sorted(keys)
+
+    game = ChessBoard()
+    with OpeningBook(str(path)) as book:
+        assert book.choose(game) == ((6, 4), (4, 4), None)   # e4 is the most common first move
+        rng = random.Random(1)
+        for _ in range(6):
+            move = book.choose(game, rng)
+            if move is None:
+                break
+            assert (move[0], move[1]) in game.legal_moves()
+            game.make_move(*move)
+        assert book.choose(ChessBoard.from_fen("4k3/8/8/8/8/8/8/4K3 w - - 0 1")) is None
+
+
+def test_weights_follow_results(tmp_path):
+    pgn, path = tmp_path / "games.pgn", tmp_path / "book.bin"
+    pgn.write_text(GAMES)
+    build_book([str(pgn)], str(path))
+    book = OpeningBook(str(path))
+    assert book.entries(ChessBoard().zobrist_key) == [(((6, 4), (4, 4), None), 2), (((6, 3), (4, 3), None), 1)]
+    game = ChessBoard()
+    game.make_move((6, 4), (4, 4))
+    assert book.entries(game.zobrist_key) == [(((1, 2), (3, 2), None), 2)]   # c5 won, e5 lost
+    book.close()
+
+
+def test_missing_and_malformed_books(tmp_path):
+    assert load_book(str(tmp_path / "none.bin")) is None
+    (tmp_path / "empty.bin").write_bytes(b"")
+    assert len(OpeningBook(str(tmp_path / "empty.bin"))) == 0
+    (tmp_path / "bad.bin").write_bytes(b"x" * 20)
+    with pytest.raises(ValueError):
+        OpeningBook(str(tmp_path / "bad.bin"))
@@ -37,11 +37,11 @@ def test_knight_jump():
 def test_rook_movement():
     game = ChessBoard()
     # Clear path for rook
-    game.board[6][0] = None
-    game.board[5][0] = None
+    game.board[6][0] = ""
     moved = game.move_piece((7, 0), (5, 0))  # white rook up
-    assert moved is None
+    assert moved == ""   # legal, nothing captured
     assert game.get_piece(5, 0) == "R"
+    assert not game.castling_rights["Q"]
 
 def test_checkmate_detection():
     game = ChessBoard()
@@ -62,3 +62,282 @@ def test_pawn_promotion():
     game.move_piece((1, 0), (0, 0))  # promote
     promoted = game.get_piece(0, 0)
     assert promoted in ["Q", "R", "B", "N"]  # promotion must happen
+
+
+def _scan_legal_moves(game, color):
+    # reference: the original 64x64 scan over _is_legal_move + is_in_check
+    moves = []
+    ep = game.en_passant
+    for sr in range(8):
+        for sc in range(8):
+            piece = game.board[sr][sc]
+            if not piece or piece.isupper() != (color == "white"):
+                continue
+            for er in range(8):
+                for ec in range(8):
+                    if game._is_legal_move(piece, (sr, sc), (er, ec)):
+                        captured = game.board[er][ec]
+                        ep_pawn = game.board[sr][ec]
+                        game.board[er][ec] = piece
+                        game.board[sr][sc] = ""
+                        if piece in ["P", "p"] and (er, ec) == ep:
+                            game.board[sr][ec] = ""
+                        in_check = game.is_in_check(color)
+                        game.board[sr][ec] = ep_pawn
+                        game.board[sr][sc] = piece
+                        game.board[er][ec] = captured
+                        if not in_check:
+                            moves.append(((sr, sc), (er, ec)))
+    return moves
+
+def test_move_generator_matches_scan():
+    import random
+    rng = random.Random(20)
+    for _ in range(10):
+        game = ChessBoard()
+        for _ in range(60):
+            for color in ("white", "black"):
+                assert sorted(game.get_legal_moves(color)) == sorted(_scan_legal_moves(game, color))
+            moves = game.get_legal_moves(game.turn)
+            if not moves:
+                break
+            game.move_piece(*rng.choice(moves))
+
+def test_piece_tracking_follows_moves():
+    import random
+    rng = random.Random(2)
+    game = ChessBoard()
+    for _ in range(80):
+        moves = game.get_legal_moves(game.turn)
+        if not moves:
+            break
+        game.move_piece(*rng.choice(moves))
+        tracked = ({c: set(s) for c, s in game._pieces.items()}, dict(game._kings))
+        game.resync()
+        assert tracked == (game._pieces, game._kings)
+
+def test_hand_edits_are_picked_up_by_get_legal_moves():
+    game = ChessBoard()
+    game.board[4][4] = "Q"   # written directly, without resync()
+    moves = game.get_legal_moves("white")
+    assert ((4, 4), (1, 4)) in moves and ((4, 4), (2, 2)) in moves
+    assert sorted(moves) == sorted(_scan_legal_moves(game, "white"))
+    game.board[6][3], game.board[5][3] = "", "P"   # d2-d3 by hand: the piece count stays the same
+    assert ((5, 3), (4, 3)) in game.get_legal_moves("white")
+    assert sorted(game.get_legal_moves("white")) == sorted(_scan_legal_moves(game, "white"))
+    assert game.zobrist_key == game.compute_zobrist_key()   # the rebuild also refreshed the key
+
+def test_square_attacked():
+    game = ChessBoard()
+    assert game.is_square_attacked((5, 0), "white")   # b2 pawn and b1 knight
+    assert not game.is_square_attacked((4, 4), "white")
+    game.move_piece((6, 4), (4, 4))  # e2-e4 opens the f1 bishop
+    assert game.is_square_attacked((2, 0), "white")
+
+def test_compact_backend_matches_list_board():
+    import random
+    rng = random.Random(7)
+    game, packed = ChessBoard(), ChessBoard(compact=True)
+    for _ in range(60):
+        moves = game.get_legal_moves(game.turn)
+        assert sorted(packed.get_legal_moves(packed.turn)) == sorted(moves)
+        if not moves:
+            break
+        move = rng.choice(moves)
+        assert packed.move_piece(*move) == game.move_piece(*move)
+        assert [list(row) for row in packed.board] == game.board
+
+def test_pack_round_trip():
+    game = ChessBoard()
+    game.move_piece((6, 4), (4, 4))
+    data = game.pack()
+    assert len(data) == 66
+    copy = ChessBoard.from_packed(data)
+    assert copy.board == game.board
+    assert (copy.turn, copy.en_passant, copy.castling_rights) == ("black", (5, 4), game.castling_rights)
+    assert copy.pack() == data
+
+def _state(game):
+    return ([list(row) for row in game.board], game.turn, game.en_passant,
+            dict(game.castling_rights), {c: set(s) for c, s in game._pieces.items()})
+
+def test_unmake_restores_state():
+    import random
+    rng = random.Random(11)
+    game = ChessBoard()
+    for _ in range(100):
+        before = _state(game)
+        for move in game.get_legal_moves(game.turn):
+            game.make_move(*move)
+            assert game.unmake_move() == move
+            assert _state(game) == before
+        moves = game.get_legal_moves(game.turn)
+        if not moves:
+            break
+        game.make_move(*rng.choice(moves))
+
+def test_castling_rules():
+    game = ChessBoard()
+    game.board = [
+        ["r","","","","k","","","r"],
+        ["","","","","","","",""],
+        ["","","","","","","",""],
+        ["","","","","","","",""],
+        ["","","","","","","",""],
+        ["","","","","","","","b"],
+        ["","","","","","","",""],
+        ["R","","","","K","","","R"],
+    ]
+    moves = game.get_legal_moves("white")
+    assert ((7, 4), (7, 2)) in moves       # queenside is free
+    assert ((7, 4), (7, 6)) not in moves   # f1 is attacked by the bishop
+    # capturing a rook on its home square removes that right
+    game.turn = "black"
+    assert game.move_piece((0, 0), (7, 0)) == "R"
+    assert not game.castling_rights["Q"]
+    assert ((7, 4), (7, 2)) not in game.get_legal_moves("white")
+
+def test_unmake_castling_and_en_passant():
+    game = ChessBoard()
+    for move in [((6, 4), (4, 4)), ((1, 0), (2, 0)), ((4, 4), (3, 4)), ((1, 3), (3, 3))]:
+        game.move_piece(*move)
+    before = _state(game)
+    assert game.move_piece((3, 4), (2, 3)) == "p"   # exd6 e.p.
+    assert game.get_piece(3, 3) == ""
+    game.unmake_move()
+    assert _state(game) == before
+
+    game = ChessBoard()
+    for move in [((6, 4), (4, 4)), ((1, 4), (3, 4)), ((7, 6), (5, 5)), ((1, 0), (2, 0)),
+                 ((7, 5), (4, 2)), ((2, 0), (3, 0))]:
+        game.move_piece(*move)
+    before = _state(game)
+    game.move_piece((7, 4), (7, 6))  # O-O
+    assert game.get_piece(7, 5) == "R" and not game.castling_rights["K"]
+    game.unmake_move()
+    assert _state(game) == before
+
+def test_unmake_restores_the_destination_square():
+    game = ChessBoard()
+    game.board = [[None] * 8 for _ in range(8)]   # hand-built board with None for empty squares
+    game.board[7][4], game.board[0][4], game.board[6][0] = "K", "k", "P"
+    game.make_move((6, 0), (5, 0))
+    game.unmake_move()
+    assert game.board[5][0] is None and game.board[6][0] == "P"
+
+def test_zobrist_key_incremental(monkeypatch):
+    import random
+    monkeypatch.setattr(ChessBoard, "debug", True)   # make/unmake verify against a recompute
+    rng = random.Random(5)
+    for _ in range(5):
+        game = ChessBoard()
+        for _ in range(120):
+            moves = game.get_legal_moves(game.turn)
+            if not moves:
+                break
+            for move in moves:
+                game.make_move(*move)
+                game.unmake_move()
+            game.make_move(*rng.choice(moves))
+
+def test_zobrist_key_transposition():
+    a, b = ChessBoard(), ChessBoard()
+    for move in [((7, 6), (5, 5)), ((0, 6), (2, 5)), ((7, 1), (5, 2))]:
+        a.move_piece(*move)
+    for move in [((7, 1), (5, 2)), ((0, 6), (2, 5)), ((7, 6), (5, 5))]:
+        b.move_piece(*move)
+    assert a.zobrist_key == b.zobrist_key
+    a.move_piece((1, 4), (3, 4))
+    b.move_piece((1, 4), (2, 4))
+    assert a.zobrist_key != b.zobrist_key
+
+def test_position_cache_follows_moves():
+    game = ChessBoard()
+    moves = game.legal_moves()
+    assert list(moves) == game.get_legal_moves("white")
+    game.make_move((6, 5), (5, 5))
+    assert game.legal_moves() is not moves
+    game.unmake_move()
+    assert game.legal_moves() is moves   # same position, same cached tuple
+    for move in [((6, 5), (5, 5)), ((1, 4), (3, 4)), ((6, 6), (4, 6)), ((0, 3), (4, 7))]:
+        game.make_move(*move)
+    assert not game.has_legal_moves("white") and game.has_legal_moves("black")
+    assert game.checkmate_status() == "Checkmate! Black wins."
+    game.board = game._create_starting_board()   # the setter resyncs and empties the cache
+    assert game.checkmate_status() is None and len(game.legal_moves()) == 20
+
+def test_threefold_repetition():
+    game = ChessBoard()
+    shuffle = [((7, 6), (5, 5)), ((0, 6), (2, 5)), ((5, 5), (7, 6)), ((2, 5), (0, 6))]
+    for move in shuffle * 2:
+        assert game.checkmate_status() is None
+        game.make_move(*move)
+    assert game.repetition_count() == 3
+    assert game.checkmate_status() == "Draw by threefold repetition."
+    game.unmake_move()
+    assert game.repetition_count() == 2 and game.checkmate_status() is None
+
+def test_repetition_after_a_double_pawn_push():
+    game = ChessBoard()
+    # 1.e4 Nf6 2.Nf3 Ng8 3.Ng1 Nf6 4.Nf3 Ng8 5.Ng1: no black pawn can take on e3, so e3 does not count
+    game.make_move((6, 4), (4, 4))
+    shuffle = [((0, 6), (2, 5)), ((7, 6), (5, 5)), ((2, 5), (0, 6)), ((5, 5), (7, 6))]
+    for move in shuffle * 2:
+        game.make_move(*move)
+    assert game.repetition_count() == 3
+    assert game.checkmate_status() == "Draw by threefold repetition."
+
+def test_en_passant_key_only_when_capturable():
+    plain = ChessBoard.from_fen("4k3/8/8/8/4P3/8/8/4K3 b - - 0 1")
+    assert ChessBoard.from_fen("4k3/8/8/8/4P3/8/8/4K3 b - e3 0 1").zobrist_key == plain.zobrist_key
+    capturable = ChessBoard.from_fen("4k3/8/8/8/3pP3/8/8/4K3 b - e3 0 1")
+    assert capturable.zobrist_key != ChessBoard.from_fen("4k3/8/8/8/3pP3/8/8/4K3 b - - 0 1").zobrist_key
+
+def test_fifty_move_rule():
+    game = ChessBoard.from_fen("4k3/8/8/8/8/8/4P3/R3K3 w - - 99 80")
+    game.make_move((7, 0), (6, 0))
+    assert game.checkmate_status() == "Draw by the fifty-move rule."
+    game.unmake_move()
+    game.make_move((6, 4), (4, 4))   # a pawn move resets the clock
+    assert game.halfmove_clock == 0 and game.checkmate_status() is None
+
+@pytest.mark.parametrize("fen, draw", [
+    ("4k3/8/8/8/8/8/8/4K3 w - - 0 1", True),
+    ("4k3/8/8/8/8/8/8/4KN2 w - - 0 1", True),
+    ("2b1k3/8/8/8/8/8/8/4KB2 w - - 0 1", True),     # bishops on the same colour
+    ("1b2k3/8/8/8/8/8/8/4KB2 w - - 0 1", False),
+    ("4k3/8/8/8/8/8/8/3NKN2 w - - 0 1", False),
+    ("4k3/8/8/8/8/8/4P3/4K3 w - - 0 1", False),
+])
+def test_insufficient_material(fen, draw):
+    game = ChessBoard.from_fen(fen)
+    assert game.insufficient_material() == draw
+    assert (game.checkmate_status() == "Draw by insufficient material.") == draw
+
+def test_last_move_squares():
+    game = ChessBoard.from_fen("r3k3/8/8/3pP3/8/8/8/4K2R w Kq d6 0 1")
+    assert game.last_move_squares() == []
+    game.make_move((3, 4), (2, 3))   # en passant
+    assert game.last_move_squares() == [(3, 4), (2, 3), (3, 3)]
+    game.make_move((0, 4), (0, 2))   # queenside castling
+    assert game.last_move_squares() == [(0, 4), (0, 2), (0, 0), (0, 3)]
+    game.unmake_move()
+    assert game.last_move_squares() == [(3, 4), (2, 3), (3, 3)]
+
+def test_copy_is_independent():
+    game = ChessBoard()
+    game.make_move((6, 4), (4, 4))
+    copy = game.copy()
+    copy.make_move((1, 4), (3, 4))
+    assert game.to_fen() == "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1"
+    assert copy.unmake_move() and copy.unmake_move() and copy.to_fen() == ChessBoard().to_fen()
+    assert game.zobrist_key == game.compute_zobrist_key() and game.last_move_squares() == [(6, 4), (4, 4)]
+
+def test_copy_keeps_the_current_positions_moves():
+    game = ChessBoard()
+    moves = game.legal_moves()
+    copy = game.copy()
+    assert copy.legal_moves() is moves
+    copy.make_move(*moves[0])
+    copy.unmake_move()
+    assert copy.legal_moves() is moves and game.legal_moves() is moves
@@ -0,0 +1,55 @@
+import io
+import pytest
+from src.backend.game import ChessBoard
+from src.backend.epd import parse_epd, read_epd, write_epd
+from src.backend.perft import POSITIONS
+
+START = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+def test_start_position_fen():
+    assert ChessBoard().to_fen() == START
+    assert ChessBoard.from_fen(START).board == ChessBoard().board
+
+@pytest.mark.parametrize("name", sorted(POSITIONS))
+def test_fen_round_trip(name):
+    fen = POSITIONS[name][0]
+    assert ChessBoard.from_fen(fen).to_fen() == fen
+
+def test_fen_tracks_moves_and_counters():
+    game = ChessBoard()
+    game.move_piece((6, 4), (4, 4))
+    assert game.to_fen() == "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1"
+    game.move_piece((0, 6), (2, 5))
+    game.move_piece((7, 6), (5, 5))
+    assert game.to_fen().endswith(" b KQkq - 2 2")
+    game.unmake_move()
+    assert game.to_fen() == "rnbqkb1r/pppppppp/5n2/8/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 1 2"
+
+@pytest.mark.parametrize("fen", [
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP w KQkq - 0 1",      # 7 ranks
+    "rnbqkbnr/pppppppp/9/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR x KQkq - 0 1",
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq",
+    "4k3/8/8/4P3/8/8/8/4K3 w - f6 0 1",                      # no black pawn on f5
+    "4k3/8/8/8/8/8/4P3/4K3 w - f3 0 1",                      # wrong rank for white to move
+    "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e6 0 1",
+])
+def test_bad_fen_raises(fen):
+    with pytest.raises(ValueError):
+        ChessBoard.from_fen(fen)
+
+def test_epd_operations():
+    game, ops = parse_epd('r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - bm Bb5; id "ruy; lopez"; hmvc 2;')
+    assert ops == {"bm": "Bb5", "id": "ruy; lopez", "hmvc": "2"}
+    assert game.halfmove_clock == 2 and game.turn == "white"
+
+def test_epd_stream_round_trip():
+    lines = [f"{fen.rsplit(' ', 2)[0]} id \"{name}\";" for name, (fen, _) in sorted(POSITIONS.items())]
+    records = read_epd(io.StringIO("# perft positions\n\n" + "\n".join(lines) + "\n"))
+    out = io.StringIO()
+    write_epd(records, out)
+    assert out.getvalue().splitlines() == lines
+
+def test_epd_error_names_line():
+    with pytest.raises(ValueError, match="line 2"):
+        list(read_epd(io.StringIO(START.rsplit(" ", 2)[0] + "\nnot a position\n")))
@@ -0,0 +1,48 @@
+import json
+
+from src.backend import instrument
+from src.backend.game import ChessBoard
+from src.backend.perft import perft
+from src.backend.search import Searcher
+
+
+def test_disabled_leaves_methods_untouched():
+    original = ChessBoard.__dict__["get_legal_moves"]
+    with instrument.instrumented():
+        assert ChessBoard.__dict__["get_legal_moves"] is not original
+        assert instrument.enabled()
+    assert ChessBoard.__dict__["get_legal_moves"] is original
+    assert not instrument.enabled()
+
+
+def test_counts_calls_and_nodes():
+    with instrument.instrumented():
+        assert perft(ChessBoard(), 2) == 400
+    data = instrument.snapshot()
+    assert data["methods"]["get_legal_moves"]["calls"] == 21   # the root and each of its 20 children
+    assert data["nodes"] == data["methods"]["make_move"]["calls"] == 20
+    assert data["methods"]["get_legal_moves"]["seconds"] > 0 and data["nps"] > 0
+    perft(ChessBoard(), 1)
+    assert instrument.snapshot()["methods"]["get_legal_moves"]["calls"] == 21   # off again
+
+
+def test_cache_hit_rates_and_json():
+    game = ChessBoard()
+    with instrument.instrumented(["legal_moves"]):
+        game.legal_moves()
+        game.legal_moves()
+        Searcher(tt_mb=1).search(game, max_depth=3)
+    data = json.loads(instrument.snapshot_json())
+    assert set(data["methods"]) == {"legal_moves"}
+    assert data["caches"]["position"]["lookups"] >= 2 and data["caches"]["position"]["hits"] >= 1
+    assert data["caches"]["tt"]["lookups"] > 0 and 0 <= data["caches"]["tt"]["hit_rate"] <= 1
+
+
+def test_cold_checkmate_status_is_one_miss():
+    game = ChessBoard()
+    with instrument.instrumented():
+        game.checkmate_status()
+        assert instrument.snapshot()["caches"]["position"] == {"lookups": 1, "hits": 0, "hit_rate": 0.0}
+        game.checkmate_status()
+        game.has_legal_moves("black")   # the other side's moves are not cached
+    assert instrument.snapshot()["caches"]["position"] == {"lookups": 2, "hits": 1, "hit_rate": 0.5}
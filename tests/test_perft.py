@@ -0,0 +1,26 @@
+import pytest
+from src.backend.game import ChessBoard
+from src.backend.perft import POSITIONS, perft, divide
+
+@pytest.mark.parametrize("compact", [False, True])
+@pytest.mark.parametrize("name", sorted(POSITIONS))
+def test_perft_depth_2(name, compact):
+    fen, expected = POSITIONS[name]
+    assert perft(ChessBoard.from_fen(fen, compact=compact), 2) == expected[1]
+
+@pytest.mark.parametrize("name", ["start", "position3", "position4"])
+def test_perft_depth_3(name):
+    fen, expected = POSITIONS[name]
+    assert perft(ChessBoard.from_fen(fen), 3) == expected[2]
+
+def test_divide_sums_to_perft():
+    fen, expected = POSITIONS["kiwipete"]
+    counts = divide(ChessBoard.from_fen(fen), 2)
+    assert len(counts) == expected[0]
+    assert sum(counts.values()) == expected[1]
+
+def test_perft_leaves_board_unchanged():
+    game = ChessBoard.from_fen(POSITIONS["position5"][0])
+    before = (game.pack(), game.zobrist_key)
+    perft(game, 2)
+    assert (game.pack(), game.zobrist_key) == before
@@ -0,0 +1,65 @@
+import io
+import pytest
+from src.backend.game import ChessBoard
+from src.backend.pgn import game_to_pgn, move_to_san, parse_san, read_pgn, replay
+
+SAMPLE = """[Event "Casual"]
+[White "A"]
+[Black "B \\"the second\\""]
+[Result "1-0"]
+
+1. e4 e5 2. Nf3 {develops} Nc6 3. Bb5 a6 (3... Nf6 4. O-O) 4. Ba4 Nf6 5. O-O Be7
+6. Re1 b5 7. Bb3 d6 8. c3 O-O $1 9. h3 1-0
+
+[Event "Scholar"]
+
+1.e4 e5 2.Qh5 Nc6 3.Bc4 Nf6?? 4.Qxf7# 1-0
+"""
+
+def test_read_pgn_streams_games():
+    games = list(read_pgn(io.StringIO(SAMPLE)))
+    assert len(games) == 2
+    headers, moves = games[0]
+    assert headers["Black"] == 'B "the second"'
+    assert headers["Result"] == "1-0"
+    assert moves[:4] == ["e4", "e5", "Nf3", "Nc6"] and len(moves) == 17
+    game = None
+    for game, _ in replay(games[1][1]):
+        pass
+    assert game.checkmate_status() == "Checkmate! White wins."
+
+def test_san_round_trip_random_games():
+    import random
+    rng = random.Random(8)
+    for _ in range(5):
+        game = ChessBoard()
+        for _ in range(80):
+            moves = game.get_legal_moves(game.turn)
+            if not moves:
+                break
+            for start, end in moves:
+                assert parse_san(game, move_to_san(game, start, end, legal_moves=moves))[:2] == (start, end)
+            game.make_move(*rng.choice(moves))
+
+def test_san_disambiguation_and_promotion():
+    game = ChessBoard.from_fen("4k3/8/8/8/8/8/8/4K2R w K - 0 1")
+    assert move_to_san(game, (7, 4), (7, 6)) == "O-O"
+    game = ChessBoard.from_fen("4k3/P7/8/8/8/8/4K3/R6R w - - 0 1")
+    assert move_to_san(game, (7, 0), (7, 3)) == "Rad1"
+    assert move_to_san(game, (1, 0), (0, 0), "n") == "a8=N"
+    assert move_to_san(game, (1, 0), (0, 0)) == "a8=Q+"
+    assert parse_san(game, "a8=R") == ((1, 0), (0, 0), "R")
+    with pytest.raises(ValueError):
+        parse_san(game, "Rd1")   # two rooks can go there
+
+def test_pgn_writer_round_trip():
+    moves = [((6, 5), (5, 5)), ((1, 4), (3, 4)), ((6, 6), (4, 6)), ((0, 3), (4, 7))]
+    text = game_to_pgn(moves, {"Result": "0-1", "Date": "2024.01.01"})
+    assert "1. f3 e5 2. g4 Qh4# 0-1" in text
+    (headers, san), = read_pgn(io.StringIO(text))
+    assert headers["Date"] == "2024.01.01"
+    assert [move[:2] for _, move in replay(san)] == moves
+
+def test_pgn_writer_rejects_illegal_move():
+    with pytest.raises(ValueError, match="ply 1"):
+        game_to_pgn([((6, 4), (3, 4))])
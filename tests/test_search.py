@@ -0,0 +1,49 @@
+import threading
+import time
+from src.backend.game import ChessBoard
+from src.backend.search import MATE, Searcher, evaluate
+
+def test_finds_mate_in_one():
+    # scholar's mate: Qxf7#
+    game = ChessBoard.from_fen("r1bqkb1r/pppp1ppp/2n2n2/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w KQkq - 4 4")
+    result = Searcher().search(game, time_limit=5)
+    assert result.move == ((3, 7), (1, 5))
+    assert result.score == MATE - 1
+
+def test_takes_hanging_queen():
+    game = ChessBoard.from_fen("rnb1kbnr/pppp1ppp/8/4p1q1/3P4/2N5/PPP1PPPP/R1BQKBNR w KQkq - 0 3")
+    assert Searcher().search(game, time_limit=5, max_depth=3).move == ((7, 2), (3, 6))
+
+def test_search_leaves_board_unchanged():
+    game = ChessBoard.from_fen("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1")
+    before = (game.to_fen(), game.zobrist_key)
+    result = Searcher().search(game, time_limit=0.3)
+    assert (game.to_fen(), game.zobrist_key) == before
+    assert result.move in game.get_legal_moves(game.turn)
+    assert result.depth >= 1 and result.nodes > 0 and result.nps > 0
+
+def test_time_budget():
+    game = ChessBoard()
+    t0 = time.perf_counter()
+    Searcher().search(game, time_limit=0.2)
+    assert time.perf_counter() - t0 < 1.0
+
+def test_no_move_when_mated():
+    game = ChessBoard.from_fen("rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3")
+    result = Searcher().search(game, time_limit=0.1)
+    assert result.move is None and result.score == -MATE
+
+def test_evaluate_is_symmetric():
+    assert evaluate(ChessBoard()) == 0
+    game = ChessBoard.from_fen("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNB1KBNR w KQkq - 0 1")
+    assert evaluate(game) < -800
+
+def test_stop_from_another_thread():
+    game = ChessBoard()
+    stop = threading.Event()
+    threading.Timer(0.2, stop.set).start()
+    t0 = time.perf_counter()
+    result = Searcher().search(game, time_limit=60, stop=stop)
+    assert time.perf_counter() - t0 < 2.0
+    assert result.move in game.get_legal_moves(game.turn)
+    assert Searcher().search(game, stop=stop).depth == 0   # already stopped
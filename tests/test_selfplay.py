@@ -0,0 +1,33 @@
+import io
+import json
+
+import pytest
+
+from src.backend.pgn import game_to_pgn, read_pgn, replay
+from src.backend.selfplay import RandomPolicy, make_policy, percentile, play_game, run_match
+
+
+def test_random_game_ends_with_a_result():
+    status, moves, move_times = play_game(RandomPolicy(), RandomPolicy(), seed=3)
+    assert status is not None and len(moves) == len(move_times)
+    _, san_moves = next(read_pgn(io.StringIO(game_to_pgn(moves))))
+    *_, (game, _) = replay(san_moves)
+    assert game.checkmate_status() == status
+
+
+def test_run_match_alternates_colours_and_is_reproducible():
+    records = sorted(run_match(4, "random", "depth=1", processes=1, seed=9, random_plies=2, max_plies=40),
+                     key=lambda r: r.index)
+    assert [(r.white, r.black) for r in records] == [("random", "depth=1"), ("depth=1", "random")] * 2
+    assert all(r.result in ("1-0", "0-1", "1/2-1/2", "*") and len(r.moves) <= 40 for r in records)
+    again = sorted(run_match(4, "random", "depth=1", processes=2, seed=9, random_plies=2, max_plies=40),
+                   key=lambda r: r.index)
+    assert [r.moves for r in again] == [r.moves for r in records]
+    assert json.loads(records[0].to_json())["plies"] == len(records[0].moves)
+
+
+def test_policy_specs_and_percentile():
+    with pytest.raises(ValueError):
+        make_policy("depth=two")
+    assert make_policy("time=0.1").time_limit == 0.1
+    assert percentile([1, 2, 3, 4], 0.5) == 2 and percentile([1, 2, 3, 4], 0.99) == 4
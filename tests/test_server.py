@@ -0,0 +1,148 @@
+import asyncio
+import json
+
+import pytest
+
+from src.backend.tt import encode_move
+from src.server.loadgen import run_load
+from src.server.server import GameServer, ProtocolError, SessionStore, parse_move
+
+
+def test_parse_move():
+    assert parse_move("e2e4") == ((6, 4), (4, 4), None)
+    assert parse_move("a7a8n") == ((1, 0), (0, 0), "N")
+    for bad in ("e2", "e2e9", "e7e8k", 42):
+        with pytest.raises(ProtocolError):
+            parse_move(bad)
+
+
+def test_evicted_sessions_are_replayed():
+    store = SessionStore(max_live=1)
+    first = store.create()
+    store.board(first).make_move((6, 4), (4, 4))
+    first.moves.append(encode_move((6, 4), (4, 4)))
+    fen = store.board(first).to_fen()
+    second = store.create("4k3/8/8/8/8/8/8/4K3 w - - 0 1")
+    assert first.board is None and store.live == 1
+    assert store.board(first).to_fen() == fen and store.rebuilds == 1
+    assert second.board is None
+
+
+def test_protocol_round_trip():
+    async def scenario():
+        async with GameServer(port=0, hint_workers=1) as server:
+            reader, writer = await asyncio.open_connection(server.host, server.port)
+
+            async def call(**request):
+                writer.write(json.dumps(request).encode() + b"\n")
+                return json.loads(await reader.readline())
+
+            new = await call(id=1, op="new")
+            session = new["session"]
+            assert new["ok"] and new["id"] == 1 and new["turn"] == "white"
+            assert len((await call(op="legal", session=session))["moves"]) == 20
+            assert (await call(op="move", session=session, move="e2e4"))["turn"] == "black"
+            illegal = await call(id=7, op="move", session=session, move="e2e4")
+            assert illegal == {"id": 7, "ok": False, "error": "illegal move e2e4"}
+            assert (await call(op="status", session=session))["plies"] == 1
+            assert (await call(op="undo", session=session))["fen"].startswith("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP")
+            assert not (await call(op="undo", session=session))["ok"]
+
+            mate = await call(op="new", fen="6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1")
+            hint = await call(op="hint", session=mate["session"], time=1)
+            assert hint["move"] == "a1a8" and hint["depth"] >= 1
+            assert (await call(op="move", session=mate["session"], move="a1a8"))["status"] == "Checkmate! White wins."
+
+            assert (await call(op="close", session=session))["ok"]
+            assert not (await call(op="status", session=session))["ok"]
+            assert (await call(op="fly"))["error"].startswith("unknown op")
+            writer.write(b"not json\n")
+            assert json.loads(await reader.readline())["error"] == "bad JSON"
+            assert (await call(op="stats"))["sessions"] == 1
+            writer.close()
+            await writer.wait_closed()
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("line", [b'{"op": "hint", "session": 1, "time": NaN}',
+                                  b'{"op": "hint", "session": 1, "time": Infinity}',
+                                  b'{"op": "hint", "session": 1, "time": 0}',
+                                  b'{"op": "hint", "session": 1, "time": -1}'])
+def test_hint_time_must_be_positive_and_finite(line):
+    async def scenario():
+        server = GameServer(port=0)   # not started: a rejected hint never reaches the pool
+        await server.handle({"op": "new"})
+        return json.loads(await server.handle_line(line))
+
+    response = asyncio.run(scenario())
+    assert not response["ok"] and response["error"].startswith("time must be")
+
+
+@pytest.mark.parametrize("fen, error", [
+    ("4k3/8/8/8/8/8/8/4R1K1 w - - 0 1", "the side not to move is in check"),
+    ("4k3/8/8/4P3/8/8/8/4K3 w - f6 0 1", "bad FEN en passant square 'f6'"),
+])
+def test_impossible_positions_are_refused(fen, error):
+    async def scenario():
+        server = GameServer(port=0)
+        response = json.loads(await server.handle_line(json.dumps({"id": 1, "op": "new", "fen": fen}).encode()))
+        return response, server.store.sessions
+
+    response, sessions = asyncio.run(scenario())
+    assert not response["ok"] and response["error"].startswith(error) and not sessions
+
+
+def test_bad_requests_keep_the_connection():
+    async def scenario():
+        async with GameServer(port=0, hint_workers=1) as server:
+            reader, writer = await asyncio.open_connection(server.host, server.port)
+
+            async def call(**request):
+                writer.write(json.dumps(request).encode() + b"\n")
+                return json.loads(await reader.readline())
+
+            session = (await call(op="new"))["session"]
+            for bad in ([session], True, "1"):
+                response = await call(id=2, op="move", session=bad, move="e2e4")
+                assert response["id"] == 2 and response["error"].startswith("session must be an integer")
+
+            async def broken(request):
+                raise RuntimeError("boom")
+            server._op_stats = broken
+            assert await call(id=3, op="stats") == {"id": 3, "ok": False, "error": "internal error"}
+            assert (await call(op="move", session=session, move="e2e4"))["ok"]   # still connected
+            writer.close()
+            await writer.wait_closed()
+
+    asyncio.run(scenario())
+
+
+def test_hint_for_a_position_that_changed_is_refused():
+    async def scenario():
+        async with GameServer(port=0, hint_workers=1) as server:
+            fen = "r1bqk2r/pppp1ppp/2n2n2/2b1p3/2B1P3/3P1N2/PPP2PPP/RNBQK2R w KQkq - 1 5"   # not in the book
+            session = (await server.handle({"op": "new", "fen": fen}))["session"]
+            await server.handle({"op": "hint", "session": session, "time": 0.1})   # start the worker
+            for change in ({"op": "move", "session": session, "move": "e1g1"}, {"op": "close", "session": session}):
+                hint = asyncio.ensure_future(server.handle({"op": "hint", "session": session, "time": 1}))
+                await asyncio.sleep(0.1)
+                await server.handle(change)
+                with pytest.raises(ProtocolError, match="position changed"):
+                    await hint
+
+    asyncio.run(scenario())
+
+
+def test_load_generator():
+    async def scenario():
+        async with GameServer(port=0, hint_workers=1) as server:
+            task = asyncio.ensure_future(server.serve_forever())
+            report = await run_load(server.host, server.port, sessions=8, plies=6, concurrency=4)
+            task.cancel()
+            return report, server.store.sessions
+
+    report, sessions = asyncio.run(scenario())
+    assert report.sessions == 8 and report.moves == 48 and report.moves_per_second > 0
+    assert len(report.latencies["move"]) == 48 and report.latencies["move"] == sorted(report.latencies["move"])
+    assert not sessions   # every session closed
@@ -0,0 +1,97 @@
+import os
+import random
+import zlib
+
+import pytest
+
+from src.backend.game import ChessBoard
+from src.backend.search import MATE, Searcher
+from src.backend.tablebase import DEFAULT_DIR, ENDINGS, Tablebases, generate, load_tablebases
+
+pytestmark = pytest.mark.skipif(not all(os.path.exists(os.path.join(DEFAULT_DIR, e + ".tb")) for e in ENDINGS),
+                                reason="tables not generated")
+
+
+@pytest.fixture(scope="module")
+def tablebases():
+    return load_tablebases()
+
+
+@pytest.mark.parametrize("fen, expected", [
+    ("8/8/8/4k3/8/8/8/3QK3 w - - 0 1", (1, 13)),
+    ("8/8/8/4k3/8/8/8/3QK3 b - - 0 1", (-1, 16)),
+    ("k7/8/1QK5/8/8/8/8/8 b - - 0 1", (0, 0)),          # stalemate
+    ("k7/1Q6/1K6/8/8/8/8/8 b - - 0 1", (-1, 0)),        # mated
+    ("4k3/8/4K3/4P3/8/8/8/8 w - - 0 1", (1, 21)),
+    ("4k3/8/8/4K3/4P3/8/8/8 b - - 0 1", (0, 0)),        # opposition holds
+    ("8/8/8/8/8/8/4p3/4K2k b - - 0 1", (0, 0)),
+    ("8/8/8/8/8/8/8/K1k5 w - - 0 1", (0, 0)),           # bare kings
+])
+def test_probe(tablebases, fen, expected):
+    assert tablebases.probe(ChessBoard.from_fen(fen)) == expected
+
+
+def test_probe_is_symmetric(tablebases):
+    rng = random.Random(5)
+    for _ in range(200):
+        squares = rng.sample([(r, c) for r in range(1, 7) for c in range(8)], 3)
+        board = [["" for _ in range(8)] for _ in range(8)]
+        for (r, c), piece in zip(squares, "KRk"):
+            board[r][c] = piece
+        game = ChessBoard.from_fen("8/8/8/8/8/8/8/8 w - - 0 1")
+        game.board = board
+        if game.is_in_check("black"):
+            continue
+        mirrored = ChessBoard.from_fen("8/8/8/8/8/8/8/8 b - - 0 1")
+        mirrored.board = [[p.swapcase() for p in row] for row in reversed(board)]   # colours swapped
+        flipped = ChessBoard.from_fen("8/8/8/8/8/8/8/8 w - - 0 1")
+        flipped.board = [row[::-1] for row in board]
+        assert tablebases.probe(game) == tablebases.probe(mirrored) == tablebases.probe(flipped)
+
+
+def test_not_covered(tablebases):
+    assert tablebases.probe(ChessBoard()) is None
+    assert tablebases.probe(ChessBoard.from_fen("4k3/8/8/8/8/8/8/4K2R w K - 0 1")) is None   # castling right
+
+
+def test_best_move_mates(tablebases):
+    game = ChessBoard.from_fen("8/8/8/4k3/8/8/8/3RK3 w - - 0 1")
+    _, plies = tablebases.probe(game)
+    for _ in range(plies):
+        game.make_move(*tablebases.best_move(game))
+    assert game.checkmate_status() == "Checkmate! White wins."
+
+
+def test_underpromotion(tablebases):
+    game = ChessBoard.from_fen("8/k1P5/2K5/8/8/8/8/8 w - - 0 1")
+    game.make_move((1, 2), (0, 2), "Q")
+    assert game.checkmate_status() == "Stalemate! It's a draw." and tablebases.probe(game) == (0, 0)
+    game.unmake_move()
+    game.make_move((1, 2), (0, 2), "R")
+    assert tablebases.probe(game)[0] == -1
+
+
+def test_search_uses_tablebases(tablebases):
+    game = ChessBoard.from_fen("8/8/8/4k3/8/8/8/3QK3 w - - 0 1")
+    result = Searcher(tt_mb=1, tablebases=tablebases).search(game, max_depth=3)
+    assert result.score == MATE - 13 and result.depth == 0
+    # a capture into the tables is scored exactly inside the tree
+    game = ChessBoard.from_fen("8/8/8/3k4/8/3r4/8/3QK3 w - - 0 1")
+    result = Searcher(tt_mb=1, tablebases=tablebases).search(game, max_depth=2)
+    assert result.move == ((7, 3), (5, 3)) and result.score > MATE - 100
+
+
+def test_search_scores_the_move_it_returns(tablebases):
+    # c8=R mates fastest, but the search only promotes to a queen (stalemate here)
+    game = ChessBoard.from_fen("8/k1P5/2K5/8/8/8/8/8 w - - 0 1")
+    assert tablebases.probe(game) == (1, 3)
+    result = Searcher(tt_mb=1, tablebases=tablebases).search(game, max_depth=2)
+    game.make_move(*result.move)
+    wdl, plies = tablebases.probe(game)
+    assert wdl == -1 and result.score == MATE - plies - 1
+
+
+def test_generate_matches_shipped_table(tmp_path):
+    values = generate("KQK", Tablebases(str(tmp_path)))
+    with open(os.path.join(DEFAULT_DIR, "KQK.tb"), "rb") as handle:
+        assert values.tobytes() == zlib.decompress(handle.read())
@@ -0,0 +1,45 @@
+from src.backend.game import ChessBoard
+from src.backend.search import Searcher
+from src.backend.tt import EXACT, LOWER, UPPER, TranspositionTable, decode_move, encode_move
+
+def test_move_encoding():
+    assert decode_move(encode_move((6, 4), (4, 4))) == ((6, 4), (4, 4), None)
+    assert decode_move(encode_move((1, 0), (0, 0), "N")) == ((1, 0), (0, 0), "n")
+    assert decode_move(0) is None
+
+def test_size_cap():
+    tt = TranspositionTable(1)
+    assert tt.size_bytes <= 1024 * 1024
+    assert tt.stats()["entries"] == 65536
+
+def test_store_and_probe():
+    tt = TranspositionTable(1)
+    tt.store(12345, 4, -37, UPPER, encode_move((6, 4), (4, 4)))
+    assert tt.probe(12345) == (4, -37, UPPER, encode_move((6, 4), (4, 4)))
+    assert tt.probe(54321) is None
+    stats = tt.stats()
+    assert (stats["probes"], stats["hits"], stats["stores"]) == (2, 1, 1)
+
+def test_bucket_replacement():
+    tt = TranspositionTable(1)
+    base = 7
+    step = tt.buckets   # keys that land in the same bucket
+    tt.store(base, 8, 1, EXACT)
+    tt.store(base + step, 2, 2, LOWER)        # shallower: goes to the always-replace slot
+    assert tt.probe(base)[1] == 1 and tt.probe(base + step)[1] == 2
+    tt.store(base + 2 * step, 3, 3, LOWER)    # replaces the shallow entry only
+    assert tt.probe(base)[1] == 1 and tt.probe(base + step) is None
+    assert tt.stats()["collisions"] == 1
+    tt.store(base + 3 * step, 9, 4, EXACT)    # deeper: takes the depth-preferred slot
+    assert tt.probe(base + 3 * step)[1] == 4 and tt.probe(base) is None
+    tt.clear()
+    assert tt.stats()["fill"] == 0 and tt.probe(base + 3 * step) is None
+
+def test_repeated_search_reuses_table():
+    game = ChessBoard.from_fen("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1")
+    searcher = Searcher(tt_mb=4)
+    first = searcher.search(game, time_limit=30, max_depth=3)
+    second = searcher.search(game, time_limit=30, max_depth=3)
+    assert second.move == first.move and second.score == first.score
+    assert second.nodes < first.nodes / 3
+    assert searcher.tt.stats()["hit_rate"] > 0
@@ -0,0 +1,52 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.backend.game import ChessBoard
+from src.backend.perft import POSITIONS
+from src.backend.vectorized import analyze_positions, attack_masks, in_check, split_positions, stack_positions
+
+EXTRA_FENS = [
+    "8/8/3p4/KPp4r/1R3p1k/8/4P1P1/8 w - c6 0 3",          # en passant would expose the king along the rank
+    "8/8/8/1k6/3Pp3/8/8/4KQ2 b - d3 0 1",                  # en passant out of a diagonal pin is illegal
+    "4k3/8/8/8/8/8/8/R3K2R w KQ - 0 1",
+    "4k3/8/8/8/8/5r2/8/R3K2R w KQ - 0 1",                  # f1 attacked: no kingside castling
+    "rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3",
+    "7k/5Q2/6K1/8/8/8/8/8 b - - 0 1",
+    "k7/8/8/8/8/3n4/8/r3K3 w - - 0 1",                    # double check: only king moves
+]
+
+
+def _corpus():
+    """Every perft start position, its children, and a few hand-picked edge cases."""
+    games = [ChessBoard.from_fen(fen) for fen in EXTRA_FENS]
+    for fen, _ in POSITIONS.values():
+        game = ChessBoard.from_fen(fen)
+        games.append(ChessBoard.from_fen(fen))
+        for start, end in game.get_legal_moves(game.turn):
+            game.make_move(start, end)
+            games.append(ChessBoard.from_fen(game.to_fen()))
+            game.unmake_move()
+    return games
+
+
+def test_matches_chessboard_on_corpus():
+    games = _corpus()
+    result = analyze_positions(*split_positions(stack_positions(games)), chunk=64)
+    assert list(result.legal_moves) == [len(g.get_legal_moves(g.turn)) for g in games]
+    assert list(result.in_check) == [g.is_in_check(g.turn) for g in games]
+    assert list(result.checkmate) == [bool(s and "wins" in s) for s in (g.checkmate_status() for g in games)]
+    assert list(result.stalemate) == [bool(s and "Stalemate" in s) for s in (g.checkmate_status() for g in games)]
+
+
+def test_attack_masks_and_check_flags_match():
+    games = _corpus()[:60]
+    pieces = split_positions(stack_positions(games))[0]
+    for white, color in ((True, "white"), (False, "black")):
+        masks = attack_masks(pieces, white)
+        checks = in_check(pieces, white)
+        for game, mask, check in zip(games, masks, checks):
+            expected = sum(1 << (r*8 + c) for r in range(8) for c in range(8)
+                           if game.is_square_attacked((r, c), color))
+            assert int(mask) == expected
+            assert bool(check) == game.is_in_check(color)